@@ -0,0 +1,81 @@
+# One-topic-at-a-time InMemoryRunner vs the pipelined BatchRunner (common/batch_runner.py).
+#
+# Run from the repository root:
+#   python -m benchmarks.batch --topics 50 --latency 0.05
+import argparse
+import asyncio
+import importlib
+import os
+import tempfile
+import time
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from common.batch_runner import BatchRunner
+from common.fake_llm import FakeLlm, use_fake_llm
+
+
+PIPELINES = {
+    "blog_post": "day1.blog_post.agent",
+    "research_and_summarize": "day1.research_and_summarize.agent",
+}
+
+
+async def sequential(root_agent, topics: list[str]) -> float:
+    runner = InMemoryRunner(agent=root_agent, app_name="batch_benchmark")
+    started = time.perf_counter()
+    for topic in topics:
+        session = await runner.session_service.create_session(app_name=runner.app_name, user_id="bench")
+        message = types.Content(role="user", parts=[types.Part(text=topic)])
+        async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+            pass
+    return time.perf_counter() - started
+
+
+async def batched(root_agent, topics: list[str], concurrency: int, ordered: bool, resume_path=None, stop_after=None):
+    runner = BatchRunner(root_agent, stage_concurrency=concurrency, ordered=ordered, resume_path=resume_path)
+    started = time.perf_counter()
+    results = []
+    async for result in runner.run(topics):
+        results.append(result)
+        if stop_after is not None and len(results) >= stop_after:
+            break
+    return time.perf_counter() - started, results
+
+
+def main(args: argparse.Namespace):
+    topics = [f"Topic {i}: vector databases part {i}" for i in range(args.topics)]
+    for name in args.pipeline or list(PIPELINES):
+        root_agent = importlib.import_module(PIPELINES[name]).root_agent
+        stages = len(root_agent.sub_agents)
+        print(f"{name}: {args.topics} topics, {stages} stages, {args.latency * 1000:g} ms per model call")
+        print(f"{'mode':<36}{'wall s':>8}{'topics/s':>10}")
+        with use_fake_llm(root_agent, FakeLlm(latency_s=args.latency, output_tokens=32)):
+            wall_s = asyncio.run(sequential(root_agent, topics))
+            print(f"{'sequential InMemoryRunner':<36}{wall_s:>8.2f}{args.topics / wall_s:>10.1f}")
+            for concurrency in args.concurrency:
+                for ordered in (True, False):
+                    wall_s, results = asyncio.run(batched(root_agent, topics, concurrency, ordered))
+                    assert [r.index for r in results] == list(range(len(topics))) or not ordered
+                    assert not any(r.error for r in results)
+                    label = f"pipelined x{concurrency}/stage ({'ordered' if ordered else 'unordered'})"
+                    print(f"{label:<36}{wall_s:>8.2f}{args.topics / wall_s:>10.1f}")
+
+            with tempfile.TemporaryDirectory() as directory:
+                resume_path = os.path.join(directory, "resume.jsonl")
+                _, first = asyncio.run(batched(root_agent, topics, 2, True, resume_path, stop_after=args.topics // 2))
+                wall_s, second = asyncio.run(batched(root_agent, topics, 2, True, resume_path))
+                resumed = sum(r.resumed for r in second)
+                print(f"resume: stopped after {len(first)}, restart skipped {resumed} and ran "
+                      f"{len(second) - resumed} in {wall_s:.2f}s")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipelined batch execution with a fake model.")
+    parser.add_argument("--pipeline", action="append", choices=sorted(PIPELINES))
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake model call.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    main(parser.parse_args())
@@ -0,0 +1,124 @@
+# Per-turn latency, prompt size and stored events of one long-lived chat session, with and without
+# SessionCompactor (common/session_compaction.py), using a fake model.
+#
+# The fake summarizer keeps the sentences in which the user introduces themselves, so the last turn
+# ("What is my name?") shows whether such facts survive many rounds of compaction.
+#
+# Run from the repository root:
+#   python -m benchmarks.compaction --turns 300
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import tempfile
+import time
+from typing import AsyncGenerator
+
+from google.adk.agents import LlmAgent
+from google.adk.apps import App
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.genai import types
+from sqlalchemy import text
+
+from common.fake_llm import estimate_tokens, get_agent_name, request_text
+from common.session_compaction import SUMMARIZER_NAME, CompactionPolicy, SessionCompactor
+from common.sqlite_sessions import TunedSqliteSessionService
+
+
+APP_NAME = "StatefulApp"
+USER_ID = "default"
+FACT_PATTERN = re.compile(r"\b(?:I am|my name is) ([A-Z]\w+)")
+
+
+class ChatFakeLlm(BaseLlm):
+    """Answers "What is my name?" from whatever the prompt still contains; summaries keep only self-introductions."""
+
+    model: str = "gemini-2.5-flash-lite"
+    prompt_tokens: list[int] = []
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        prompt = request_text(llm_request)
+        if get_agent_name(llm_request) == SUMMARIZER_NAME:
+            names = dict.fromkeys(FACT_PATTERN.findall(prompt))
+            reply = " ".join(f"The user said: my name is {name}." for name in names) or "Nothing to remember."
+        else:
+            self.prompt_tokens.append(estimate_tokens(prompt))
+            question = llm_request.contents[-1].parts[0].text or ""
+            if "what is my name" in question.lower():
+                names = FACT_PATTERN.findall(prompt)
+                reply = f"Your name is {names[-1]}." if names else "I don't know your name."
+            else:
+                reply = "Here is a detailed answer. " + "lorem ipsum dolor sit amet " * 12
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=reply)]), turn_complete=True)
+
+
+def questions(turns: int) -> list[str]:
+    middle = [f"Tell me something interesting about topic number {i}." for i in range(1, turns - 1)]
+    return ["Hi, I am Sam! What is the capital of United States?", *middle, "What is my name?"]
+
+
+async def run(path: str, turns: int, compaction: bool) -> dict:
+    llm = ChatFakeLlm(prompt_tokens=[])
+    agent = LlmAgent(name="text_chat_bot", description="A text chatbot with persistent memory", model=llm)
+    compactor = SessionCompactor(CompactionPolicy()) if compaction else None
+    app = App(name=APP_NAME, root_agent=agent, plugins=[compactor] if compactor else [])
+    service = TunedSqliteSessionService(path)
+    runner = Runner(app=app, session_service=service)
+    session = await service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id="stateful-agentic-session")
+
+    latencies, answer = [], ""
+    try:
+        for query in questions(turns):
+            message = types.Content(role="user", parts=[types.Part(text=query)])
+            started = time.perf_counter()
+            async for event in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=message):
+                if event.content and event.content.parts and event.content.parts[0].text:
+                    answer = event.content.parts[0].text
+            latencies.append(time.perf_counter() - started)
+
+        if compactor:
+            await compactor.wait()
+        await service.flush()
+        async with service.read_session_factory() as sql_session:
+            stored = (await sql_session.execute(text("SELECT COUNT(*) FROM events"))).scalar()
+        archived = len(await service.get_archived_events(APP_NAME, USER_ID, session.id))
+    finally:
+        await service.close()
+    window = max(1, turns // 10)
+    return {
+        "first_ms": statistics.mean(latencies[1 : window + 1]) * 1000,
+        "last_ms": statistics.mean(latencies[-window - 1 : -1]) * 1000,
+        "first_tokens": statistics.mean(llm.prompt_tokens[1 : window + 1]),
+        "last_tokens": statistics.mean(llm.prompt_tokens[-window - 1 : -1]),
+        "stored": stored,
+        "archived": archived,
+        "answer": answer,
+        "compactions": compactor.stats.compactions if compactor else 0,
+    }
+
+
+def main(args: argparse.Namespace):
+    window = max(1, args.turns // 10)
+    print(f"{args.turns} turns in one session; latency and prompt tokens averaged over the first/last {window} turns")
+    print(
+        f"{'compaction':<12}{'first ms':>10}{'last ms':>10}{'first tok':>11}{'last tok':>10}"
+        f"{'events':>8}{'archived':>10}{'runs':>6}  last answer"
+    )
+    for compaction in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            stats = asyncio.run(run(os.path.join(directory, "sessions.db"), args.turns, compaction))
+        print(
+            f"{'on' if compaction else 'off':<12}{stats['first_ms']:>10.1f}{stats['last_ms']:>10.1f}"
+            f"{stats['first_tokens']:>11.0f}{stats['last_tokens']:>10.0f}{stats['stored']:>8}{stats['archived']:>10}"
+            f"{stats['compactions']:>6}  {stats['answer']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark session compaction on a long chat.")
+    parser.add_argument("--turns", type=int, default=300)
+    main(parser.parse_args())
@@ -0,0 +1,59 @@
+# Per-row convert_amount calls vs one vectorized convert_bulk pass (day2/currency_converter_agent/rates.py).
+#
+# Run from the repository root:
+#   python -m benchmarks.currency --rows 1000000
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from day2.currency_converter_agent.agent import convert_amount
+from day2.currency_converter_agent.fees import get_fee_schedule
+from day2.currency_converter_agent.rates import convert_bulk, get_rate_table
+
+
+def make_rows(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    codes = np.array(get_rate_table().codes)
+    methods = np.array(sorted(get_fee_schedule().methods))
+    amounts = np.round(rng.uniform(1, 10_000, n), 2)
+    return amounts, rng.choice(codes, n), rng.choice(codes, n), rng.choice(methods, n)
+
+
+def main(args: argparse.Namespace):
+    amounts, bases, targets, methods = make_rows(args.rows)
+    fee_lookup = get_fee_schedule().fee_fractions
+
+    sample = min(args.rows, args.per_row_sample)
+
+    async def convert_rows() -> list[dict]:
+        return [
+            await convert_amount(float(amounts[i]), str(bases[i]), str(targets[i]), str(methods[i]))
+            for i in range(sample)
+        ]
+
+    started = time.perf_counter()
+    per_row = asyncio.run(convert_rows())
+    per_row_s = (time.perf_counter() - started) / sample
+
+    started = time.perf_counter()
+    result = convert_bulk(amounts, bases, targets, methods, fee_lookup)
+    bulk_s = time.perf_counter() - started
+
+    columns = ("fee_amount", "amount_after_fee", "converted_amount")
+    mismatches = sum(
+        any(float(row[column]) != getattr(result, column)[i] for column in columns) for i, row in enumerate(per_row)
+    )
+    print(f"{args.rows} rows, {len(get_rate_table().codes)} currencies, {len(get_fee_schedule().methods)} payment methods")
+    print(f"{'mode':<28}{'wall s':>10}{'rows/s':>14}")
+    print(f"{'per-row convert_amount':<28}{per_row_s * args.rows:>10.2f}{1 / per_row_s:>14,.0f}  (extrapolated from {sample})")
+    print(f"{'convert_bulk':<28}{bulk_s:>10.2f}{args.rows / bulk_s:>14,.0f}")
+    print(f"speedup x{per_row_s * args.rows / bulk_s:.0f}; rows differing from convert_amount: {mismatches}/{sample}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk currency conversion.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--per-row-sample", type=int, default=20_000)
+    main(parser.parse_args())
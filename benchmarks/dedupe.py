@@ -0,0 +1,62 @@
+# Throughput of the deterministic paper dedupe (day1/papers_news/dedupe.py).
+#
+# Run from the repository root:
+#   python -m benchmarks.dedupe --sizes 20 1000 5000 20000
+import argparse
+import random
+import time
+
+from day1.papers_news.dedupe import dedupe_candidates
+
+
+WORDS = (
+    "language models reasoning retrieval diffusion vision transformers agents benchmark survey "
+    "alignment multimodal efficient scaling sparse attention reinforcement learning robust graph "
+    "neural networks contrastive pretraining instruction tuning evaluation memory planning"
+).split()
+
+
+def make_candidates(n: int, duplicate_ratio: float = 0.3, seed: int = 0) -> list[dict]:
+    """Synthetic search results where ~duplicate_ratio of them re-list an earlier paper."""
+    rng = random.Random(seed)
+    originals = []
+    candidates = []
+    for i in range(n):
+        if originals and rng.random() < duplicate_ratio:
+            paper_index, title = rng.choice(originals)
+            variant = rng.randrange(4)
+            if variant == 0:
+                url = f"https://arxiv.org/pdf/2501.{paper_index:05d}v{rng.randint(1, 3)}.pdf"
+            elif variant == 1:
+                url = f"https://www.semanticscholar.org/paper/{paper_index}"
+                title = title.upper()
+            elif variant == 2:
+                url = f"https://blog.example.com/post-{i}"
+                title = title + "."
+            else:
+                url = f"https://arxiv.org/abs/2501.{paper_index:05d}"
+        else:
+            title = " ".join(rng.sample(WORDS, 7)).capitalize() + f" {i}"
+            url = f"https://arxiv.org/abs/2501.{i:05d}"
+            originals.append((i, title))
+        candidates.append({"title": title, "url": url, "year_hint": 2025})
+    return candidates
+
+
+def main(args: argparse.Namespace):
+    print(f"{'candidates':>11}{'kept':>8}{'removed':>9}{'best ms':>10}")
+    for size in args.sizes:
+        candidates = make_candidates(size)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            papers, removed = dedupe_candidates(candidates, max_results=size)
+            timings.append(time.perf_counter() - start)
+        print(f"{size:>11}{len(papers):>8}{removed:>9}{min(timings) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dedupe_candidates on synthetic search results.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+# Long-term memory retrieval latency: search_memory over one user's memories (common/vector_memory.py).
+#
+# Fills a temporary store with synthetic chat turns, plants a few facts, then times end-to-end
+# `search_memory` calls (query embedding, scan, top-k, MemoryEntry objects) before and after re-packing.
+#
+# Run from the repository root:
+#   python -m benchmarks.memory --memories 100000
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+
+from common.vector_memory import VectorMemoryService
+
+
+APP_NAME = "StatefulApp"
+USER_ID = "default"
+FACTS = {
+    "What is my name?": "user: Hi, my name is Sam and I work as a marine biologist.",
+    "Where do I live?": "user: I live in Haifa, close to the beach.",
+    "Which food am I allergic to?": "user: Remember that I am allergic to peanuts.",
+}
+
+
+def synthetic_turns(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    vocabulary = [f"topic{i}" for i in range(5000)] + ["weather", "travel", "music", "budget", "python", "recipe"]
+    return [
+        f"user: tell me about {' '.join(rng.choices(vocabulary, k=4))}\n"
+        f"text_chat_bot: {' '.join(rng.choices(vocabulary, k=12))}"
+        for _ in range(count)
+    ]
+
+
+async def time_searches(service: VectorMemoryService, queries: list[str]) -> list[float]:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        await service.search_memory(app_name=APP_NAME, user_id=USER_ID, query=query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return sorted(latencies)
+
+
+def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as directory:
+        service = VectorMemoryService(directory, repack_every=args.memories + 1)
+        texts = synthetic_turns(args.memories - len(FACTS))
+        positions = random.Random(1).sample(range(len(texts)), len(FACTS))
+        for position, fact in sorted(zip(positions, FACTS.values()), reverse=True):
+            texts.insert(position, fact)
+
+        started = time.perf_counter()
+        for offset in range(0, len(texts), args.batch):
+            batch = texts[offset : offset + args.batch]
+            service.add_records(
+                APP_NAME, USER_ID, [{"id": f"m{offset + i}", "text": text} for i, text in enumerate(batch)]
+            )
+        add_s = time.perf_counter() - started
+        print(f"{len(texts)} memories embedded and appended in {add_s:.1f}s ({len(texts) / add_s:,.0f}/s)")
+
+        queries = [text.split("\n")[0] for text in random.Random(2).sample(texts, 200)]
+        for label in ("unpacked (all rows in the tail)", "after re-pack (memory-mapped matrix)"):
+            if label.startswith("after"):
+                started = time.perf_counter()
+                service.repack()
+                print(f"re-pack: {time.perf_counter() - started:.2f}s")
+            latencies = asyncio.run(time_searches(service, queries))
+            print(
+                f"{label:<40} search p50 {statistics.median(latencies):.2f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms"
+            )
+
+        for question, fact in FACTS.items():
+            response = asyncio.run(service.search_memory(app_name=APP_NAME, user_id=USER_ID, query=question))
+            top = response.memories[0].content.parts[0].text if response.memories else "(nothing)"
+            print(f"{question:<30} -> {'ok' if top == fact else 'MISS'}: {top.splitlines()[0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark long-term memory retrieval.")
+    parser.add_argument("--memories", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    main(parser.parse_args())
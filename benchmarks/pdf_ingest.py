@@ -0,0 +1,144 @@
+# Throughput of the PDF ingestion stage (day1/papers_news/pdf_ingest.py) against a local file server.
+#
+# Run from the repository root:
+#   python -m benchmarks.pdf_ingest --pdfs 100
+import argparse
+import asyncio
+import functools
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from day1.papers_news import pdf_ingest
+from day1.papers_news.pdf_extract import extract_pdf
+
+
+SECTIONS = ["Abstract", "1 Introduction", "2 Related Work", "3 Method", "4 Experiments", "5 Conclusion", "References"]
+WORDS = "model data training results attention benchmark accuracy scaling tokens layer loss baseline".split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(title: str, pages: int, rng: random.Random, padding_bytes: int = 0) -> bytes:
+    """A minimal text PDF with numbered sections and figure/table captions (optionally padded)."""
+    lines = [title]
+    for heading in SECTIONS:
+        lines.append(heading)
+        for _ in range(8 * pages):
+            lines.append(" ".join(rng.choices(WORDS, k=10)))
+        if heading[0].isdigit():
+            lines.append(f"Figure {heading[0]}: {' '.join(rng.choices(WORDS, k=6))}.")
+            lines.append(f"Table {heading[0]}. {' '.join(rng.choices(WORDS, k=6))}.")
+    per_page = -(-len(lines) // pages)
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for start in range(0, len(lines), per_page):
+        text = "".join(f"({_escape(line)}) Tj T*\n" for line in lines[start:start + per_page])
+        stream = f"BT /F1 9 Tf 11 TL 50 800 Td\n{text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    if padding_bytes:  # Unreferenced binary stream, e.g. embedded figures.
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (padding_bytes, os.urandom(padding_bytes)))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def write_corpus(directory: str, count: int, large_every: int, large_mb: float) -> list[dict]:
+    rng = random.Random(0)
+    papers = []
+    for i in range(count):
+        padding = int(large_mb * 1024 * 1024) if large_every and i % large_every == 0 else 0
+        with open(os.path.join(directory, f"paper{i}.pdf"), "wb") as f:
+            f.write(make_pdf(f"Synthetic Paper {i}", pages=rng.randint(4, 12), rng=rng, padding_bytes=padding))
+        papers.append({"title": f"Synthetic Paper {i}", "pdf_url": f"paper{i}.pdf"})
+    return papers
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    latency_s = 0.0
+
+    def do_GET(self):
+        if self.latency_s:  # Stand-in for time to first byte from a remote server.
+            time.sleep(self.latency_s)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def sequential_baseline(papers: list[dict]) -> tuple[int, float]:
+    """One request at a time, extraction in-process: what a naive tool would do."""
+    started = time.perf_counter()
+    extracted = 0
+    with requests.Session() as session:
+        for paper in papers:
+            response = session.get(paper["pdf_url"], timeout=30)
+            response.raise_for_status()
+            extract_pdf(response.content, paper["title"])
+            extracted += 1
+    return extracted, time.perf_counter() - started
+
+
+def main(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as directory:
+        papers = write_corpus(directory, args.pdfs, args.large_every, args.large_mb)
+        _Handler.latency_s = args.server_latency
+        server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_Handler, directory=directory))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}/"
+        for paper in papers:
+            paper["pdf_url"] = base + paper["pdf_url"]
+        corpus_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 1e6
+
+        try:
+            print(f"{args.pdfs} PDFs, {corpus_mb:.1f} MB (every {args.large_every}th padded to ~{args.large_mb:g} MB), "
+                  f"{args.server_latency * 1000:g} ms server latency, {os.cpu_count()} CPUs")
+            print(f"{'mode':<34}{'PDFs':>6}{'wall s':>9}{'PDFs/s':>9}{'MB/s':>8}")
+            if not args.skip_baseline:
+                extracted, wall_s = sequential_baseline(papers)
+                print(f"{'sequential (requests, in-process)':<34}{extracted:>6}{wall_s:>9.2f}"
+                      f"{extracted / wall_s:>9.1f}{corpus_mb / wall_s:>8.1f}")
+
+            pool = pdf_ingest.get_process_pool()
+            asyncio.run(pdf_ingest.ingest_papers(papers[:2], pool=pool))  # Warm up the worker processes.
+            _, stats = asyncio.run(pdf_ingest.ingest_papers(papers, concurrency=args.concurrency, pool=pool))
+            workers = int(os.getenv("PDF_WORKERS", "0")) or os.cpu_count()
+            label = f"pooled httpx x{args.concurrency} + {workers} procs"
+            print(f"{label:<34}{stats.extracted:>6}{stats.wall_s:>9.2f}{stats.pdfs_per_s:>9.1f}{stats.mb_per_s:>8.1f}")
+            print(f"spooled to disk: {stats.spooled}, failed: {stats.failed}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PDF ingestion against a local file server.")
+    parser.add_argument("--pdfs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=pdf_ingest.DEFAULT_CONCURRENCY)
+    parser.add_argument("--large-every", type=int, default=10, help="Pad every Nth PDF past the spool threshold.")
+    parser.add_argument("--large-mb", type=float, default=6.0)
+    parser.add_argument("--server-latency", type=float, default=0.0, help="Seconds before each response.")
+    parser.add_argument("--skip-baseline", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,278 @@
+# Offline end-to-end benchmark of the course pipelines.
+# Every LlmAgent is switched to a FakeLlm, so the numbers measure ADK orchestration overhead
+# (plus the configured fake latency), never the network.
+#
+# Run from the repository root:
+#   python -m benchmarks.pipelines --iterations 50 --latency 0.05
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from common.fake_llm import FakeLlm, use_fake_llm
+from common.llm_cache import ResponseCache, enable_response_cache
+from common.search_cache import FakeSearchBackend, SearchCache, enable_search_cache
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+STORY = (
+    "The lighthouse keeper counted ships for forty years. On the night the lamp failed, she climbed the stairs "
+    "with a candle and kept it burning until dawn, and the fishing boats came home one by one."
+)
+STORY_REFINED = STORY.replace("kept it burning until dawn", "shielded it from the wind until dawn")
+
+PAPERS_META = json.dumps({
+    "papers_meta": [
+        {"title": f"Paper {i}", "url": f"https://arxiv.org/abs/2501.0000{i}", "pdf_url": f"https://arxiv.org/pdf/2501.0000{i}v1",
+         "venue_hint": "arXiv", "year_hint": 2025, "abstract_hint": f"Abstract of paper {i}."}
+        for i in range(1, 7)
+    ]
+})
+# initial_summarizer maps one paper_summarizer call over each new paper (paper_id is carried over).
+PAPER_SUMMARY = json.dumps({"summary_md": "arXiv preprint: https://arxiv.org/abs/2501.00001\n- Key idea."})
+# harvest_enrich hands the raw results (one listed twice) to the dedupe_papers tool.
+DEDUPE_CALL = {
+    "function_call": {
+        "name": "dedupe_papers",
+        "args": {"candidates": json.loads(PAPERS_META)["papers_meta"] + [
+            {"title": "PAPER 1.", "url": "https://arxiv.org/pdf/2501.00001v2.pdf", "year_hint": 2025},
+        ]},
+    }
+}
+
+# pipeline name -> (module with `root_agent`, user message, scripted replies per agent)
+PIPELINES = {
+    "blog_post": (
+        "day1.blog_post.agent",
+        "Write a blog post about vector databases.",
+        {},
+    ),
+    "parallel_agents": (
+        "day1.parallel_agents.agent",
+        "Run the daily research briefing.",
+        {},
+    ),
+    "research_and_summarize": (
+        "day1.research_and_summarize.agent",
+        "Quantum error correction",
+        {},
+    ),
+    "papers_news": (
+        "day1.papers_news.agent",
+        "Give me the latest AI papers digest.",
+        {
+            "scholar_query_builder": ['{"scholar_query": "\\"large language models\\" (2025 OR 2024) site:arxiv.org"}'],
+            "harvest_enrich": [DEDUPE_CALL],
+            "paper_summarizer": [PAPER_SUMMARY],
+            "critic_agent": ["APPROVED"],
+        },
+    ),
+    "story_refinement": (
+        "day1.refinement_cycle_agents.agent",
+        "Write a story about a lighthouse keeper.",
+        {
+            "InitialWriterAgent": [STORY],
+            "CriticAgent": ["Show the storm: what does the keeper fight against?", "APPROVED"],
+            "RefinerEditorAgent": [json.dumps({"edits": [{"find": "kept it burning", "replace": "shielded it from the wind"}]})],
+            "RefinerAgent": [STORY_REFINED],  # Full-rewrite fallback (REFINEMENT_MODE=rewrite)
+        },
+    ),
+    "currency_converter_agent": (
+        "day2.currency_converter_agent.agent",
+        "Convert 1,250 USD to INR using a Bank Transfer.",
+        {
+            "enhanced_currency_agent": [
+                {
+                    "function_call": {
+                        "name": "convert_amount",
+                        "args": {
+                            "amount": 1250,
+                            "base_currency": "USD",
+                            "target_currency": "INR",
+                            "payment_method": "bank transfer",
+                        },
+                    }
+                },
+                "1,250 USD is 103,430.25 INR after a 1% bank transfer fee.",
+            ],
+        },
+    ),
+    "stateful_agent": (
+        "day3.stateful_agent.agent",
+        "Hi, I am Sam! What is the capital of United States?",
+        {"text_chat_bot": ["Hi Sam! The capital of the United States is Washington, D.C."]},
+    ),
+}
+
+
+def search_call(query: str) -> dict:
+    return {"function_call": {"name": "google_search", "args": {"query": query}}}
+
+
+# With --search-cache the agents call the cached google_search function tool before answering.
+SEARCH_SCRIPTS = {
+    "parallel_agents": {
+        "TechResearcher": [search_call("latest AI ML trends 2025"), "Tech findings."],
+        "HealthResearcher": [search_call("recent medical breakthroughs 2025"), "Health findings."],
+        "FinanceResearcher": [search_call("current fintech trends 2025"), "Finance findings."],
+    },
+    "research_and_summarize": {
+        "ResearchAgent": [search_call("Quantum error correction"), "Findings with citations."],
+    },
+    "papers_news": {
+        "scholar_query_builder": [search_call("large language models survey 2025")],
+        "harvest_enrich": [search_call("\"large language models\" (2025 OR 2024) site:arxiv.org")],
+    },
+}
+
+
+@dataclass
+class BenchmarkResult:
+    pipeline: str
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    events_per_sec: float
+    model_calls: int
+    peak_rss_mb: float | None
+    cache_hit_rate: float | None = None
+    search_calls_saved: int | None = None
+    search_latency_saved_s: float | None = None
+
+
+def peak_rss_mb() -> float | None:
+    """Process-wide peak resident set size, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def benchmark_pipeline(
+    name: str,
+    iterations: int,
+    latency_s: float,
+    per_token_latency_s: float,
+    cache: ResponseCache | None = None,
+    search_cache: SearchCache | None = None,
+) -> BenchmarkResult:
+    module_name, message, script = PIPELINES[name]
+    if search_cache is not None:
+        script = {**script}
+        for agent_name, replies in SEARCH_SCRIPTS.get(name, {}).items():
+            script[agent_name] = replies + script.get(agent_name, [])
+    root_agent = importlib.import_module(module_name).root_agent
+    fake = FakeLlm(script=script, latency_s=latency_s, per_token_latency_s=per_token_latency_s)
+
+    durations = []
+    total_events = 0
+    with use_fake_llm(root_agent, fake):
+        if cache is not None:
+            enable_response_cache(root_agent, cache)
+            hits_before, misses_before = cache.hits, cache.misses
+        if search_cache is not None:
+            enable_search_cache(root_agent, search_cache)
+            search_before = (search_cache.stats.cache_hits + search_cache.stats.coalesced, search_cache.stats.saved_latency_s)
+        runner = InMemoryRunner(agent=root_agent, app_name=name)
+        new_message = types.Content(role="user", parts=[types.Part(text=message)])
+        for i in range(iterations):
+            session = await runner.session_service.create_session(
+                app_name=name, user_id="bench", session_id=f"bench-{i}"
+            )
+            start = time.perf_counter()
+            async for _ in runner.run_async(
+                user_id="bench", session_id=session.id, new_message=new_message
+            ):
+                total_events += 1
+            durations.append(time.perf_counter() - start)
+
+    cache_hit_rate = None
+    if cache is not None:
+        hits, misses = cache.hits - hits_before, cache.misses - misses_before
+        cache_hit_rate = hits / (hits + misses) if hits + misses else 0.0
+
+    search_calls_saved = search_latency_saved_s = None
+    if search_cache is not None:
+        search_calls_saved = search_cache.stats.cache_hits + search_cache.stats.coalesced - search_before[0]
+        search_latency_saved_s = search_cache.stats.saved_latency_s - search_before[1]
+
+    return BenchmarkResult(
+        pipeline=name,
+        iterations=iterations,
+        p50_ms=percentile(durations, 50) * 1000,
+        p95_ms=percentile(durations, 95) * 1000,
+        events_per_sec=total_events / sum(durations),
+        model_calls=sum(fake.calls.values()),
+        peak_rss_mb=peak_rss_mb(),
+        cache_hit_rate=cache_hit_rate,
+        search_calls_saved=search_calls_saved,
+        search_latency_saved_s=search_latency_saved_s,
+    )
+
+
+def print_report(results: list[BenchmarkResult]):
+    print(
+        f"{'pipeline':<26}{'runs':>6}{'p50 ms':>10}{'p95 ms':>10}{'events/s':>11}{'calls':>8}"
+        f"{'peak RSS MB':>13}{'cache hits':>12}{'searches saved':>16}"
+    )
+    for r in results:
+        rss = f"{r.peak_rss_mb:.1f}" if r.peak_rss_mb is not None else "n/a"
+        hit_rate = f"{r.cache_hit_rate:.0%}" if r.cache_hit_rate is not None else "-"
+        searches = (
+            f"{r.search_calls_saved} ({r.search_latency_saved_s:.1f}s)" if r.search_calls_saved is not None else "-"
+        )
+        print(
+            f"{r.pipeline:<26}{r.iterations:>6}{r.p50_ms:>10.2f}{r.p95_ms:>10.2f}"
+            f"{r.events_per_sec:>11.1f}{r.model_calls:>8}{rss:>13}{hit_rate:>12}{searches:>16}"
+        )
+
+
+async def main(args: argparse.Namespace):
+    # Keep the papers_news index out of the working directory.
+    os.environ.setdefault("PAPER_STORE_PATH", os.path.join(tempfile.mkdtemp(), "papers_index.db"))
+    cache = ResponseCache(args.cache) if args.cache else None
+    search_cache = None
+    if args.search_cache:
+        search_cache = SearchCache(args.search_cache, FakeSearchBackend(latency_s=args.search_latency))
+    results = []
+    for name in args.pipelines or PIPELINES:
+        results.append(
+            await benchmark_pipeline(name, args.iterations, args.latency, args.per_token_latency, cache, search_cache)
+        )
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of every course root_agent.")
+    parser.add_argument("--pipeline", dest="pipelines", action="append", choices=list(PIPELINES), help="Default: all pipelines")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake model latency per call (seconds)")
+    parser.add_argument("--per-token-latency", type=float, default=0.0, help="Extra fake latency per output token")
+    parser.add_argument("--cache", metavar="PATH", help="Route model calls through a response cache at PATH")
+    parser.add_argument("--search-cache", metavar="PATH", help="Serve google_search from a search cache at PATH (fake backend)")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="Fake search backend latency (seconds)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+# Conversion latency with a slow exchange-rate provider: a provider call per conversion vs RateCache
+# (day2/currency_converter_agent/providers.py) with background refresh and stale-while-revalidate.
+#
+# Run from the repository root:
+#   python -m benchmarks.rate_cache --sessions 32 --seconds 5 --provider-latency 0.2 --ttl 1
+import argparse
+import statistics
+import threading
+import time
+
+from day2.currency_converter_agent.providers import MockRateProvider, RateCache
+from day2.currency_converter_agent.rates import RateTable, get_rate_table
+
+
+def run_sessions(lookup, sessions: int, seconds: float) -> list[float]:
+    """Each session converts EUR -> INR in a loop; returns every lookup latency in seconds."""
+    latencies: list[list[float]] = [[] for _ in range(sessions)]
+    deadline = time.perf_counter() + seconds
+
+    def session(index: int):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            assert lookup().rate("EUR", "INR")
+            latencies[index].append(time.perf_counter() - started)
+            time.sleep(0.001)  # The rest of a conversion turn.
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [latency for per_session in latencies for latency in per_session]
+
+
+def report(label: str, latencies: list[float], provider_calls: int, extra: str = ""):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:<22}{len(latencies):>9}{statistics.median(latencies) * 1000:>10.3f}{p99 * 1000:>10.3f}"
+        f"{latencies[-1] * 1000:>10.1f}{provider_calls:>8}  {extra}"
+    )
+
+
+def main(args: argparse.Namespace):
+    static = get_rate_table()
+    print(f"{args.sessions} sessions for {args.seconds:g}s, provider latency {args.provider_latency * 1000:g} ms, "
+          f"TTL {args.ttl:g}s")
+    print(f"{'mode':<22}{'lookups':>9}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'calls':>8}")
+
+    provider = MockRateProvider(latency_s=args.provider_latency)
+
+    def uncached() -> RateTable:
+        rates = provider.fetch(static.pivot, static.codes)
+        return RateTable(static.pivot, {c: r for c, r in rates.items() if c != static.pivot})
+
+    report("provider per lookup", run_sessions(uncached, args.sessions, args.seconds), provider.calls)
+
+    for label, interval in (("cache, stale-on-expiry", None), ("cache, background", args.ttl / 2)):
+        provider = MockRateProvider(latency_s=args.provider_latency)
+        cache = RateCache(provider, static.pivot, static.codes, ttl_s=args.ttl, refresh_interval_s=interval)
+        cache.refresh().result()  # Warm start, as the agent's background thread does at import.
+        latencies = run_sessions(cache.table, args.sessions, args.seconds)
+        metrics = cache.metrics()
+        report(label, latencies, provider.calls,
+               f"hit rate {metrics['hit_rate']:.4f}, stale hits {metrics['stale_hits']}, age {metrics['age_s']:.2f}s")
+        cache.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the exchange-rate cache against a slow provider.")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--provider-latency", type=float, default=0.2)
+    parser.add_argument("--ttl", type=float, default=1.0)
+    main(parser.parse_args())
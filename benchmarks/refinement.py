@@ -0,0 +1,124 @@
+# Full-rewrite vs edit-list refinement (common/edit_refiner.py) on the story refinement loop.
+# Output tokens dominate latency, so the fake model charges --per-token-latency per output token.
+#
+# Run from the repository root:
+#   python -m benchmarks.refinement --per-token-latency 0.005
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import statistics
+import time
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from common.fake_llm import FakeLlm, use_fake_llm
+
+
+MODULE = "day1.refinement_cycle_agents.agent"
+REFINER_AUTHORS = {"RefinerAgent", "RefinerEditorAgent", "EditingRefinerAgent"}
+
+SENTENCES = [
+    f"Sentence {i}: the keeper {verb} the lamp while the {noun} pressed against the salt-streaked glass of the tower."
+    for i, (verb, noun) in enumerate(
+        zip(
+            ["polished", "trimmed", "checked", "relit", "watched", "guarded", "tended", "shielded", "steadied", "cleaned",
+             "turned", "fed"],
+            ["storm", "fog", "night", "wind", "sea", "rain", "dark", "gale", "swell", "spray", "cold", "tide"],
+        )
+    )
+]
+REVISED = {
+    2: "Sentence 2: her hands shook as she checked the wick, because the last supply boat had not come and the oil was almost gone.",
+    7: "Sentence 7: when the gale finally tore the shutter away she held the lamp steady with both arms until the boats were safe.",
+}
+
+
+def story(revised: set[int]) -> str:
+    return " ".join(REVISED[i] if i in revised else s for i, s in enumerate(SENTENCES))
+
+
+def edits(index: int) -> str:
+    return json.dumps({"edits": [{"find": SENTENCES[index], "replace": REVISED[index]}]})
+
+
+def scripts(fallback: bool) -> dict:
+    critiques = ["Sentence 2 is flat: show what is at stake.", "Sentence 7 needs a climax."]
+    return {
+        "InitialWriterAgent": [story(set())],
+        "CriticAgent": critiques,
+        "RefinerAgent": [story({2}), story({2, 7})],
+        # With --fallback the first edit list targets text that is not in the draft.
+        "RefinerEditorAgent": [
+            json.dumps({"edits": [{"find": "not in the story", "replace": "x"}]}) if fallback else edits(2),
+            edits(7),
+        ],
+    }
+
+
+async def run_once(root_agent, llm: FakeLlm) -> tuple[str, list[dict]]:
+    """Runs the pipeline once; returns the final story and per-iteration refiner stats."""
+    runner = InMemoryRunner(agent=root_agent, app_name="refinement_benchmark")
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id="bench")
+    message = types.Content(role="user", parts=[types.Part(text="Write a story about a lighthouse keeper.")])
+    iterations, current = [], None
+    with use_fake_llm(root_agent, llm):
+        async for event in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+            now = time.perf_counter()
+            if event.author == "CriticAgent" and event.is_final_response():
+                current = {"started": now, "output_tokens": 0, "prompt_tokens": 0, "model_calls": 0}
+            elif current is not None and event.author in REFINER_AUTHORS:
+                if event.usage_metadata:
+                    current["output_tokens"] += event.usage_metadata.candidates_token_count or 0
+                    current["prompt_tokens"] += event.usage_metadata.prompt_token_count or 0
+                    current["model_calls"] += 1
+                if "current_story" in event.actions.state_delta:
+                    current["wall_s"] = now - current.pop("started")
+                    iterations.append(current)
+                    current = None
+    session = await runner.session_service.get_session(app_name=runner.app_name, user_id="bench", session_id=session.id)
+    return session.state["current_story"], iterations
+
+
+def benchmark(mode: str, fallback: bool, runs: int, latency_s: float, per_token_latency_s: float) -> dict:
+    os.environ["REFINEMENT_MODE"] = mode
+    root_agent = importlib.reload(importlib.import_module(MODULE)).root_agent
+    all_iterations, final = [], None
+    for _ in range(runs):
+        llm = FakeLlm(script=scripts(fallback), latency_s=latency_s, per_token_latency_s=per_token_latency_s)
+        final, iterations = asyncio.run(run_once(root_agent, llm))
+        all_iterations += iterations
+    return {
+        "mode": mode + (" (fallback)" if fallback else ""),
+        "iterations": len(all_iterations) // runs,
+        "output_tokens": statistics.mean(i["output_tokens"] for i in all_iterations),
+        "prompt_tokens": statistics.mean(i["prompt_tokens"] for i in all_iterations),
+        "model_calls": statistics.mean(i["model_calls"] for i in all_iterations),
+        "wall_ms": statistics.median(i["wall_s"] for i in all_iterations) * 1000,
+        "correct": final == story({2, 7}),
+    }
+
+
+def main(args: argparse.Namespace):
+    results = [
+        benchmark("rewrite", False, args.runs, args.latency, args.per_token_latency),
+        benchmark("edits", False, args.runs, args.latency, args.per_token_latency),
+        benchmark("edits", True, args.runs, args.latency, args.per_token_latency),
+    ]
+    print("Per refinement iteration (mean tokens, median wall time):")
+    print(f"{'mode':<18}{'iters':>6}{'out tok':>9}{'prompt tok':>12}{'calls':>7}{'wall ms':>9}  final story")
+    for r in results:
+        print(
+            f"{r['mode']:<18}{r['iterations']:>6}{r['output_tokens']:>9.0f}{r['prompt_tokens']:>12.0f}"
+            f"{r['model_calls']:>7.1f}{r['wall_ms']:>9.1f}  {'ok' if r['correct'] else 'MISMATCH'}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare full-rewrite and edit-list refinement.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fixed seconds per model call.")
+    parser.add_argument("--per-token-latency", type=float, default=0.005, help="Seconds per output token.")
+    main(parser.parse_args())
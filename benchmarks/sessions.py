@@ -0,0 +1,102 @@
+# Appended events/sec and get_session latency: stock DatabaseSessionService on SQLite vs
+# TunedSqliteSessionService (common/sqlite_sessions.py), with many sessions writing at once.
+#
+# Run from the repository root:
+#   python -m benchmarks.sessions --sessions 32 --turns 10
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from common.sqlite_sessions import TunedSqliteSessionService, build_session_service
+
+
+APP_NAME = "StatefulApp"
+
+
+def turn_events(session_index: int, turn: int) -> list[Event]:
+    """A chat turn: the user message, a tool call, its response (with a state update) and the answer."""
+    invocation_id = f"inv-{session_index}-{turn}"
+
+    def event(author: str, part: types.Part, **kwargs) -> Event:
+        role = "user" if author == "user" else "model"
+        return Event(invocation_id=invocation_id, author=author, content=types.Content(role=role, parts=[part]), **kwargs)
+
+    return [
+        event("user", types.Part(text=f"Question {turn} from session {session_index}")),
+        event("text_chat_bot", types.Part(function_call=types.FunctionCall(name="lookup", args={"turn": turn}))),
+        event(
+            "text_chat_bot",
+            types.Part(function_response=types.FunctionResponse(name="lookup", response={"result": turn})),
+            actions=EventActions(state_delta={"last_turn": turn, "user:turns": turn + 1}),
+        ),
+        event("text_chat_bot", types.Part(text=f"Answer {turn}: " + "lorem ipsum " * 20)),
+    ]
+
+
+async def run(service, sessions: int, turns: int) -> dict:
+    user_ids = [f"user-{i}" for i in range(sessions)]
+    created = [
+        await service.create_session(app_name=APP_NAME, user_id=user_ids[i], session_id=f"s{i}")
+        for i in range(sessions)
+    ]
+
+    async def chat(index: int):
+        for turn in range(turns):
+            # Like the Runner: reload the session at the start of every turn, then append its events.
+            session = await service.get_session(app_name=APP_NAME, user_id=user_ids[index], session_id=created[index].id)
+            for event in turn_events(index, turn):
+                await service.append_event(session, event)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(i) for i in range(sessions)))
+    if isinstance(service, TunedSqliteSessionService):
+        await service.flush()
+    write_s = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(3):
+        for index in range(sessions):
+            started = time.perf_counter()
+            session = await service.get_session(app_name=APP_NAME, user_id=user_ids[index], session_id=created[index].id)
+            latencies.append(time.perf_counter() - started)
+            assert len(session.events) == turns * 4 and session.state["user:turns"] == turns
+    latencies.sort()
+    if isinstance(service, TunedSqliteSessionService):
+        await service.close()
+    else:
+        await service.db_engine.dispose()
+    return {
+        "events_per_s": sessions * turns * 4 / write_s,
+        "get_p50_ms": statistics.median(latencies) * 1000,
+        "get_p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main(args: argparse.Namespace):
+    profiles = [
+        ("default", {}),
+        ("tuned, synchronous=FULL", {"synchronous": "FULL"}),
+        ("tuned, no group commit", {"group_commit": False}),
+        ("tuned", {}),
+    ]
+    print(f"{args.sessions} concurrent sessions x {args.turns} turns x 4 events")
+    print(f"{'profile':<28}{'events/s':>10}{'get p50 ms':>12}{'get p95 ms':>12}")
+    for label, kwargs in profiles:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sessions.db")
+            service = build_session_service(path, "default" if label == "default" else "tuned", **kwargs)
+            stats = asyncio.run(run(service, args.sessions, args.turns))
+        print(f"{label:<28}{stats['events_per_s']:>10.0f}{stats['get_p50_ms']:>12.2f}{stats['get_p95_ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SQLite session service profiles.")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=10)
+    main(parser.parse_args())
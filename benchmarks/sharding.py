@@ -0,0 +1,180 @@
+# Write throughput of ShardedSessionService (common/sharded_sessions.py) as shards are added.
+#
+# Several worker processes (like the workers of a multi-tenant deployment) chat for their users at once;
+# every user's turns go to the shard the map routes them to. With one shard all workers share one SQLite
+# write lock; with more shards, writers of different users commit in parallel. The gain needs a core per
+# worker and shows most when commits wait on the disk (--synchronous FULL --no-group-commit); with fewer
+# cores than workers, throughput is bounded by CPU whatever the number of shards.
+#
+# Besides throughput, every run reports the process CPU time per event and how long a shard's write lock was
+# held per event (from BEGIN IMMEDIATE until the connection is returned after the commit). One shard can
+# commit at most 1 / lock-hold events per second, and W workers on W cores can produce at most
+# W / CPU events per second. So on a host with a core per worker, S shards can be at most
+# min(W / CPU, S / lock-hold) / min(W / CPU, 1 / lock-hold) times as fast as one shard ("ceiling", from the
+# first run, which should use one shard). With more shards, lock-hold adds up overlapping holds of
+# different shards, so it is no longer the time per event on one lock.
+#
+# Run from the repository root:
+#   python -m benchmarks.sharding --shards 1,2,4,8 --workers 8 --users 64 --turns 10
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.sessions import turn_events
+from common.sharded_sessions import ShardedSessionService, ShardMap
+
+
+APP_NAME = "StatefulApp"
+
+
+def track_write_locks(service: ShardedSessionService) -> dict[str, float]:
+    """Sums the wall time the shards' write locks are held by this process into the returned dict."""
+    held = {"s": 0.0}
+    for shard in service.shards.values():
+        engine = shard.db_engine.sync_engine
+        acquired: dict[str, float] = {}
+
+        def after_execute(connection, cursor, statement, *args, acquired=acquired):
+            if statement == "BEGIN IMMEDIATE":
+                acquired["at"] = time.perf_counter()
+
+        def checkin(dbapi_connection, record, acquired=acquired):
+            at = acquired.pop("at", None)
+            if at is not None:
+                held["s"] += time.perf_counter() - at
+
+        sa_event.listen(engine, "after_cursor_execute", after_execute)
+        sa_event.listen(engine, "checkin", checkin)
+    return held
+
+
+async def chat(map_path: str, user_ids: list[str], turns: int, start, service_kwargs: dict) -> tuple[float, ...]:
+    """Returns (start, end, process CPU seconds, write-lock seconds, lock timeouts) of this worker."""
+    service = ShardedSessionService(map_path, **service_kwargs)
+    timeouts = 0
+
+    # SQLite's write lock is not fair: with many writer processes per CPU, a writer can wait past
+    # busy_timeout ("database is locked"). Retry as an app would.
+    async def retry(call):
+        nonlocal timeouts
+        while True:
+            try:
+                return await call()
+            except OperationalError:
+                timeouts += 1
+
+    async def append(session, event):
+        # An event that made it into the session stays buffered and is written by the next flush.
+        nonlocal timeouts
+        while True:
+            try:
+                await service.append_event(session, event)
+                return
+            except OperationalError:
+                timeouts += 1
+                if session.events and session.events[-1] is event:
+                    return
+
+    async def user_chat(index: int, user_id: str):
+        for turn in range(turns):
+            session = await retry(lambda: service.get_session(app_name=APP_NAME, user_id=user_id, session_id="s"))
+            for event in turn_events(index, turn):
+                await append(session, event)
+
+    try:
+        await retry(service.create_tables)  # Each process checks the tables once (a write transaction).
+        held = track_write_locks(service)
+        start.wait()
+        started, cpu_started, timeouts = time.time(), time.process_time(), 0
+        await asyncio.gather(*(user_chat(i, user_id) for i, user_id in enumerate(user_ids)))
+        await retry(service.flush)
+        return started, time.time(), time.process_time() - cpu_started, held["s"], timeouts
+    finally:
+        await service.close()
+
+
+def worker(map_path: str, user_ids: list[str], turns: int, start, results, service_kwargs: dict):
+    try:
+        results.put(asyncio.run(chat(map_path, user_ids, turns, start, service_kwargs)))
+    except Exception as e:
+        results.put(e)
+        raise
+
+
+async def create_sessions(map_path: str, user_ids: list[str]):
+    # Up front: creating tables and the first app state row is not safe to race across processes.
+    service = ShardedSessionService(map_path)
+    try:
+        await service.create_tables()
+        for user_id in user_ids:
+            await service.create_session(app_name=APP_NAME, user_id=user_id, session_id="s")
+    finally:
+        await service.close()
+
+
+def run(shards: int, workers: int, users: int, turns: int, service_kwargs: dict) -> tuple[float, float, float, int]:
+    """Appended events/sec over all workers, process CPU and write-lock hold time per event (ms), lock timeouts."""
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        map_path = os.path.join(directory, "shards.json")
+        ShardMap.create(map_path, shards)
+        user_ids = [f"user-{i}" for i in range(users)]
+        asyncio.run(create_sessions(map_path, user_ids))
+        start, results = context.Barrier(workers), context.Queue()
+        processes = [
+            context.Process(target=worker, args=(map_path, user_ids[w::workers], turns, start, results, service_kwargs))
+            for w in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            spans = [results.get(timeout=600) for _ in processes]
+            for span in spans:
+                if isinstance(span, Exception):
+                    raise span
+        finally:
+            for process in processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+    events = users * turns * 4
+    elapsed = max(span[1] for span in spans) - min(span[0] for span in spans)
+    cpu_ms, lock_ms = (sum(span[i] for span in spans) / events * 1000 for i in (2, 3))
+    return events / elapsed, cpu_ms, lock_ms, sum(span[4] for span in spans)
+
+
+def main(args: argparse.Namespace):
+    service_kwargs = {"synchronous": args.synchronous, "group_commit": not args.no_group_commit}
+    print(
+        f"{args.workers} worker processes ({os.cpu_count()} CPUs), "
+        f"{args.users} users x {args.turns} turns x 4 events"
+    )
+    print(f"shard settings: {service_kwargs}")
+    print(f"{'shards':<8}{'events/s':>10}{'speedup':>9}{'CPU ms/ev':>11}{'lock ms/ev':>12}{'ceiling':>9}{'timeouts':>10}")
+    baseline = None
+    for shards in (int(count) for count in args.shards.split(",")):
+        events_per_s, cpu_ms, lock_ms, timeouts = run(shards, args.workers, args.users, args.turns, service_kwargs)
+        if baseline is None:
+            baseline, cpu_bound, lock_bound = events_per_s, args.workers / cpu_ms, 1 / lock_ms
+        ceiling = min(cpu_bound, shards * lock_bound) / min(cpu_bound, lock_bound)
+        print(
+            f"{shards:<8}{events_per_s:>10.0f}{events_per_s / baseline:>8.2f}x"
+            f"{cpu_ms:>11.3f}{lock_ms:>12.3f}{ceiling:>8.2f}x{timeouts:>10}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark write scaling of sharded session storage.")
+    parser.add_argument("--shards", default="1,2,4,8")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--synchronous", default="NORMAL", help="SQLite synchronous level of every shard")
+    parser.add_argument("--no-group-commit", action="store_true", help="Commit every event on its own")
+    main(parser.parse_args())
@@ -0,0 +1,146 @@
+# Orders/sec of the shipping coordinator (day2/human_in_the_loop): one order at a time, as
+# run_shipping_workflow does, vs ShippingWorkflowDriver with bounded concurrency, each with every
+# order sent to the model (LLM path) or small structured orders placed by FastPathRouter (fast path).
+#
+# Run from the repository root:
+#   python -m benchmarks.shipping --orders 500 --large-ratio 0.1 --latency 0.05
+import argparse
+import asyncio
+import os
+import random
+import re
+import tempfile
+import time
+import warnings
+from typing import AsyncGenerator
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from common.fake_llm import FakeLlm, use_fake_llm
+from day2.human_in_the_loop.agent import LARGE_ORDER_THRESHOLD, app
+from day2.human_in_the_loop.approvals import ApprovalQueue
+from day2.human_in_the_loop.workflow import ShippingWorkflowDriver
+
+
+warnings.filterwarnings("ignore", message=r"\[EXPERIMENTAL\]")
+
+ORDER_PATTERN = re.compile(r"(\d+) containers? to (.+)$", re.IGNORECASE)
+DESTINATIONS = ["Singapore", "Rotterdam", "Los Angeles", "Shanghai", "Hamburg", "Santos", "Mumbai"]
+
+
+class ShippingFakeLlm(FakeLlm):
+    """Answers per request rather than from a script, so concurrent sessions do not mix replies:
+    a user order becomes a place_shipping_order call, a tool result becomes a one-line summary."""
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        last = llm_request.contents[-1].parts[-1]
+        if last.function_response:
+            reply = self._summary(last.function_response.response or {})
+            part = types.Part(text=reply)
+        else:
+            count, destination = ORDER_PATTERN.search(last.text or "").groups()
+            part = types.Part(
+                function_call=types.FunctionCall(
+                    name="place_shipping_order", args={"num_containers": int(count), "destination": destination}
+                )
+            )
+        self.calls["shipping_agent"] = self.calls.get("shipping_agent", 0) + 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        yield LlmResponse(content=types.Content(role="model", parts=[part]), turn_complete=True)
+
+    def _summary(self, response: dict) -> str:
+        if response.get("status") == "pending":
+            return f"{response.get('message')}. Waiting for approval."
+        return f"Order {response.get('status')}: {response.get('message')} ({response.get('order_id', 'no id')})."
+
+
+def make_orders(n: int, large_ratio: float, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    orders = []
+    for _ in range(n):
+        large = rng.random() < large_ratio
+        count = rng.randint(LARGE_ORDER_THRESHOLD + 1, 40) if large else rng.randint(1, LARGE_ORDER_THRESHOLD)
+        orders.append(f"Ship {count} containers to {rng.choice(DESTINATIONS)}")
+    return orders
+
+
+async def drive(orders: list[str], concurrency: int) -> dict:
+    runner = Runner(app=app, session_service=InMemorySessionService())
+    driver = ShippingWorkflowDriver(runner, concurrency=concurrency)
+    started = time.perf_counter()
+    statuses: dict[str, int] = {}
+    async for result in driver.run_orders(orders):
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+    return {"wall_s": time.perf_counter() - started, "statuses": statuses}
+
+
+async def approvals_round(orders: list[str], max_parallel: int, timeout_s: float) -> dict:
+    """Parks the large orders in a durable queue, bulk-approves the ones up to 20 containers, "restarts"
+    (new queue and driver on the same file and sessions), lets the rest time out and resumes everything."""
+    runner = Runner(app=app, session_service=InMemorySessionService())
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "approvals.db")
+        driver = ShippingWorkflowDriver(runner, concurrency=64, approvals=ApprovalQueue(path, timeout_s=timeout_s))
+        async for _ in driver.run_orders(orders):
+            pass
+        pending = driver.approvals.list_pending()
+        approved = driver.approvals.approve(
+            [r.approval.approval_id for r in pending if r.approval.payload["num_containers"] <= 20]
+        )
+
+        queue = ApprovalQueue(path, timeout_s=timeout_s)
+        driver = ShippingWorkflowDriver(runner, concurrency=64, approvals=queue)
+        await asyncio.sleep(max(0.0, max(r.deadline for r in pending) - time.time()) if pending else 0)
+        started = time.perf_counter()
+        results = await driver.resume_decided(max_parallel=max_parallel)
+        return {
+            "parked": len(pending),
+            "approved": len(approved),
+            "resumed": len(results),
+            "failed": sum(r.status == "failed" for r in results),
+            "counts": queue.counts(),
+            "resume_s": time.perf_counter() - started,
+        }
+
+
+def main(args: argparse.Namespace):
+    orders = make_orders(args.orders, args.large_ratio)
+    print(f"{args.orders} orders ({args.large_ratio:.0%} large), {args.latency * 1000:g} ms per model call")
+    print(f"{'mode':<34}{'wall s':>8}{'orders/s':>10}{'orders/h':>12}{'calls/order':>13}  statuses")
+    for fast_path in (False, True):
+        app.root_agent.fast_path = fast_path
+        for label, concurrency in [("one at a time", 1)] + [(f"driver x{c}", c) for c in args.concurrency]:
+            llm = ShippingFakeLlm(latency_s=args.latency)
+            with use_fake_llm(app.root_agent, llm):
+                stats = asyncio.run(drive(orders, concurrency))
+            rate = args.orders / stats["wall_s"]
+            label = f"{'fast path' if fast_path else 'LLM path'}, {label}"
+            print(
+                f"{label:<34}{stats['wall_s']:>8.2f}{rate:>10.1f}{rate * 3600:>12,.0f}"
+                f"{sum(llm.calls.values()) / args.orders:>13.2f}  {stats['statuses']}"
+            )
+
+    print("\nDurable approval queue: bulk approve, restart, auto-reject at the deadline, batched resume")
+    print(f"{'max parallel':<14}{'parked':>8}{'approved':>10}{'resumed':>9}{'resume s':>10}  queue")
+    for max_parallel in args.resume_parallel:
+        with use_fake_llm(app.root_agent, ShippingFakeLlm(latency_s=args.latency)):
+            stats = asyncio.run(approvals_round(orders, max_parallel, args.approval_timeout))
+        print(
+            f"{max_parallel:<14}{stats['parked']:>8}{stats['approved']:>10}{stats['resumed']:>9}"
+            f"{stats['resume_s']:>10.2f}  {stats['counts']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent shipping order processing.")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--large-ratio", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake model call.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 64])
+    parser.add_argument("--resume-parallel", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--approval-timeout", type=float, default=1.0, help="Seconds before auto-reject.")
+    main(parser.parse_args())
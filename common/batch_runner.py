@@ -0,0 +1,272 @@
+# Pipelined batch execution of a SequentialAgent over many inputs.
+#
+#   PYTHONPATH=. python -m common.batch_runner day1.blog_post.agent topics.txt \
+#       --concurrency OutlineAgent=2 --concurrency WriterAgent=4 --resume blog_batch.jsonl
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from typing import AsyncIterable, AsyncIterator, Iterable
+
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext, new_invocation_context_id
+from google.adk.agents.run_config import RunConfig
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.genai import types
+
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class BatchResult:
+    index: int
+    input: str
+    outputs: dict = field(default_factory=dict)
+    error: str | None = None
+    resumed: bool = False  # Loaded from the resume file instead of being run again
+    elapsed_s: float = 0.0
+
+
+@dataclass
+class _Item:
+    index: int
+    input: str
+    session: Session | None = None
+    invocation_id: str = ""
+    started: float = 0.0
+    error: str | None = None
+
+
+def _output_keys(agent: BaseAgent) -> list[str]:
+    keys = [agent.output_key] if isinstance(agent, LlmAgent) and agent.output_key else []
+    for sub_agent in agent.sub_agents:
+        keys += _output_keys(sub_agent)
+    return keys
+
+
+class BatchRunner:
+    """Runs a SequentialAgent over many inputs with its stages pipelined.
+
+    Every sub-agent of the pipeline is a stage with its own workers (`stage_concurrency`,
+    per stage name or one number for all; stages not named get `default_concurrency`) and
+    a bounded queue (`queue_size`) in front of it, so stage 1 works on input N+1 while
+    stage 2 works on input N. Each input gets its own session and invocation, exactly as
+    if the SequentialAgent had run it alone.
+
+    Results are streamed in input order (`ordered=True`) or as they finish. With a
+    `resume_path`, finished inputs are appended to a JSONL file and skipped (their stored
+    results are emitted again) when the batch is restarted.
+    """
+
+    def __init__(
+        self,
+        pipeline: SequentialAgent,
+        *,
+        app_name: str | None = None,
+        stage_concurrency: int | dict[str, int] = 1,
+        default_concurrency: int = 1,
+        queue_size: int = 4,
+        ordered: bool = True,
+        resume_path: str | None = None,
+        session_service: BaseSessionService | None = None,
+        user_id: str = "batch",
+    ):
+        self.pipeline = pipeline
+        self.stages = list(pipeline.sub_agents)
+        self.app_name = app_name or pipeline.name
+        if isinstance(stage_concurrency, int):
+            stage_concurrency = {stage.name: stage_concurrency for stage in self.stages}
+        self.stage_concurrency = [max(1, stage_concurrency.get(stage.name, default_concurrency)) for stage in self.stages]
+        self.queue_size = queue_size
+        self.ordered = ordered
+        self.resume_path = resume_path
+        self.session_service = session_service or InMemorySessionService()
+        self.artifact_service = InMemoryArtifactService()
+        self.user_id = user_id
+        self.output_keys = _output_keys(pipeline)
+
+    def load_completed(self) -> dict[int, dict]:
+        """input index -> {"input", "outputs"} of the finished inputs, from the resume file.
+
+        Keyed by position, not by text, so duplicate inputs are each run and stored once.
+        """
+        completed = {}
+        if self.resume_path and os.path.exists(self.resume_path):
+            with open(self.resume_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A line cut off by the interruption.
+                    if isinstance(record.get("index"), int):
+                        completed[record["index"]] = record
+        return completed
+
+    def _record(self, result: BatchResult):
+        if not self.resume_path or result.error or result.resumed:
+            return
+        record = {"index": result.index, "input": result.input, "outputs": result.outputs}
+        with open(self.resume_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    async def _start(self, item: _Item):
+        item.started = time.perf_counter()
+        item.invocation_id = new_invocation_context_id()
+        item.session = await self.session_service.create_session(app_name=self.app_name, user_id=self.user_id)
+        await self.session_service.append_event(
+            item.session,
+            Event(invocation_id=item.invocation_id, author="user", content=self._message(item.input)),
+        )
+
+    def _message(self, text: str) -> types.Content:
+        return types.Content(role="user", parts=[types.Part(text=text)])
+
+    async def _run_stage(self, stage: BaseAgent, item: _Item):
+        ctx = InvocationContext(
+            session_service=self.session_service,
+            artifact_service=self.artifact_service,
+            invocation_id=item.invocation_id,
+            agent=stage,
+            session=item.session,
+            user_content=self._message(item.input),
+            run_config=RunConfig(),
+        )
+        async for event in stage.run_async(ctx):
+            if not event.partial:
+                await self.session_service.append_event(item.session, event)
+
+    async def _finish(self, item: _Item) -> BatchResult:
+        result = BatchResult(index=item.index, input=item.input, error=item.error)
+        if item.session is not None:
+            state = item.session.state
+            result.outputs = {key: state[key] for key in self.output_keys if key in state}
+            await self.session_service.delete_session(
+                app_name=self.app_name, user_id=self.user_id, session_id=item.session.id
+            )
+        result.elapsed_s = time.perf_counter() - item.started
+        return result
+
+    async def run(self, inputs: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[BatchResult]:
+        completed = self.load_completed()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def feed():
+            index = 0
+            async for text in _aiter(inputs):
+                record = completed.get(index)
+                if record is not None and record["input"] == text:  # A changed inputs file reruns the line.
+                    await results.put(BatchResult(index=index, input=text, outputs=record["outputs"], resumed=True))
+                else:
+                    await queues[0].put(_Item(index=index, input=text))
+                index += 1
+            await results.put(("total", index))
+            for _ in range(self.stage_concurrency[0]):
+                await queues[0].put(_STOP)
+
+        async def work(stage_index: int):
+            stage = self.stages[stage_index]
+            is_last = stage_index == len(self.stages) - 1
+            while (item := await queues[stage_index].get()) is not _STOP:
+                if item.error is None:
+                    try:
+                        if item.session is None:
+                            await self._start(item)
+                        await self._run_stage(stage, item)
+                    except Exception as e:
+                        logger.exception("%s failed on input %d", stage.name, item.index)
+                        item.error = f"{stage.name}: {e}"
+                if is_last:
+                    await results.put(await self._finish(item))
+                else:
+                    await queues[stage_index + 1].put(item)
+
+        async def stage_workers(stage_index: int):
+            await asyncio.gather(*(work(stage_index) for _ in range(self.stage_concurrency[stage_index])))
+            if stage_index + 1 < len(self.stages):
+                for _ in range(self.stage_concurrency[stage_index + 1]):
+                    await queues[stage_index + 1].put(_STOP)
+
+        async def report_errors(coro):
+            try:
+                await coro
+            except Exception as e:  # Unblock the consumer instead of hanging on `results`.
+                await results.put(("error", e))
+                raise
+
+        tasks = [asyncio.create_task(report_errors(feed()))] + [
+            asyncio.create_task(report_errors(stage_workers(i))) for i in range(len(self.stages))
+        ]
+        try:
+            total, emitted, next_index, pending = None, 0, 0, {}
+            while total is None or emitted < total:
+                result = await results.get()
+                if isinstance(result, tuple):
+                    kind, value = result
+                    if kind == "error":
+                        raise value
+                    total = value
+                    continue
+                self._record(result)
+                if not self.ordered:
+                    emitted += 1
+                    yield result
+                    continue
+                pending[result.index] = result
+                while next_index in pending:
+                    emitted += 1
+                    yield pending.pop(next_index)
+                    next_index += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _aiter(inputs: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[str]:
+    if hasattr(inputs, "__aiter__"):
+        async for item in inputs:
+            yield item
+    else:
+        for item in inputs:
+            yield item
+
+
+async def _main(args: argparse.Namespace):
+    pipeline = importlib.import_module(args.module).root_agent
+    concurrency = {name: int(n) for name, n in (c.split("=", 1) for c in args.concurrency)}
+    runner = BatchRunner(
+        pipeline,
+        stage_concurrency=concurrency,
+        default_concurrency=args.default_concurrency,
+        queue_size=args.queue_size,
+        ordered=not args.unordered,
+        resume_path=args.resume,
+    )
+    with open(args.inputs, encoding="utf-8") as f:
+        topics = [line.strip() for line in f if line.strip()]
+    async for result in runner.run(topics):
+        print(json.dumps(asdict(result), ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a SequentialAgent pipeline over many inputs (one per line).")
+    parser.add_argument("module", help="Module with a SequentialAgent `root_agent`, e.g. day1.blog_post.agent")
+    parser.add_argument("inputs", help="Text file with one input (topic) per line.")
+    parser.add_argument("--concurrency", action="append", default=[], metavar="STAGE=N")
+    parser.add_argument("--default-concurrency", type=int, default=1)
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--unordered", action="store_true", help="Emit results as they finish.")
+    parser.add_argument("--resume", help="JSONL file of finished inputs; finished inputs are skipped on restart.")
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    asyncio.run(_main(parser.parse_args()))
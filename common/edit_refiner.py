@@ -0,0 +1,117 @@
+import logging
+import os
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from pydantic import BaseModel
+from typing_extensions import override
+
+from common.json_output import validate_output
+from common.loop_control import ExitCondition
+
+
+logger = logging.getLogger(__name__)
+
+EDIT_LIST_FORMAT = """Output ONLY JSON, no prose:
+{"edits": [{"find": "<exact text copied from the draft>", "replace": "<new text>"}]}
+- Each "find" must appear exactly once in the draft; keep it short but unique.
+- To insert text, include the neighbouring words in both "find" and "replace"; to delete, use "replace": "".
+- Use as few edits as needed. If nothing should change, output {"edits": []}."""
+
+
+def refinement_mode() -> str:
+    """REFINEMENT_MODE: "edits" (default) or "rewrite" (the refiner returns the whole text every time)."""
+    return os.getenv("REFINEMENT_MODE", "edits")
+
+
+class Edit(BaseModel):
+    find: str
+    replace: str
+
+
+class EditList(BaseModel):
+    edits: list[Edit]
+
+
+def no_edits(key: str) -> ExitCondition:
+    """The editor's edit list in `key` is empty: the draft has converged.
+
+    Use this instead of `similar_to_previous` in edit mode; a single edited sentence barely
+    moves the similarity ratio of a long draft, so the ratio would stop the loop too early.
+    """
+
+    def empty(value: str, _) -> bool:
+        edit_list, _error = validate_output(value, EditList)
+        return edit_list is not None and not edit_list.edits
+
+    return ExitCondition(key, empty, f"{key} has no edits")
+
+
+def apply_edits(text: str, edits: list[Edit]) -> str:
+    """Applies span replacements in order. Raises ValueError if a span is missing or ambiguous."""
+    for edit in edits:
+        if not edit.find:
+            raise ValueError("empty find")
+        count = text.count(edit.find)
+        if count != 1:
+            raise ValueError(f"{'missing' if not count else 'ambiguous'} span: {edit.find[:60]!r}")
+        text = text.replace(edit.find, edit.replace, 1)
+    if not text.strip():
+        raise ValueError("edits left the text empty")
+    return text
+
+
+class EditRefinerAgent(BaseAgent):
+    """Refines the text in `text_key` with a small edit list instead of a full rewrite.
+
+    Sub-agents: `[editor, rewriter]`. The editor returns an `EditList` (its output_key is
+    `edits_key`), which is applied in code and written to `text_key`. Only if the edit list
+    does not parse or does not apply does the rewriter (a full-rewrite LlmAgent whose
+    output_key is `text_key`) run.
+    """
+
+    text_key: str
+    edits_key: str
+
+    @override
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        editor, rewriter = self.sub_agents
+        async for event in editor.run_async(ctx):
+            yield event
+
+        text = ctx.session.state.get(self.text_key) or ""
+        edit_list, error = validate_output(ctx.session.state.get(self.edits_key), EditList)
+        patched = None
+        if edit_list is not None:
+            try:
+                patched = apply_edits(text, edit_list.edits)
+            except ValueError as e:
+                error = str(e)
+        if patched is not None:
+            # The patched text is also the event's content, so the conversation and the final response
+            # show the refined draft, as they do when the rewriter answers.
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text=patched)]),
+                actions=EventActions(state_delta={self.text_key: patched}),
+            )
+            return
+
+        logger.info("%s: edit list rejected (%s), falling back to %s", self.name, error, rewriter.name)
+        async for event in rewriter.run_async(ctx):
+            yield event
+
+
+def edit_refiner(name: str, editor: LlmAgent, rewriter: LlmAgent, text_key: str) -> EditRefinerAgent:
+    return EditRefinerAgent(
+        name=name,
+        description=rewriter.description,
+        sub_agents=[editor, rewriter],
+        text_key=text_key,
+        edits_key=editor.output_key,
+    )
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import AsyncGenerator, Iterator
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.tools import AgentTool
+from google.genai import types
+from pydantic import Field, field_validator
+
+
+AGENT_NAME_PATTERN = re.compile(r'Your internal name is "(?P<name>[^"]+)"')
+FILLER_WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")
+
+
+@dataclass
+class FakeReply:
+    """One scripted model turn: either plain text or a single function call."""
+
+    text: str | None = None
+    function_call: dict | None = None  # {"name": "...", "args": {...}}
+    output_tokens: int | None = None
+    latency_s: float | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict | str) -> "FakeReply":
+        if isinstance(data, str):
+            return cls(text=data)
+        return cls(
+            text=data.get("text"),
+            function_call=data.get("function_call"),
+            output_tokens=data.get("output_tokens"),
+            latency_s=data.get("latency_s"),
+        )
+
+
+class FakeLlm(BaseLlm):
+    """Deterministic offline stand-in for `Gemini(...)`.
+
+    Replies are looked up by the calling agent's name (ADK puts it in the system
+    instruction) and replayed in order; when an agent's script runs out it starts
+    again from the top. Agents without a script get filler text of `output_tokens` words.
+
+    Example:
+        fake = FakeLlm(script={"OutlineAgent": ["# Headline ..."]}, latency_s=0.2)
+        with use_fake_llm(root_agent, fake):
+            ...
+    """
+
+    model: str = "gemini-2.5-flash-lite"
+    script: dict[str, list[FakeReply]] = Field(default_factory=dict)
+    latency_s: float = 0.0
+    per_token_latency_s: float = 0.0
+    output_tokens: int = 64
+    calls: dict[str, int] = Field(default_factory=dict)  # Model calls made per agent name
+
+    @field_validator("script", mode="before")
+    @classmethod
+    def _parse_script(cls, script: dict) -> dict:
+        return {
+            agent_name: [r if isinstance(r, FakeReply) else FakeReply.from_dict(r) for r in replies]
+            for agent_name, replies in script.items()
+        }
+
+    @classmethod
+    def from_recording(cls, path: str, **kwargs) -> "FakeLlm":
+        """Builds a FakeLlm from a JSON file of `{"AgentName": [reply, ...]}`."""
+        with open(path, encoding="utf-8") as f:
+            return cls(script=json.load(f), **kwargs)
+
+    def next_reply(self, agent_name: str) -> FakeReply:
+        call_index = self.calls.get(agent_name, 0)
+        self.calls[agent_name] = call_index + 1
+
+        replies = self.script.get(agent_name)
+        if replies:
+            return replies[call_index % len(replies)]
+        words = [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(self.output_tokens)]
+        return FakeReply(text=f"[{agent_name}] " + " ".join(words))
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        agent_name = get_agent_name(llm_request)
+        reply = self.next_reply(agent_name)
+
+        if reply.function_call:
+            part = types.Part(
+                function_call=types.FunctionCall(
+                    name=reply.function_call["name"],
+                    args=reply.function_call.get("args", {}),
+                )
+            )
+            output_tokens = reply.output_tokens or 16
+        else:
+            part = types.Part(text=reply.text or "")
+            output_tokens = reply.output_tokens or estimate_tokens(reply.text or "")
+
+        latency = self.latency_s if reply.latency_s is None else reply.latency_s
+        latency += self.per_token_latency_s * output_tokens
+        if latency:
+            await asyncio.sleep(latency)
+
+        prompt_tokens = estimate_tokens(request_text(llm_request))
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+            turn_complete=True,
+        )
+
+
+class RecordingLlm(BaseLlm):
+    """Wraps a real model and records its final replies per agent for `FakeLlm.from_recording`."""
+
+    llm: BaseLlm
+    recording: dict[str, list[dict]] = Field(default_factory=dict)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        agent_name = get_agent_name(llm_request)
+        async for response in self.llm.generate_content_async(llm_request, stream=stream):
+            if not response.partial and response.content and response.content.parts:
+                part = response.content.parts[0]
+                if part.function_call:
+                    reply = {"function_call": {"name": part.function_call.name, "args": part.function_call.args or {}}}
+                else:
+                    reply = {"text": part.text or ""}
+                self.recording.setdefault(agent_name, []).append(reply)
+            yield response
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.recording, f, indent=2, ensure_ascii=False)
+
+
+def get_agent_name(llm_request: LlmRequest) -> str:
+    """Returns the calling agent's name from the request labels or system instruction."""
+    labels = llm_request.config.labels or {}
+    if "adk_agent_name" in labels:
+        return labels["adk_agent_name"]
+    match = AGENT_NAME_PATTERN.search(str(llm_request.config.system_instruction or ""))
+    return match.group("name") if match else ""
+
+
+def request_text(llm_request: LlmRequest) -> str:
+    """Concatenates the system instruction and all text parts of the request."""
+    texts = [str(llm_request.config.system_instruction or "")]
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                texts.append(part.text)
+    return "\n".join(texts)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for benchmarks."""
+    return max(1, len(text) // 4)
+
+
+def iter_llm_agents(agent: BaseAgent) -> Iterator[LlmAgent]:
+    """Yields every LlmAgent in the tree, including agents wrapped in an AgentTool."""
+    if isinstance(agent, LlmAgent):
+        yield agent
+        for tool in agent.tools:
+            if isinstance(tool, AgentTool):
+                yield from iter_llm_agents(tool.agent)
+    for sub_agent in agent.sub_agents:
+        yield from iter_llm_agents(sub_agent)
+
+
+@contextmanager
+def use_fake_llm(root_agent: BaseAgent, llm: BaseLlm):
+    """Temporarily replaces the model of every LlmAgent under `root_agent`."""
+    originals = [(agent, agent.model) for agent in iter_llm_agents(root_agent)]
+    try:
+        for agent, _ in originals:
+            agent.model = llm
+        yield llm
+    finally:
+        for agent, model in originals:
+            agent.model = model
@@ -0,0 +1,137 @@
+# Parsing, local repair and schema validation of JSON written by models.
+import json
+import re
+import typing
+
+from pydantic import BaseModel, ValidationError
+
+
+FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+
+
+def _scan(text: str) -> tuple[str, list[str], bool, list[tuple[int, list[str]]]]:
+    """Copies the first JSON value in `text`, dropping trailing commas and anything after it.
+
+    Returns (copied text, closers still open, whether it ended inside a string,
+    cut points before each comma with the closers open there).
+    """
+    out: list[str] = []
+    stack: list[str] = []
+    cuts: list[tuple[int, list[str]]] = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if not stack or ch != stack[-1]:
+                break
+            _drop_trailing_comma(out)
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+            continue
+        elif ch == ",":
+            cuts.append((len(out), list(stack)))
+        out.append(ch)
+    return "".join(out), stack, in_string, cuts
+
+
+def _drop_trailing_comma(out: list[str]):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _close(text: str, stack: list[str]) -> str:
+    text = text.rstrip().removesuffix(",")
+    if text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> str:
+    """Best-effort local fix of model JSON: code fences, surrounding prose, trailing commas,
+    and truncated output (open strings, arrays and objects are closed; a cut-off last element is dropped)."""
+    text = text.strip()
+    if match := FENCE.search(text):
+        text = match.group(1)
+    else:
+        text = text.removeprefix("```json").removeprefix("```")
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text.strip()
+
+    body, stack, in_string, cuts = _scan(text[min(starts):])
+    if not stack:
+        return body
+    closed = _close(body + ('"' if in_string else ""), stack)
+    candidates = [closed] + [_close(body[:cut], cut_stack) for cut, cut_stack in reversed(cuts)]
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+            return candidate
+        except json.JSONDecodeError:
+            continue
+    return closed
+
+
+def load_json(text) -> dict | list | None:
+    """Parses model JSON output, repairing it locally where possible (see repair_json)."""
+    if isinstance(text, (dict, list)):
+        return text
+    if not text:
+        return None
+    try:
+        return json.loads(repair_json(text))
+    except json.JSONDecodeError:
+        return None
+
+
+def _drop_invalid_items(data: dict, schema: type[BaseModel]) -> dict:
+    """Removes the items of list[Model] fields that do not validate, keeping the rest."""
+    data = dict(data)
+    for name, field in schema.model_fields.items():
+        item_type = typing.get_args(field.annotation)[0] if typing.get_origin(field.annotation) is list else None
+        if not (isinstance(item_type, type) and issubclass(item_type, BaseModel)) or not isinstance(data.get(name), list):
+            continue
+        valid = []
+        for item in data[name]:
+            try:
+                valid.append(item_type.model_validate(item))
+            except ValidationError:
+                continue
+        data[name] = valid
+    return data
+
+
+def validate_output(raw, schema: type[BaseModel]) -> tuple[BaseModel | None, str | None]:
+    """Parses, repairs and validates model output. Returns (model, None) or (None, error message).
+
+    Invalid items of list fields are dropped when the rest of the output is valid.
+    """
+    data = load_json(raw)
+    if data is None:
+        return None, "The output is not valid JSON."
+    try:
+        return schema.model_validate(data), None
+    except ValidationError as e:
+        error = str(e)
+    if isinstance(data, dict):
+        try:
+            return schema.model_validate(_drop_invalid_items(data, schema)), None
+        except ValidationError:
+            pass
+    return None, error
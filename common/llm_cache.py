@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import AsyncGenerator, Iterable
+
+from google.adk.agents import BaseAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from pydantic import ConfigDict, Field
+
+from common.fake_llm import get_agent_name, iter_llm_agents
+
+
+DEFAULT_TTL_S = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+SYNC_EVERY = 1000  # Writes between full passes that expire old entries and recount the stored size
+EVICT_TO = 0.9  # Eviction frees space down to this fraction of max_bytes, so it does not run on every put
+
+
+class ResponseCache:
+    """Content-addressed, on-disk (SQLite) store of final model responses.
+
+    Entries expire after `ttl_s` seconds; when the total stored size passes `max_bytes`
+    the least recently used entries are evicted. Safe to share between agents and threads.
+
+    The stored size is kept as a running total, so a put does not scan the table. Every
+    SYNC_EVERY writes, and before evicting, it is recounted (other processes may share the
+    file) and expired entries are deleted.
+    """
+
+    def __init__(self, path: str, ttl_s: float = DEFAULT_TTL_S, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size: int | None = None  # Running total of `size`; None until the first recount
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                agent TEXT NOT NULL,
+                model TEXT NOT NULL,
+                responses TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_lru ON llm_responses(last_access)")
+
+    def get(self, key: str) -> list[LlmResponse] | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT responses, created_at, size FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_s:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._add_size(-row[2])
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return [LlmResponse.model_validate(r) for r in json.loads(row[0])]
+
+    def put(self, key: str, agent: str, model: str, responses: list[dict]):
+        payload = json.dumps(responses)
+        now = time.time()
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, agent, model, payload, len(payload), now, now),
+            )
+            self._add_size(len(payload) - (replaced[0] if replaced else 0))
+            self._writes += 1
+            if self._size is None or self._writes >= SYNC_EVERY:
+                self._sync()
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _add_size(self, delta: int):
+        if self._size is not None:
+            self._size += delta
+
+    def _sync(self):
+        """Deletes expired entries and recounts the stored size."""
+        self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl_s,))
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        self._writes = 0
+
+    def _evict(self):
+        self._sync()
+        if self._size <= self.max_bytes:
+            return
+        target = int(self.max_bytes * EVICT_TO)
+        evicted = []
+        rows = self._conn.execute("SELECT key, size FROM llm_responses ORDER BY last_access")
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        rows.close()
+        self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+
+def cache_key(llm_request: LlmRequest) -> str:
+    """Hashes the model name, rendered system instruction, tool declarations and contents.
+
+    Function call ids are generated per run by ADK, so they are left out of the key.
+    """
+    config = llm_request.config
+    contents = [c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents]
+    for content in contents:
+        for part in content.get("parts", []):
+            part.get("function_call", {}).pop("id", None)
+            part.get("function_response", {}).pop("id", None)
+
+    material = {
+        "model": llm_request.model,
+        "system_instruction": config.system_instruction,
+        "tools": [t.model_dump(mode="json", exclude_none=True) for t in config.tools or []],
+        "response_schema": str(config.response_schema) if config.response_schema else None,
+        "contents": contents,
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CachedLlm(BaseLlm):
+    """Wraps any model so that identical requests are answered from a `ResponseCache`."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    llm: BaseLlm
+    cache: ResponseCache
+    bypass_agents: set[str] = Field(default_factory=set)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        agent_name = get_agent_name(llm_request)
+        if agent_name in self.bypass_agents:
+            async for response in self.llm.generate_content_async(llm_request, stream=stream):
+                yield response
+            return
+
+        key = cache_key(llm_request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            for response in cached:
+                yield response
+            return
+
+        final_responses = []
+        failed = False
+        async for response in self.llm.generate_content_async(llm_request, stream=stream):
+            if response.error_code:
+                failed = True
+            elif not response.partial:
+                # Serialize before yielding: ADK mutates the content (e.g. function call ids).
+                final_responses.append(response.model_dump(mode="json", exclude_none=True))
+            yield response
+
+        if final_responses and not failed:
+            self.cache.put(key, agent_name, self.llm.model, final_responses)
+
+
+def enable_response_cache(
+    root_agent: BaseAgent,
+    cache: ResponseCache | None = None,
+    bypass_agents: Iterable[str] = (),
+) -> ResponseCache | None:
+    """Routes every LlmAgent under `root_agent` through a shared response cache.
+
+    Opt-in: without an explicit `cache` this only takes effect when the `LLM_CACHE_PATH`
+    environment variable is set. Agents named in `bypass_agents` or in the comma separated
+    `LLM_CACHE_BYPASS` variable always call the model.
+    """
+    if cache is None:
+        path = os.getenv("LLM_CACHE_PATH")
+        if not path:
+            return None
+        cache = shared_cache(path)
+
+    bypass = set(bypass_agents) | {
+        name.strip() for name in os.getenv("LLM_CACHE_BYPASS", "").split(",") if name.strip()
+    }
+    for agent in iter_llm_agents(root_agent):
+        if isinstance(agent.model, CachedLlm):
+            continue
+        agent.model = CachedLlm(
+            model=agent.canonical_model.model,
+            llm=agent.canonical_model,
+            cache=cache,
+            bypass_agents=bypass,
+        )
+    return cache
+
+
+_shared_caches: dict[str, ResponseCache] = {}
+
+
+def shared_cache(path: str) -> ResponseCache:
+    """One ResponseCache per database file, shared by every pipeline in the process."""
+    if path not in _shared_caches:
+        _shared_caches[path] = ResponseCache(path)
+    return _shared_caches[path]
@@ -0,0 +1,89 @@
+import difflib
+import logging
+import re
+from dataclasses import dataclass
+from typing import AsyncGenerator, Callable
+
+from google.adk.agents import LoopAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from pydantic import Field
+from typing_extensions import override
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExitCondition:
+    """Stops the loop when `check(new_value, previous_value)` holds for state `key` right after it was written."""
+
+    key: str
+    check: Callable[[str, str | None], bool]
+    description: str
+
+
+def exact_token(key: str, token: str = "APPROVED") -> ExitCondition:
+    """The value is exactly `token` (ignoring whitespace, quotes and a final period)."""
+    return ExitCondition(
+        key, lambda value, _: value.strip().strip("\"'`*").rstrip(".").strip() == token, f"{key} == {token!r}"
+    )
+
+
+def regex(key: str, pattern: str, flags: int = re.IGNORECASE) -> ExitCondition:
+    compiled = re.compile(pattern, flags)
+    return ExitCondition(key, lambda value, _: compiled.search(value) is not None, f"{key} matches {pattern!r}")
+
+
+def similar_to_previous(key: str, threshold: float = 0.97) -> ExitCondition:
+    """The new value is at least `threshold` similar (difflib ratio) to the value it replaced: a converged draft."""
+
+    def converged(value: str, previous: str | None) -> bool:
+        if previous is None:
+            return False
+        matcher = difflib.SequenceMatcher(None, previous, value, autojunk=False)
+        return matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+    return ExitCondition(key, converged, f"{key} changed less than {1 - threshold:.0%}")
+
+
+class EarlyExitLoopAgent(LoopAgent):
+    """LoopAgent that checks `exit_conditions` in code after every sub-agent.
+
+    When a sub-agent writes a watched state key and a condition holds, the loop ends at
+    once: an approved critique no longer costs a refiner call whose only job is to call
+    exit_loop, and a draft that stopped changing ends the loop. It ends by returning, with
+    no event: an escalate event would also stop an enclosing LoopAgent, and any text on it
+    would replace the refined draft as the pipeline's final response.
+    """
+
+    exit_conditions: list[ExitCondition] = Field(default_factory=list)
+
+    @override
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        if not self.sub_agents:
+            return
+        last_seen = {c.key: _as_text(ctx.session.state.get(c.key)) for c in self.exit_conditions}
+        iteration = 0
+        while self.max_iterations is None or iteration < self.max_iterations:
+            for sub_agent in self.sub_agents:
+                written = set()
+                async for event in sub_agent.run_async(ctx):
+                    yield event
+                    written.update(event.actions.state_delta)
+                    if event.actions.escalate:
+                        return
+
+                for condition in self.exit_conditions:
+                    if condition.key not in written:
+                        continue
+                    value = _as_text(ctx.session.state.get(condition.key))
+                    previous, last_seen[condition.key] = last_seen.get(condition.key), value
+                    if value is not None and condition.check(value, previous):
+                        logger.info("%s: stopping after %s (%s)", self.name, sub_agent.name, condition.description)
+                        return
+            iteration += 1
+
+
+def _as_text(value) -> str | None:
+    return value if value is None or isinstance(value, str) else str(value)
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import logging
+from typing import AsyncGenerator, Callable
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from pydantic import BaseModel
+from typing_extensions import override
+
+from common.json_output import load_json, validate_output
+from common.parallel import BRANCH_DONE, branch_context
+
+
+logger = logging.getLogger(__name__)
+
+
+def state_items(state_key: str, field: str | None = None) -> Callable[[dict], list[dict]]:
+    """Item loader for a JSON list stored at `state_key`, optionally wrapped as {field: [...]}."""
+
+    def load(state) -> list[dict]:
+        parsed = load_json(state.get(state_key))
+        if isinstance(parsed, dict):
+            parsed = parsed.get(field, []) if field else [parsed]
+        return [item for item in parsed or [] if isinstance(item, dict)]
+
+    return load
+
+
+class MapReduceAgent(BaseAgent):
+    """Runs its single LlmAgent sub-agent once per item, then merges the results in code.
+
+    The map step fans out one sub-invocation per item (at most `max_in_flight` at once),
+    each on its own branch with the item available to the mapper's instruction as
+    `{<item_state_key>}`. Each result must be a JSON object (matching `item_schema`, if set,
+    after local repair); invalid results are retried up to `item_attempts` times and then
+    dropped, so one bad item cannot break the batch. `carry_fields` (ids, titles) are always
+    copied from the item, whatever the model echoed. The reduce step writes
+    `{output_field: [results...]}` (in item order) to `output_key`.
+    """
+
+    load_items: Callable[[dict], list[dict]]
+    item_state_key: str = "item"
+    output_key: str
+    output_field: str
+    carry_fields: tuple[str, ...] = ()
+    item_schema: type[BaseModel] | None = None
+    max_in_flight: int = 4
+    item_timeout_s: float | None = None
+    item_attempts: int = 2
+
+    @property
+    def mapper(self) -> LlmAgent:
+        return self.sub_agents[0]
+
+    def validate_result(self, item: dict, text: str) -> dict | None:
+        """The mapper's JSON result with `carry_fields` taken from the item, or None if invalid."""
+        result = load_json(text)
+        if not isinstance(result, dict):
+            return None
+        for field in self.carry_fields:
+            if field in item:
+                result[field] = item[field]
+        if self.item_schema is not None:
+            validated, _ = validate_output(result, self.item_schema)
+            return validated.model_dump() if validated is not None else None
+        return result
+
+    @override
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        items = self.load_items(ctx.session.state)
+        results: list[dict | None] = [None] * len(items)
+        queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_in_flight)
+
+        def item_ctx(index: int, attempt: int) -> InvocationContext:
+            # Shallow session copy: same event list (so tool calls keep working), own state with the item.
+            branch_ctx = branch_context(self, self.mapper, ctx, suffix=f".{index}" + (f".retry{attempt}" if attempt else ""))
+            state = {**ctx.session.state, self.item_state_key: json.dumps(items[index], ensure_ascii=False)}
+            branch_ctx.session = ctx.session.model_copy(update={"state": state})
+            return branch_ctx
+
+        async def run_once(index: int, attempt: int) -> str:
+            final_text = ""
+            events = self.mapper.run_async(item_ctx(index, attempt))
+            try:
+                async for event in events:
+                    consumed = asyncio.Event()
+                    await queue.put((event, consumed))
+                    await consumed.wait()
+                    if event.is_final_response() and event.content and event.content.parts:
+                        final_text = "".join(part.text or "" for part in event.content.parts if not part.thought)
+            finally:
+                await events.aclose()
+            return final_text
+
+        async def map_item(index: int):
+            try:
+                async with slots:
+                    for attempt in range(self.item_attempts):
+                        try:
+                            text = await asyncio.wait_for(run_once(index, attempt), timeout=self.item_timeout_s)
+                        except asyncio.TimeoutError:
+                            logger.warning("%s: item %d timed out after %ss", self.name, index, self.item_timeout_s)
+                            return
+                        except Exception:
+                            logger.exception("%s: item %d failed (attempt %d)", self.name, index, attempt + 1)
+                            continue
+                        results[index] = self.validate_result(items[index], text)
+                        if results[index] is not None:
+                            return
+                    logger.warning("%s: dropping item %d after %d invalid results", self.name, index, self.item_attempts)
+            finally:
+                await queue.put((BRANCH_DONE, None))
+
+        tasks = [asyncio.create_task(map_item(i)) for i in range(len(items))]
+        try:
+            finished = 0
+            while finished < len(tasks):
+                event, consumed = await queue.get()
+                if event is BRANCH_DONE:
+                    finished += 1
+                    continue
+                yield event
+                consumed.set()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Reduce: merge the per-item results in item order.
+        merged = [result for result in results if result is not None]
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(
+                role="model",
+                parts=[types.Part(text=f"{len(merged)}/{len(items)} items processed by {self.mapper.name}.")],
+            ),
+            actions=EventActions(
+                state_delta={self.output_key: json.dumps({self.output_field: merged}, ensure_ascii=False)}
+            ),
+        )
@@ -0,0 +1,206 @@
+import asyncio
+import copy
+from collections import deque
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent
+from google.adk.agents.base_agent import BaseAgentState
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.sessions import Session, State
+from pydantic import PrivateAttr
+from typing_extensions import override
+
+
+BRANCH_DONE = object()  # Queue marker: a branch finished (shared by agents that merge branch event streams)
+
+
+def branch_context(
+    agent: BaseAgent, sub_agent: BaseAgent, ctx: InvocationContext, suffix: str = ""
+) -> InvocationContext:
+    """Isolated branch per sub-agent, like ParallelAgent; hedged runs and map items get their own suffix."""
+    branch_ctx = ctx.model_copy()
+    branch_suffix = f"{agent.name}.{sub_agent.name}{suffix}"
+    branch_ctx.branch = f"{ctx.branch}.{branch_suffix}" if ctx.branch else branch_suffix
+    return branch_ctx
+
+
+class BoundedParallelAgent(ParallelAgent):
+    """ParallelAgent with a max-in-flight limit, per-branch deadlines and optional hedging.
+
+    - `max_in_flight`: at most this many sub-agents run at once (default: all).
+    - `branch_timeout_s`: a sub-agent still running this long after it started is cancelled,
+      and its `output_key` is filled with `timeout_placeholder` so the next agent can run.
+    - `hedge`: when a sub-agent is slower than the `hedge_percentile` of its recent latencies
+      (or `hedge_after_s` before enough samples exist), a duplicate run is started on its own
+      branch; the first one to finish wins and the other is cancelled. A sub-agent that may be
+      hedged runs on a private copy of the session and its events are held back until it wins,
+      so the loser's partial output and state never reach the session (and nothing streams
+      from that sub-agent until it finishes).
+    """
+
+    max_in_flight: int | None = None
+    branch_timeout_s: float | None = None
+    timeout_placeholder: str = "(No results from {agent_name}: it did not finish within {timeout_s:g}s.)"
+    hedge: bool = False
+    hedge_after_s: float | None = None
+    hedge_percentile: float = 90.0
+    hedge_min_samples: int = 5
+    latency_window: int = 50
+
+    _latencies: dict[str, deque] = PrivateAttr(default_factory=dict)
+
+    def hedge_threshold(self, agent_name: str) -> float | None:
+        if not self.hedge:
+            return None
+        samples = self._latencies.get(agent_name)
+        if not samples or len(samples) < self.hedge_min_samples:
+            return self.hedge_after_s
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    def record_latency(self, agent_name: str, seconds: float):
+        self._latencies.setdefault(agent_name, deque(maxlen=self.latency_window)).append(seconds)
+
+    @override
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        if not self.sub_agents:
+            return
+
+        # Resumable invocations: same agent state events as ParallelAgent, and finished sub-agents are skipped.
+        if ctx.is_resumable and self._load_agent_state(ctx, BaseAgentState) is None:
+            ctx.set_agent_state(self.name, agent_state=BaseAgentState())
+            yield self._create_agent_state_event(ctx)
+        sub_agents = [sub_agent for sub_agent in self.sub_agents if not ctx.end_of_agents.get(sub_agent.name)]
+
+        queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_in_flight or len(self.sub_agents))
+
+        async def forward(event: Event):
+            # Same contract as ParallelAgent: wait until the runner consumed each event.
+            consumed = asyncio.Event()
+            await queue.put((event, consumed))
+            await consumed.wait()
+
+        async def stream(events: AsyncGenerator[Event, None]):
+            try:
+                async for event in events:
+                    await forward(event)
+            finally:
+                await events.aclose()
+
+        async def run_hedged(sub_agent: BaseAgent):
+            threshold = self.hedge_threshold(sub_agent.name)
+            if threshold is None:
+                await stream(sub_agent.run_async(branch_context(self, sub_agent, ctx)))
+                return
+
+            # Either attempt may lose, so each runs on a private copy of the session and keeps its events;
+            # only the winner's reach the runner, so the loser's output and state are never persisted.
+            def attempt(suffix: str = "") -> asyncio.Task:
+                attempt_ctx = branch_context(self, sub_agent, ctx, suffix)
+                attempt_ctx.session = _private_session(ctx.session)
+                return asyncio.create_task(_collect(sub_agent.run_async(attempt_ctx), attempt_ctx.session))
+
+            attempts = [attempt()]
+            try:
+                done, _ = await asyncio.wait(attempts, timeout=threshold)
+                if not done:
+                    attempts.append(attempt(suffix=".hedge"))
+                events = await _first_result(attempts)
+            finally:
+                for task in attempts:
+                    task.cancel()
+                await asyncio.gather(*attempts, return_exceptions=True)
+            for event in events:
+                await forward(event)
+
+        async def run_branch(sub_agent: BaseAgent):
+            try:
+                async with slots:
+                    started = asyncio.get_running_loop().time()
+                    deadline = asyncio.timeout(self.branch_timeout_s)
+                    try:
+                        async with deadline:
+                            await run_hedged(sub_agent)
+                    except TimeoutError:
+                        if not deadline.expired():
+                            raise  # Raised inside the sub-agent: an error of the branch, not a missed deadline.
+                        # A timeout is the slowest observed latency for hedging purposes.
+                        self.record_latency(sub_agent.name, self.branch_timeout_s)
+                        placeholder = self._placeholder_event(ctx, sub_agent)
+                        if placeholder is not None:
+                            await queue.put((placeholder, None))
+                    else:
+                        self.record_latency(sub_agent.name, asyncio.get_running_loop().time() - started)
+            finally:
+                await queue.put((BRANCH_DONE, None))
+
+        branches = [asyncio.create_task(run_branch(sub_agent)) for sub_agent in sub_agents]
+        pause_invocation = False
+        try:
+            finished = 0
+            while finished < len(branches):
+                event, consumed = await queue.get()
+                if event is BRANCH_DONE:
+                    finished += 1
+                    continue
+                yield event
+                if consumed is not None:
+                    consumed.set()
+                pause_invocation = pause_invocation or ctx.should_pause_invocation(event)
+            for branch in branches:
+                branch.result()  # Re-raise sub-agent errors.
+        finally:
+            for branch in branches:
+                branch.cancel()
+            await asyncio.gather(*branches, return_exceptions=True)
+
+        if not pause_invocation and ctx.is_resumable and all(ctx.end_of_agents.get(a.name) for a in self.sub_agents):
+            ctx.set_agent_state(self.name, end_of_agent=True)
+            yield self._create_agent_state_event(ctx)
+
+    def _placeholder_event(self, ctx: InvocationContext, sub_agent: BaseAgent) -> Event | None:
+        if not isinstance(sub_agent, LlmAgent) or not sub_agent.output_key:
+            return None
+        text = self.timeout_placeholder.format(agent_name=sub_agent.name, timeout_s=self.branch_timeout_s)
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={sub_agent.output_key: text}),
+        )
+
+
+def _private_session(session: Session) -> Session:
+    return session.model_copy(update={"events": list(session.events), "state": copy.deepcopy(session.state)})
+
+
+async def _collect(events: AsyncGenerator[Event, None], session: Session) -> list[Event]:
+    """Runs an attempt to the end, applying its events to its private session the way the runner would."""
+    kept = []
+    try:
+        async for event in events:
+            if event.partial:
+                continue
+            for key, value in event.actions.state_delta.items():
+                if not key.startswith(State.TEMP_PREFIX):
+                    session.state[key] = value
+            session.events.append(event)
+            kept.append(event)
+    finally:
+        await events.aclose()
+    return kept
+
+
+async def _first_result(tasks: list[asyncio.Task]):
+    """Result of the first task to succeed; if all fail, the last error."""
+    pending, error = set(tasks), None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                return task.result()
+            error = task.exception()
+    raise error
@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, asdict
+
+import requests
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools import FunctionTool, ToolContext
+from google.adk.tools.google_search_tool import GoogleSearchTool
+
+from common.fake_llm import iter_llm_agents
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_S = 24 * 3600
+BOOLEAN_OPERATORS = {"OR", "AND", "NOT"}
+
+
+def normalize_query(query: str) -> str:
+    """Case-folds and collapses whitespace, keeping Google's upper-case Boolean operators."""
+    tokens = unicodedata.normalize("NFKC", query).split()
+    return " ".join(t if t in BOOLEAN_OPERATORS else t.casefold() for t in tokens)
+
+
+class GoogleCustomSearchBackend:
+    """Google Programmable Search (Custom Search JSON API).
+
+    Needs GOOGLE_API_KEY and GOOGLE_CSE_ID (the search engine id).
+    """
+
+    URL = "https://www.googleapis.com/customsearch/v1"
+
+    def __init__(self, api_key: str | None = None, engine_id: str | None = None, num_results: int = 10):
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        self.engine_id = engine_id or os.getenv("GOOGLE_CSE_ID")
+        self.num_results = num_results
+        self._session = requests.Session()
+
+    def search(self, query: str) -> list[dict]:
+        response = self._session.get(
+            self.URL,
+            params={"key": self.api_key, "cx": self.engine_id, "q": query, "num": self.num_results},
+            timeout=15,
+        )
+        response.raise_for_status()
+        return [
+            {"title": item.get("title"), "url": item.get("link"), "snippet": item.get("snippet")}
+            for item in response.json().get("items", [])
+        ]
+
+
+class FakeSearchBackend:
+    """Offline test double: deterministic results derived from the query, with optional latency."""
+
+    def __init__(self, latency_s: float = 0.0, num_results: int = 10):
+        self.latency_s = latency_s
+        self.num_results = num_results
+        self.calls = 0
+
+    def search(self, query: str) -> list[dict]:
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:8]
+        return [
+            {
+                "title": f"Result {i + 1} for {query}",
+                "url": f"https://example.org/{digest}/{i + 1}",
+                "snippet": f"Offline search result {i + 1} ({digest}).",
+            }
+            for i in range(self.num_results)
+        ]
+
+
+@dataclass
+class SearchStats:
+    lookups: int = 0
+    backend_calls: int = 0
+    cache_hits: int = 0
+    coalesced: int = 0  # Waited on an identical in-flight query instead of calling the backend
+    backend_latency_s: float = 0.0
+    saved_latency_s: float = 0.0
+
+    def add(self, other: "SearchStats"):
+        for key, value in asdict(other).items():
+            setattr(self, key, getattr(self, key) + value)
+
+
+class SearchCache:
+    """On-disk (SQLite) search-result cache keyed by normalized query, with single-flight.
+
+    Concurrent lookups of the same query share one backend request. Stats are kept
+    in total and per invocation, so each pipeline run can report what it saved.
+    """
+
+    def __init__(self, path: str, backend, ttl_s: float = DEFAULT_TTL_S):
+        self.path = path
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self.stats = SearchStats()
+        self.invocation_stats: dict[str, SearchStats] = {}
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS search_results (
+                query TEXT PRIMARY KEY,
+                results TEXT NOT NULL,
+                latency_s REAL NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+
+    def _load(self, key: str) -> tuple[list[dict], float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results, latency_s, created_at FROM search_results WHERE query = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[2] > self.ttl_s:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _store(self, key: str, results: list[dict], latency_s: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?)",
+                (key, json.dumps(results), latency_s, time.time()),
+            )
+
+    def _count(self, invocation_id: str | None, **deltas):
+        delta = SearchStats(**deltas)
+        self.stats.add(delta)
+        if invocation_id:
+            self.invocation_stats.setdefault(invocation_id, SearchStats()).add(delta)
+
+    async def search(self, query: str, invocation_id: str | None = None) -> list[dict]:
+        key = normalize_query(query)
+        self._count(invocation_id, lookups=1)
+
+        cached = self._load(key)
+        if cached is not None:
+            results, latency_s = cached
+            self._count(invocation_id, cache_hits=1, saved_latency_s=latency_s)
+            return results
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            results, latency_s = await asyncio.shield(task)
+            self._count(invocation_id, coalesced=1, saved_latency_s=latency_s)
+            return results
+
+        # The fetch runs as its own task and every caller, the leader included, awaits it
+        # through shield: cancelling one caller must not cancel the fetch the others wait on.
+        task = asyncio.create_task(self._fetch(key, query, invocation_id))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda t: self._fetch_done(key, t))
+        results, _ = await asyncio.shield(task)
+        return results
+
+    async def _fetch(self, key: str, query: str, invocation_id: str | None) -> tuple[list[dict], float]:
+        started = time.perf_counter()
+        results = await asyncio.to_thread(self.backend.search, query)
+        latency_s = time.perf_counter() - started
+        self._store(key, results, latency_s)
+        self._count(invocation_id, backend_calls=1, backend_latency_s=latency_s)
+        return results, latency_s
+
+    def _fetch_done(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved when every caller was cancelled.
+
+    def pop_invocation_stats(self, invocation_id: str) -> SearchStats:
+        return self.invocation_stats.pop(invocation_id, SearchStats())
+
+    def as_tool(self) -> FunctionTool:
+        """A drop-in `google_search` function tool served from this cache."""
+        cache = self
+
+        async def google_search(query: str, tool_context: ToolContext) -> dict:
+            """Searches the web and returns the top results.
+
+            Args:
+                query: The search query. Quotes and Boolean operators (OR, AND) are supported.
+
+            Returns:
+                Dictionary with status and a list of results, each with title, url and snippet.
+            """
+            try:
+                results = await cache.search(query, invocation_id=tool_context.invocation_id)
+            except Exception as e:
+                return {"status": "error", "error_message": f"Search failed: {e}"}
+            return {"status": "success", "results": results}
+
+        return FunctionTool(google_search)
+
+
+def build_backend():
+    """Backend chosen by SEARCH_BACKEND: "google_cse" (default) or "fake" for offline runs."""
+    if os.getenv("SEARCH_BACKEND", "google_cse") == "fake":
+        return FakeSearchBackend()
+    return GoogleCustomSearchBackend()
+
+
+_shared_caches: dict[str, SearchCache] = {}
+
+
+def shared_search_cache(path: str, backend=None) -> SearchCache:
+    if path not in _shared_caches:
+        _shared_caches[path] = SearchCache(path, backend or build_backend())
+    return _shared_caches[path]
+
+
+def enable_search_cache(root_agent: BaseAgent, cache: SearchCache | None = None) -> SearchCache | None:
+    """Replaces the built-in google_search of every agent under `root_agent` with the cached tool.
+
+    Opt-in: without an explicit `cache` this only takes effect when SEARCH_CACHE_PATH is set.
+    Per-run savings are logged when `root_agent` finishes.
+    """
+    if cache is None:
+        path = os.getenv("SEARCH_CACHE_PATH")
+        if not path:
+            return None
+        cache = shared_search_cache(path)
+
+    search_tool = cache.as_tool()
+    for agent in iter_llm_agents(root_agent):
+        agent.tools = [search_tool if isinstance(t, GoogleSearchTool) else t for t in agent.tools]
+
+    def report_search_savings(callback_context: CallbackContext):
+        stats = cache.pop_invocation_stats(callback_context.invocation_id)
+        if stats.lookups:
+            logger.info(
+                "%s search: %d lookups, %d backend calls, %d calls saved, %.2fs latency saved",
+                root_agent.name,
+                stats.lookups,
+                stats.backend_calls,
+                stats.cache_hits + stats.coalesced,
+                stats.saved_latency_s,
+            )
+        return None
+
+    callbacks = root_agent.after_agent_callback or []
+    if not isinstance(callbacks, list):
+        callbacks = [callbacks]
+    root_agent.after_agent_callback = [*callbacks, report_search_savings]
+    return cache
@@ -0,0 +1,208 @@
+# Bounded context for long-lived sessions: a rolling summary replaces old turns.
+#
+#   app = App(name=APP_NAME, root_agent=root_agent, plugins=[SessionCompactor()])
+#
+# After each run, once the session is over its event or token budget, everything but the last few
+# invocations is summarized together with the previous summary into one new summary event (an ADK
+# EventCompaction, so the contents processor sends the summary instead of the covered turns). The
+# covered events are moved to the `archived_events` table, so this needs TunedSqliteSessionService (or
+# ShardedSessionService, whose shards are tuned services).
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.apps.base_events_summarizer import BaseEventsSummarizer
+from google.adk.events import Event, EventActions
+from google.adk.events.event_actions import EventCompaction
+from google.adk.models import BaseLlm, LlmRequest
+from google.adk.plugins import BasePlugin
+from google.adk.sessions import Session
+from google.genai import types
+
+from common.sharded_sessions import ShardedSessionService
+from common.sqlite_sessions import TunedSqliteSessionService
+
+
+logger = logging.getLogger(__name__)
+
+SUMMARIZER_NAME = "session_summarizer"
+
+SUMMARY_PROMPT = """You maintain the running summary of a long conversation between a user and an assistant.
+Update the summary with the new messages. Keep every fact the user stated about themselves (name, preferences,
+plans, constraints), decisions made, and open questions; drop greetings and small talk. Answer with the updated
+summary only, at most {max_words} words.
+
+Summary so far:
+{summary}
+
+New messages:
+{conversation}"""
+
+
+def is_summary(event: Event) -> bool:
+    return bool(event.actions and event.actions.compaction)
+
+
+def event_text(event: Event) -> str:
+    """Text, function calls and function responses of an event, as the model would see them."""
+    if is_summary(event):
+        content = event.actions.compaction.compacted_content
+    else:
+        content = event.content
+    texts = []
+    for part in (content.parts or []) if content else []:
+        if part.text:
+            texts.append(part.text)
+        elif part.function_call:
+            texts.append(f"{part.function_call.name}({json.dumps(part.function_call.args or {}, default=str)})")
+        elif part.function_response:
+            texts.append(json.dumps(part.function_response.response or {}, default=str))
+    return "\n".join(texts)
+
+
+def estimate_tokens(events: list[Event]) -> int:
+    """Rough prompt size of the events (~4 characters per token)."""
+    return sum(len(event_text(event)) for event in events) // 4
+
+
+class RollingSummarizer(BaseEventsSummarizer):
+    """Folds the previous summary (if the first event is one) and the new events into one summary event."""
+
+    def __init__(self, llm: BaseLlm, max_words: int = 200):
+        self.llm = llm
+        self.max_words = max_words
+
+    async def maybe_summarize_events(self, *, events: list[Event]) -> Optional[Event]:
+        previous = events[0] if events and is_summary(events[0]) else None
+        new_events = events[1:] if previous else events
+        if not new_events:
+            return None
+        conversation = "\n".join(f"{event.author}: {text}" for event in new_events if (text := event_text(event)))
+        prompt = SUMMARY_PROMPT.format(
+            max_words=self.max_words,
+            summary=event_text(previous) if previous else "(none)",
+            conversation=conversation,
+        )
+        llm_request = LlmRequest(
+            model=self.llm.model,
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+            config=types.GenerateContentConfig(labels={"adk_agent_name": SUMMARIZER_NAME}),
+        )
+        summary = None
+        async for response in self.llm.generate_content_async(llm_request, stream=False):
+            if response.content and response.content.parts:
+                summary = response.content
+                break
+        if summary is None:
+            return None
+        summary.role = "model"
+        start = previous.actions.compaction.start_timestamp if previous else new_events[0].timestamp
+        end = new_events[-1].timestamp
+        return Event(
+            author=SUMMARIZER_NAME,  # Not "user": listings must not show the summary as a user message.
+            invocation_id=Event.new_id(),
+            timestamp=end,  # Sorts before the turns that were kept.
+            actions=EventActions(
+                compaction=EventCompaction(start_timestamp=start, end_timestamp=end, compacted_content=summary)
+            ),
+        )
+
+
+@dataclass
+class CompactionPolicy:
+    max_events: int = 40  # Compact once the session holds more events than this...
+    max_tokens: int = 4000  # ...or its history is estimated above this many tokens.
+    keep_recent_invocations: int = 3  # Turns that always stay verbatim.
+
+
+@dataclass
+class CompactionStats:
+    compactions: int = 0
+    archived_events: int = 0
+    failures: int = 0
+
+
+class SessionCompactor(BasePlugin):
+    """Plugin that compacts the session after a run once it exceeds `policy`.
+
+    The summary model defaults to the root agent's model. Compaction runs in a background task started
+    when the run ends, so `run_async` finishes without waiting for the summary call; a session has at
+    most one compaction in flight. Await `wait()` before closing the session service or the event loop.
+    """
+
+    def __init__(self, policy: CompactionPolicy | None = None, summarizer: BaseEventsSummarizer | None = None):
+        super().__init__(name="session_compaction")
+        self.policy = policy or CompactionPolicy()
+        self.summarizer = summarizer
+        self.stats = CompactionStats()
+        self._running: dict[tuple[str, str, str], asyncio.Task] = {}
+
+    def over_budget(self, session: Session) -> bool:
+        return len(session.events) > self.policy.max_events or estimate_tokens(session.events) > self.policy.max_tokens
+
+    def select(self, session: Session) -> list[Event]:
+        """The events to fold into the next summary: everything before the last `keep_recent_invocations`."""
+        recent = []
+        for event in reversed(session.events):
+            if not is_summary(event) and event.invocation_id not in recent:
+                recent.append(event.invocation_id)
+                if len(recent) == self.policy.keep_recent_invocations:
+                    break
+        if len(recent) < self.policy.keep_recent_invocations:
+            return []
+        first_kept = next(i for i, event in enumerate(session.events) if event.invocation_id == recent[-1])
+        selected = session.events[:first_kept]
+        return selected if any(not is_summary(event) for event in selected) else []
+
+    async def compact(
+        self,
+        session: Session,
+        session_service: TunedSqliteSessionService | ShardedSessionService,
+        llm: BaseLlm | None = None,
+    ) -> bool:
+        """Summarizes the older part of `session` if it is over budget; returns whether it did."""
+        if not self.over_budget(session):
+            return False
+        selected = self.select(session)
+        if not selected:
+            return False
+        summarizer = self.summarizer or RollingSummarizer(llm)
+        summary = await summarizer.maybe_summarize_events(events=selected)
+        if summary is None:
+            return False
+        await session_service.archive_events(session, [event.id for event in selected], summary)
+        self.stats.compactions += 1
+        self.stats.archived_events += len(selected)
+        return True
+
+    async def wait(self):
+        """Waits for the compactions started so far."""
+        while self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        session, session_service = invocation_context.session, invocation_context.session_service
+        if not isinstance(session_service, (TunedSqliteSessionService, ShardedSessionService)):
+            return
+        key = (session.app_name, session.user_id, session.id)
+        if key in self._running or not self.over_budget(session):
+            return
+        llm = getattr(invocation_context.agent, "canonical_model", None)
+        task = asyncio.create_task(self._compact_in_background(session, session_service, llm))
+        self._running[key] = task
+        task.add_done_callback(lambda _: self._running.pop(key, None))
+
+    async def _compact_in_background(self, session: Session, session_service, llm: BaseLlm | None):
+        try:
+            # The run's copy may predate a compaction that finished during the run: select from what is stored.
+            session = await session_service.get_session(
+                app_name=session.app_name, user_id=session.user_id, session_id=session.id
+            )
+            if session is not None:
+                await self.compact(session, session_service, llm)
+        except Exception:
+            self.stats.failures += 1
+            logger.exception("Compacting session %s failed", session.id)
@@ -0,0 +1,560 @@
+# Session storage split over several SQLite files by user, so writers of different users do not share
+# one write lock.
+#
+#   session_service = ShardedSessionService("sessions/shards.json")
+#
+# - The shard map is a small JSON file: shard name -> database file, plus `pins` (user -> shard).
+#   A user lives on their pinned shard, else on the shard picked by rendezvous hashing of the user id,
+#   so adding a shard only moves the users that hash to it.
+# - Each shard is a TunedSqliteSessionService, and every call is routed by `user_id`. All of a user's
+#   sessions, events, user state and archived events sit on one shard. App-scoped state ("app:" keys)
+#   is kept per shard.
+# - Shards can change while any number of worker processes serve the map. They coordinate through a small
+#   SQLite database next to the map (`<map>.db`):
+#   - a version number, bumped on every change. Each call compares it with the version its process last
+#     saw, and reloads the map and the lock rows when it moved.
+#   - lock rows: one per user being moved, and one per shard being added. Calls for a locked user wait
+#     until the move is over.
+#   - a row per worker with the last version it acknowledged. A worker acknowledges a version once the
+#     calls it started under older versions are over and its buffered events are written.
+#   A move locks the user, waits until every live worker has acknowledged, copies the user's rows to the
+#   target, then re-routes and unlocks in one transaction. `add_shard` adds the shard as pending (not
+#   routed to) and locks it, waits the same way, pins the stored users that would change shard, and opens
+#   it. A worker that has not checked in for WORKER_TIMEOUT_S (crashed, or its event loop is blocked that
+#   long) is not waited for, and the locks it held are ignored.
+# - `list_sessions(app_name=...)` without a user lists the sessions of all shards, for admin views.
+#
+# Admin tool (safe to run while the app serves the map):
+#   python -m common.sharded_sessions sessions/shards.json init --shards 4
+#   python -m common.sharded_sessions sessions/shards.json add-shard shard-4 sessions-4.db
+#   python -m common.sharded_sessions sessions/shards.json rebalance
+#   python -m common.sharded_sessions sessions/shards.json stats
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, TypeVar
+
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from typing_extensions import override
+
+from common.sqlite_sessions import TunedSqliteSessionService, get_or_create_session
+
+
+logger = logging.getLogger(__name__)
+
+USER_TABLES = ("events", "archived_events", "sessions", "user_states")  # Children before parents
+
+POLL_S = 0.01  # How often waiting calls and changes look at the coordination database
+HEARTBEAT_S = 1.0
+WORKER_TIMEOUT_S = 10.0  # Workers silent for longer are taken to be gone
+
+COORDINATION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS version (version INTEGER NOT NULL);
+INSERT INTO version SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM version);
+CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, seen INTEGER NOT NULL, heartbeat REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS locks (kind TEXT, name TEXT, owner TEXT NOT NULL, PRIMARY KEY (kind, name));
+"""
+
+T = TypeVar("T")
+
+
+@dataclass
+class ShardMap:
+    shards: dict[str, str]  # Shard name -> SQLite file (relative paths are relative to the map file)
+    pins: dict[str, str] = field(default_factory=dict)  # User id -> shard name, overrides hashing
+    path: Optional[str] = None
+    adding: Optional[str] = None  # A shard being added: listed in `shards`, but nobody is routed to it yet
+
+    @classmethod
+    def create(cls, path: str, count: int) -> "ShardMap":
+        shard_map = cls({f"shard-{i}": f"sessions-{i}.db" for i in range(count)}, path=path)
+        shard_map.save()
+        return shard_map
+
+    @classmethod
+    def load(cls, path: str) -> "ShardMap":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["shards"], data.get("pins", {}), path=path, adding=data.get("adding"))
+
+    def save(self):
+        """Atomically rewrites the map file (a no-op for maps that were not loaded from a file)."""
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        data = {"shards": self.shards, "pins": self.pins}
+        if self.adding is not None:
+            data["adding"] = self.adding
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def resolve(self, database: str) -> str:
+        base = os.path.dirname(os.path.abspath(self.path)) if self.path else os.getcwd()
+        return os.path.join(base, database)
+
+    def database(self, shard: str) -> str:
+        return self.resolve(self.shards[shard])
+
+    def home(self, user_id: str, with_adding: bool = False) -> str:
+        """The shard the user hashes to (highest random weight, stable across processes).
+
+        The shard being added counts only with `with_adding`, i.e. once it is open.
+        """
+        shards = [shard for shard in self.shards if with_adding or shard != self.adding]
+        return max(shards, key=lambda shard: hashlib.blake2b(f"{shard}/{user_id}".encode(), digest_size=8).digest())
+
+    def shard_of(self, user_id: str) -> str:
+        return self.pins.get(user_id) or self.home(user_id)
+
+
+def stored_users(database: str) -> set[str]:
+    """Users with sessions or user state in one shard file."""
+    if not os.path.exists(database):
+        return set()
+    with contextlib.closing(sqlite3.connect(database, timeout=30)) as db:
+        tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if not {"sessions", "user_states"} <= tables:
+            return set()
+        rows = db.execute("SELECT user_id FROM sessions UNION SELECT user_id FROM user_states")
+        return {row[0] for row in rows}
+
+
+def count_sessions(database: str) -> int:
+    if not os.path.exists(database):
+        return 0
+    with contextlib.closing(sqlite3.connect(database, timeout=30)) as db:
+        try:
+            return db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        except sqlite3.OperationalError:  # Tables are created on first use
+            return 0
+
+
+def copy_user(source: str, target: str, user_id: str):
+    """Replaces the user's rows in `target` with those in `source`, in one transaction on `target`."""
+    with contextlib.closing(sqlite3.connect(target, timeout=30)) as db:
+        db.execute("ATTACH DATABASE ? AS source", (source,))
+        with db:
+            for table in USER_TABLES:
+                db.execute(f"DELETE FROM main.{table} WHERE user_id = ?", (user_id,))
+            for table in reversed(USER_TABLES):
+                db.execute(f"INSERT INTO main.{table} SELECT * FROM source.{table} WHERE user_id = ?", (user_id,))
+            db.execute("INSERT OR IGNORE INTO main.app_states SELECT * FROM source.app_states")
+
+
+def delete_user(database: str, user_id: str):
+    with contextlib.closing(sqlite3.connect(database, timeout=30)) as db:
+        with db:
+            for table in USER_TABLES:
+                db.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+
+
+class ShardedSessionService(BaseSessionService):
+    """Routes every call by user id to one of several TunedSqliteSessionService shards."""
+
+    def __init__(self, shard_map: ShardMap | str, **service_kwargs: Any):
+        self.shard_map = ShardMap.load(shard_map) if isinstance(shard_map, str) else shard_map
+        self.service_kwargs = service_kwargs
+        self.shards: dict[str, TunedSqliteSessionService] = {}
+        self._open_shards()
+        # Without a map file there is no other process to coordinate with; an in-memory database will do.
+        path = f"{self.shard_map.path}.db" if self.shard_map.path else ":memory:"
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(COORDINATION_SCHEMA)
+        self.worker_id = uuid.uuid4().hex
+        self._version = -1  # Coordination version the map and locks below were read at
+        self._locks: set[tuple[str, str]] = set()  # Live lock rows: ("user", user id) or ("shard", name)
+        self._active: Counter[int] = Counter()  # Calls in flight by the version they were routed at
+        self._acknowledged = -1
+        self._watcher: Optional[asyncio.Task] = None
+
+    def _open_shards(self):
+        for name in self.shard_map.shards:
+            if name not in self.shards:
+                self.shards[name] = TunedSqliteSessionService(self.shard_map.database(name), **self.service_kwargs)
+
+    # -------------------- Coordination --------------------
+    @contextlib.contextmanager
+    def _transaction(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _bump(self) -> int:
+        """Announces a change to the other workers (inside a transaction); returns the new version."""
+        self._db.execute("UPDATE version SET version = version + 1")
+        return self._db.execute("SELECT version FROM version").fetchone()[0]
+
+    def _refresh(self, force: bool = False):
+        """Reloads the map and the live locks if another worker changed them since they were read."""
+        if not force and self._db.execute("SELECT version FROM version").fetchone()[0] == self._version:
+            return
+        self._db.execute("BEGIN")
+        try:
+            version = self._db.execute("SELECT version FROM version").fetchone()[0]
+            rows = self._db.execute(
+                "SELECT kind, name FROM locks JOIN workers ON owner = worker_id WHERE heartbeat > ?",
+                (time.time() - WORKER_TIMEOUT_S,),
+            )
+            locks = {(kind, name) for kind, name in rows}
+        finally:
+            self._db.execute("COMMIT")
+        # Changes save the map before they commit, so this map is at least as new as `version`.
+        if self.shard_map.path:
+            self.shard_map = ShardMap.load(self.shard_map.path)
+            self._open_shards()
+        self._version, self._locks = version, locks
+
+    def _update_map(self, change: Callable[[ShardMap], T], unlock: Optional[tuple[str, str]] = None) -> T:
+        """Applies `change` to the latest map and saves it, in one coordination transaction."""
+        with self._transaction():
+            shard_map = ShardMap.load(self.shard_map.path) if self.shard_map.path else self.shard_map
+            result = change(shard_map)
+            if unlock is not None:
+                self._db.execute("DELETE FROM locks WHERE kind = ? AND name = ?", unlock)
+            self._bump()
+            shard_map.save()
+        self.shard_map = shard_map
+        self._open_shards()
+        return result
+
+    def _watch_workers(self):
+        """Registers this worker and starts acknowledging versions (needs a running event loop)."""
+        if self._watcher is not None:
+            return
+        with self._transaction():
+            version = self._db.execute("SELECT version FROM version").fetchone()[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO workers VALUES (?, ?, ?)", (self.worker_id, version, time.time())
+            )
+        self._acknowledged = version
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        last_heartbeat = time.monotonic()
+        while True:
+            try:
+                self._refresh()
+                version = self._version
+                if version > self._acknowledged:
+                    while any(routed_at < version for routed_at in self._active):
+                        await asyncio.sleep(POLL_S)
+                    await self.flush()
+                if version > self._acknowledged or time.monotonic() - last_heartbeat > HEARTBEAT_S:
+                    with self._transaction():
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO workers VALUES (?, ?, ?)", (self.worker_id, version, time.time())
+                        )
+                    self._acknowledged = version
+                    last_heartbeat = time.monotonic()
+            except Exception:
+                logger.exception("Shard coordination failed; retrying")
+            await asyncio.sleep(POLL_S)
+
+    async def _lock(self, kind: str, name: str):
+        """Takes a lock row, waiting while a live worker (this one included) holds it."""
+        while True:
+            with self._transaction():
+                row = self._db.execute(
+                    "SELECT 1 FROM locks JOIN workers ON owner = worker_id "
+                    "WHERE kind = ? AND name = ? AND heartbeat > ?",
+                    (kind, name, time.time() - WORKER_TIMEOUT_S),
+                ).fetchone()
+                if row is None:
+                    self._db.execute("INSERT OR REPLACE INTO locks VALUES (?, ?, ?)", (kind, name, self.worker_id))
+                    self._bump()
+                    break
+            await asyncio.sleep(POLL_S)
+        self._refresh()
+
+    def _unlock(self, kind: str, name: str):
+        with self._transaction():
+            deleted = self._db.execute(
+                "DELETE FROM locks WHERE kind = ? AND name = ? AND owner = ?", (kind, name, self.worker_id)
+            ).rowcount
+            if deleted:
+                self._bump()
+
+    async def _wait_for_workers(self):
+        """Waits until every live worker has acknowledged the current version."""
+        version = self._db.execute("SELECT version FROM version").fetchone()[0]
+        while self._db.execute(
+            "SELECT COUNT(*) FROM workers WHERE seen < ? AND heartbeat > ?", (version, time.time() - WORKER_TIMEOUT_S)
+        ).fetchone()[0]:
+            await asyncio.sleep(POLL_S)
+
+    def _blocked(self, user_id: str) -> bool:
+        if ("user", user_id) in self._locks:
+            return True
+        adding = self.shard_map.adding
+        return (
+            ("shard", adding) in self._locks
+            and user_id not in self.shard_map.pins
+            and self.shard_map.home(user_id, with_adding=True) == adding
+        )
+
+    # -------------------- Routing --------------------
+    def shard_for(self, user_id: str) -> TunedSqliteSessionService:
+        return self.shards[self.shard_map.shard_of(user_id)]
+
+    @contextlib.asynccontextmanager
+    async def _route(self, user_id: str):
+        self._watch_workers()
+        self._refresh()
+        while self._blocked(user_id):
+            await asyncio.sleep(POLL_S)
+            self._refresh(force=True)  # Lock rows of dead workers expire without a new version
+        version = self._version
+        self._active[version] += 1
+        try:
+            yield self.shard_for(user_id)
+        finally:
+            self._active[version] -= 1
+            if not self._active[version]:
+                del self._active[version]
+
+    @override
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        async with self._route(user_id) as shard:
+            return await shard.create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+
+    @override
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        async with self._route(user_id) as shard:
+            return await shard.get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def get_or_create_session(
+        self, *, app_name: str, user_id: str, session_id: str, state: Optional[dict[str, Any]] = None
+    ) -> Session:
+        return await get_or_create_session(self, app_name=app_name, user_id=user_id, session_id=session_id, state=state)
+
+    @override
+    async def append_event(self, session: Session, event: Event) -> Event:
+        async with self._route(session.user_id) as shard:
+            return await shard.append_event(session, event)
+
+    @override
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        """Sessions of one user, or of all users on all shards when `user_id` is None."""
+        if user_id is not None:
+            async with self._route(user_id) as shard:
+                return await shard.list_sessions(app_name=app_name, user_id=user_id)
+        self._refresh()
+        names = list(self.shards)
+        responses = await asyncio.gather(*(self.shards[name].list_sessions(app_name=app_name) for name in names))
+        return ListSessionsResponse(
+            sessions=[
+                session
+                for name, response in zip(names, responses)
+                for session in response.sessions
+                # A user caught mid-move can briefly be on two shards; the map says which copy is live.
+                if self.shard_map.shard_of(session.user_id) == name
+            ]
+        )
+
+    @override
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        async with self._route(user_id) as shard:
+            await shard.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def archive_events(self, session: Session, event_ids: list[str], summary: Event):
+        async with self._route(session.user_id) as shard:
+            await shard.archive_events(session, event_ids, summary)
+
+    async def get_archived_events(self, app_name: str, user_id: str, session_id: str) -> list[Event]:
+        async with self._route(user_id) as shard:
+            return await shard.get_archived_events(app_name, user_id, session_id)
+
+    async def create_tables(self):
+        """Creates the tables in every shard (do it once before starting several worker processes)."""
+        for shard in self.shards.values():
+            await shard._ensure_archive_created()
+
+    async def flush(self):
+        await asyncio.gather(*(shard.flush() for shard in self.shards.values()))
+
+    async def close(self):
+        try:
+            if self._watcher is not None:
+                self._watcher.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await self._watcher
+                self._watcher = None
+            await asyncio.gather(*(shard.close() for shard in self.shards.values()))
+        finally:
+            with self._transaction():
+                self._db.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+            self._db.close()
+
+    # -------------------- Rebalancing --------------------
+    async def add_shard(self, name: str, database: str):
+        """Adds an empty shard. Existing users that hash to it stay pinned to their shard until `rebalance`.
+
+        New users that hash to it wait until it is open. Re-running an interrupted add_shard finishes it.
+        """
+        self._watch_workers()
+        self._refresh(force=True)
+        if name in self.shard_map.shards and name != self.shard_map.adding:
+            raise ValueError(f"Shard {name!r} already exists")
+        await self._lock("shard", name)
+        try:
+
+            def add(shard_map: ShardMap):
+                shard_map.shards.setdefault(name, database)
+                shard_map.adding = name
+
+            self._update_map(add)
+            await self.shards[name]._ensure_archive_created()
+            # Calls routed before the shard was announced may still be creating users on their old shard.
+            await self._wait_for_workers()
+            old = [shard for shard in self.shard_map.shards if shard != name]
+            users = set().union(*[await asyncio.to_thread(stored_users, self.shard_map.database(s)) for s in old])
+
+            def open_shard(shard_map: ShardMap):
+                for user in users:
+                    if user not in shard_map.pins and shard_map.home(user, with_adding=True) == name:
+                        shard_map.pins[user] = shard_map.home(user)
+                shard_map.adding = None
+
+            self._update_map(open_shard, unlock=("shard", name))
+        finally:
+            self._unlock("shard", name)
+
+    async def move_user(self, user_id: str, target: str):
+        """Moves all of a user's data to `target`; calls for the user, in any worker, wait until it is done."""
+        self._watch_workers()
+        await self._lock("user", user_id)
+        try:
+            source = self.shard_map.shard_of(user_id)
+            if source == target:
+                return
+            await self._wait_for_workers()
+            await self.create_tables()
+            await asyncio.to_thread(
+                copy_user, self.shard_map.database(source), self.shard_map.database(target), user_id
+            )
+
+            def route(shard_map: ShardMap):
+                if target == shard_map.home(user_id):
+                    shard_map.pins.pop(user_id, None)
+                else:
+                    shard_map.pins[user_id] = target
+
+            self._update_map(route, unlock=("user", user_id))
+            await asyncio.to_thread(delete_user, self.shard_map.database(source), user_id)
+        finally:
+            self._unlock("user", user_id)
+
+    async def rebalance(self) -> int:
+        """Moves pinned users to the shard they hash to and drops stale copies; returns the users moved."""
+        self._watch_workers()
+        self._refresh(force=True)
+        stored = {
+            shard: await asyncio.to_thread(stored_users, self.shard_map.database(shard)) for shard in self.shards
+        }
+        for shard, users in stored.items():
+            for user in users:
+                if self.shard_map.shard_of(user) == shard:
+                    continue
+                # Checked again under the user's lock: the user may be on two shards because another
+                # worker is moving it.
+                await self._lock("user", user)
+                try:
+                    live = self.shard_map.shard_of(user)
+                    if live == shard:
+                        continue
+                    if user in await asyncio.to_thread(stored_users, self.shard_map.database(live)):
+                        # Left behind by an interrupted move: the live copy is on `live`.
+                        await asyncio.to_thread(delete_user, self.shard_map.database(shard), user)
+                    else:
+                        logger.warning(
+                            "User %s found on %s but routed to %s; pinning it to %s", user, shard, live, shard
+                        )
+
+                        def pin(shard_map: ShardMap, user=user, shard=shard):
+                            shard_map.pins[user] = shard
+
+                        self._update_map(pin)
+                finally:
+                    self._unlock("user", user)
+        moved = 0
+        for user, shard in list(self.shard_map.pins.items()):
+            home = self.shard_map.home(user)
+            if shard != home:
+                await self.move_user(user, home)
+                moved += 1
+        return moved
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Live users, pinned users and stored sessions per shard."""
+        result = {}
+        for shard in self.shards:
+            users = stored_users(self.shard_map.database(shard))
+            result[shard] = {
+                "users": sum(self.shard_map.shard_of(user) == shard for user in users),
+                "pinned": sum(pinned == shard for pinned in self.shard_map.pins.values()),
+                "sessions": count_sessions(self.shard_map.database(shard)),
+            }
+        return result
+
+
+async def admin(args: argparse.Namespace):
+    if args.command == "init":
+        ShardMap.create(args.map, args.shards)
+    service = ShardedSessionService(args.map)
+    try:
+        await service.create_tables()
+        if args.command == "add-shard":
+            await service.add_shard(args.name, args.database)
+        elif args.command == "rebalance":
+            print(f"Moved {await service.rebalance()} users")
+        for shard, counts in service.stats().items():
+            columns = "".join(f"{key} {value:<8}" for key, value in counts.items())
+            print(f"{shard:<12}{service.shard_map.shards[shard]:<24}{columns}")
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the shard map of a ShardedSessionService.")
+    parser.add_argument("map", help="Shard map JSON file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("init", help="Create a new map").add_argument("--shards", type=int, default=4)
+    add = commands.add_parser("add-shard", help="Add an empty shard; its users stay pinned until rebalance")
+    add.add_argument("name")
+    add.add_argument("database", help="SQLite file, relative to the map file")
+    commands.add_parser("rebalance", help="Move pinned users to the shard they hash to")
+    commands.add_parser("stats", help="Users and sessions per shard")
+    asyncio.run(admin(parser.parse_args()))
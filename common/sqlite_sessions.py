@@ -0,0 +1,421 @@
+# DatabaseSessionService tuned for a local SQLite file (same schema, so existing databases keep working).
+#
+#   session_service = TunedSqliteSessionService("my_agent_data.db")
+#
+# - WAL journal with a configurable `synchronous` level (NORMAL: no fsync per commit, still crash-safe
+#   for the application; the last commits can be lost on power failure).
+# - One writer connection, so concurrent runs queue in the pool instead of fighting over the write lock.
+# - Group commit: appended events are applied to the in-memory session at once and queued per turn (at
+#   the turn's final response, after `max_batch_events`, or `max_delay_s` after the first buffered event).
+#   The writer commits everything queued, across sessions, in one transaction, with one savepoint per
+#   session: a session whose write fails is rolled back alone, its events are buffered again for the
+#   next flush, and the error is raised to the caller (or, for a timed flush, by that session's next
+#   append_event/flush).
+# - A pool of read-only connections serves get_session with statements built once and cached by
+#   SQLAlchemy and sqlite3.
+# - `get_or_create_session` costs returning users one read on the read pool (no failed INSERT + rollback).
+# - `archive_events` moves compacted events (see common/session_compaction.py) to an `archived_events`
+#   table with the same columns, so loading a long-lived session stays cheap.
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.events.event_actions import EventCompaction
+from google.adk.sessions import DatabaseSessionService, Session
+from google.adk.sessions import _session_util
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.database_session_service import (
+    StorageAppState,
+    StorageEvent,
+    StorageSession,
+    StorageUserState,
+    _merge_state,
+)
+from sqlalchemy import bindparam, delete, event as sa_event, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from typing_extensions import override
+
+
+logger = logging.getLogger(__name__)
+
+SessionKey = tuple[str, str, str]  # (app_name, user_id, session_id)
+
+EVENTS_QUERY = (
+    select(StorageEvent)
+    .where(
+        StorageEvent.app_name == bindparam("app_name"),
+        StorageEvent.user_id == bindparam("user_id"),
+        StorageEvent.session_id == bindparam("session_id"),
+    )
+    .order_by(StorageEvent.timestamp.desc())
+)
+
+EVENT_COLUMNS = ", ".join(column.name for column in StorageEvent.__table__.columns)
+
+CREATE_ARCHIVE_SQL = (
+    f"CREATE TABLE IF NOT EXISTS archived_events AS SELECT {EVENT_COLUMNS}, NULL AS archived_at FROM events WHERE 0",
+    "CREATE INDEX IF NOT EXISTS idx_archived_events_session ON archived_events(app_name, user_id, session_id)",
+)
+
+ARCHIVE_SQL = text(
+    f"""INSERT INTO archived_events SELECT {EVENT_COLUMNS}, CURRENT_TIMESTAMP FROM events
+        WHERE app_name = :app_name AND user_id = :user_id AND session_id = :session_id AND id IN :ids"""
+).bindparams(bindparam("ids", expanding=True))
+
+ARCHIVED_EVENTS_QUERY = text(
+    f"""SELECT {EVENT_COLUMNS} FROM archived_events
+        WHERE app_name = :app_name AND user_id = :user_id AND session_id = :session_id ORDER BY timestamp"""
+)
+
+
+def _to_event(storage_event: StorageEvent) -> Event:
+    event = storage_event.to_event()
+    # StorageEvent.to_event copies actions without validation, which leaves a compaction as a dict.
+    if isinstance(event.actions.compaction, dict):
+        event.actions.compaction = EventCompaction.model_validate(event.actions.compaction)
+    return event
+
+
+def _pragmas(synchronous: str, read_only: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-16384")  # 16 MB page cache per connection
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        else:
+            # Transactions are begun explicitly (see _begin), so SAVEPOINTs nest inside them.
+            dbapi_connection.isolation_level = None
+        cursor.close()
+
+    return on_connect
+
+
+def _begin(connection):
+    # IMMEDIATE takes the write lock up front, so a read-then-write cannot fail on an upgraded lock.
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class TunedSqliteSessionService(DatabaseSessionService):
+    """DatabaseSessionService for SQLite with WAL, group commit and pooled read connections."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        synchronous: str = "NORMAL",
+        read_pool_size: int = 4,
+        group_commit: bool = True,
+        max_batch_events: int = 64,
+        max_delay_s: float = 0.05,
+        cached_statements: int = 256,
+    ):
+        url = f"sqlite+aiosqlite:///{path}"
+        connect_args = {"cached_statements": cached_statements}
+        super().__init__(url, pool_size=1, max_overflow=0, connect_args=connect_args)
+        sa_event.listen(self.db_engine.sync_engine, "connect", _pragmas(synchronous, read_only=False))
+        sa_event.listen(self.db_engine.sync_engine, "begin", _begin)
+
+        self.read_engine = create_async_engine(
+            url, pool_size=read_pool_size, max_overflow=0, connect_args=connect_args
+        )
+        sa_event.listen(self.read_engine.sync_engine, "connect", _pragmas(synchronous, read_only=True))
+        self.read_session_factory = async_sessionmaker(bind=self.read_engine, expire_on_commit=False)
+
+        self.group_commit = group_commit
+        self.max_batch_events = max_batch_events
+        self.max_delay_s = max_delay_s
+        self._buffers: dict[SessionKey, tuple[Session, list[Event]]] = {}
+        self._timers: dict[SessionKey, asyncio.Task] = {}
+        self._queue: list[tuple[tuple[Session, list[Event]], asyncio.Future]] = []  # Waiting for the writer
+        self._last_write: dict[SessionKey, asyncio.Future] = {}  # Latest queued write per session
+        self._failures: dict[SessionKey, Exception] = {}  # Failed timed flushes, raised on the next call
+        self._write_lock = asyncio.Lock()
+        self._archive_created = False
+
+    @override
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if not self.group_commit:
+            return await super().append_event(session, event)
+        await self._ensure_tables_created()
+        if event.partial:
+            return event
+        self._raise_failure((session.app_name, session.user_id, session.id))
+        event = self._trim_temp_delta_state(event)
+        self._update_session_state(session, event)
+        session.events.append(event)
+
+        key = (session.app_name, session.user_id, session.id)
+        _, events = self._buffers.setdefault(key, (session, []))
+        events.append(event)
+        end_of_turn = event.author != "user" and event.is_final_response()
+        if end_of_turn or len(events) >= self.max_batch_events:
+            await self.flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+        return event
+
+    async def _flush_later(self, key: SessionKey):
+        await asyncio.sleep(self.max_delay_s)
+        self._timers.pop(key, None)
+        try:
+            await self.flush(key)
+        except Exception as e:
+            logger.exception("Group commit for session %s failed; its events stay buffered", key[2])
+            self._failures[key] = e
+
+    def _raise_failure(self, key: SessionKey):
+        failure = self._failures.pop(key, None)
+        if failure is not None:
+            raise failure
+
+    def _requeue(self, session: Session, events: list[Event]):
+        """Puts events back in front of the session's buffer, to be written by its next flush."""
+        key = (session.app_name, session.user_id, session.id)
+        _, buffered = self._buffers.setdefault(key, (session, []))
+        buffered[:0] = events
+
+    async def flush(self, key: SessionKey | None = None):
+        """Writes buffered events (of one session, or of all) and waits until they are committed.
+
+        Whoever takes the writer lock commits everything queued so far, for all sessions, in one
+        transaction; callers that queued meanwhile find their events already written. Flushing one
+        session first raises a failure of its last timed flush (the events are retried next time);
+        flushing all retries everything.
+        """
+        if key is not None:
+            self._raise_failure(key)
+        else:
+            self._failures.clear()
+        keys = [key] if key is not None else list(self._buffers)
+        waits = []
+        for session_key in keys:
+            timer = self._timers.pop(session_key, None)
+            if timer is not None and timer is not asyncio.current_task():
+                timer.cancel()
+            buffered = self._buffers.pop(session_key, None)
+            if buffered:
+                self._queue.append((buffered, asyncio.get_running_loop().create_future()))
+                self._last_write[session_key] = self._queue[-1][1]
+            if session_key in self._last_write:
+                waits.append(self._last_write[session_key])
+
+        async with self._write_lock:
+            batch, self._queue = self._queue, []
+            if batch:
+                await self._write(batch)
+        for session_key in keys:
+            if self._last_write.get(session_key) in waits:
+                del self._last_write[session_key]
+        for wait in waits:
+            await wait
+
+    async def _write(self, batch: list[tuple[tuple[Session, list[Event]], asyncio.Future]]):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        written, failed = [], []
+        try:
+            async with self.database_session_factory() as sql_session:
+                for (session, events), done in batch:
+                    try:
+                        async with sql_session.begin_nested():  # SAVEPOINT: a failure only undoes this session
+                            storage_session = await sql_session.get(
+                                StorageSession, (session.app_name, session.user_id, session.id)
+                            )
+                            if storage_session is None:
+                                logger.warning("Dropping %d events of deleted session %s", len(events), session.id)
+                                done.set_result(None)
+                                continue
+                            if storage_session.update_timestamp_tz > session.last_update_time:
+                                stale = f"Session {session.id} was updated elsewhere; its buffered events are stale."
+                                done.set_exception(ValueError(stale))
+                                continue
+                            for event in events:
+                                if event.actions and event.actions.state_delta:
+                                    await self._apply_delta(
+                                        sql_session, session, storage_session, event.actions.state_delta
+                                    )
+                                sql_session.add(StorageEvent.from_event(session, event))
+                            storage_session.update_time = now
+                        written.append((session, done))
+                    except Exception as e:
+                        failed.append(((session, events), done, e))
+                await sql_session.commit()
+        except BaseException as e:
+            for (session, events), done in batch:
+                if not done.done():
+                    self._requeue(session, events)
+                    done.set_exception(e if isinstance(e, Exception) else RuntimeError("Group commit was cancelled"))
+            if not isinstance(e, Exception):
+                raise
+            return
+        for (session, events), done, e in failed:
+            logger.warning("Writing %d events of session %s failed: %s", len(events), session.id, e)
+            self._requeue(session, events)
+            done.set_exception(e)
+        for session, done in written:
+            session.last_update_time = now.replace(tzinfo=timezone.utc).timestamp()
+            done.set_result(None)
+
+    async def _apply_delta(self, sql_session, session: Session, storage_session: StorageSession, state_delta: dict):
+        deltas = _session_util.extract_state_delta(state_delta)
+        if deltas["app"]:
+            storage_app_state = await sql_session.get(StorageAppState, (session.app_name))
+            storage_app_state.state = storage_app_state.state | deltas["app"]
+        if deltas["user"]:
+            storage_user_state = await sql_session.get(StorageUserState, (session.app_name, session.user_id))
+            storage_user_state.state = storage_user_state.state | deltas["user"]
+        if deltas["session"]:
+            storage_session.state = storage_session.state | deltas["session"]
+
+    @override
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        if config and (config.after_timestamp or config.num_recent_events):
+            await self.flush((app_name, user_id, session_id))
+            session = await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+            for event in session.events if session else []:
+                if isinstance(event.actions.compaction, dict):
+                    event.actions.compaction = EventCompaction.model_validate(event.actions.compaction)
+            return session
+
+        await self._ensure_tables_created()
+        await self.flush((app_name, user_id, session_id))
+        async with self.read_session_factory() as sql_session:
+            storage_session = await sql_session.get(StorageSession, (app_name, user_id, session_id))
+            if storage_session is None:
+                return None
+            result = await sql_session.execute(
+                EVENTS_QUERY, {"app_name": app_name, "user_id": user_id, "session_id": session_id}
+            )
+            storage_events = result.scalars().all()
+            storage_app_state = await sql_session.get(StorageAppState, (app_name))
+            storage_user_state = await sql_session.get(StorageUserState, (app_name, user_id))
+            state = _merge_state(
+                storage_app_state.state if storage_app_state else {},
+                storage_user_state.state if storage_user_state else {},
+                storage_session.state,
+            )
+            return storage_session.to_session(state=state, events=[_to_event(e) for e in reversed(storage_events)])
+
+    async def get_or_create_session(
+        self, *, app_name: str, user_id: str, session_id: str, state: Optional[dict[str, Any]] = None
+    ) -> Session:
+        """The session, created with `state` if it does not exist yet."""
+        return await get_or_create_session(self, app_name=app_name, user_id=user_id, session_id=session_id, state=state)
+
+    async def archive_events(self, session: Session, event_ids: list[str], summary: Event):
+        """Replaces the given events with `summary` in one transaction, moving them to `archived_events`.
+
+        `summary` is stored as a regular event; the in-memory `session` is updated the same way.
+        """
+        await self._ensure_archive_created()
+        await self.flush((session.app_name, session.user_id, session.id))
+        params = {"app_name": session.app_name, "user_id": session.user_id, "session_id": session.id, "ids": event_ids}
+        async with self._write_lock:
+            async with self.database_session_factory() as sql_session:
+                await sql_session.execute(ARCHIVE_SQL, params)
+                await sql_session.execute(
+                    delete(StorageEvent).where(
+                        StorageEvent.app_name == session.app_name,
+                        StorageEvent.user_id == session.user_id,
+                        StorageEvent.session_id == session.id,
+                        StorageEvent.id.in_(event_ids),
+                    )
+                )
+                sql_session.add(StorageEvent.from_event(session, summary))
+                await sql_session.commit()
+        archived = set(event_ids)
+        session.events = [summary] + [event for event in session.events if event.id not in archived]
+
+    async def _ensure_archive_created(self):
+        await self._ensure_tables_created()
+        if self._archive_created:
+            return
+        async with self.database_session_factory() as sql_session:
+            for statement in CREATE_ARCHIVE_SQL:
+                await sql_session.execute(text(statement))
+            await sql_session.commit()
+        self._archive_created = True
+
+    async def get_archived_events(self, app_name: str, user_id: str, session_id: str) -> list[Event]:
+        """Raw events moved out of a session by `archive_events`, oldest first."""
+        await self._ensure_archive_created()
+        async with self.read_session_factory() as sql_session:
+            result = await sql_session.execute(
+                select(StorageEvent).from_statement(ARCHIVED_EVENTS_QUERY),
+                {"app_name": app_name, "user_id": user_id, "session_id": session_id},
+            )
+            return [_to_event(storage_event) for storage_event in result.scalars().all()]
+
+    @override
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        await self.flush()
+        return await super().list_sessions(app_name=app_name, user_id=user_id)
+
+    @override
+    async def delete_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        self._buffers.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        await self._ensure_archive_created()
+        async with self.database_session_factory() as sql_session:
+            await sql_session.execute(
+                text(
+                    "DELETE FROM archived_events WHERE app_name = :app_name AND user_id = :user_id"
+                    " AND session_id = :session_id"
+                ),
+                {"app_name": app_name, "user_id": user_id, "session_id": session_id},
+            )
+            await sql_session.commit()
+
+    async def close(self):
+        try:
+            await self.flush()
+        finally:
+            await self.read_engine.dispose()
+            await self.db_engine.dispose()
+
+
+async def get_or_create_session(
+    service: BaseSessionService,
+    *,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    state: Optional[dict[str, Any]] = None,
+) -> Session:
+    """Reads the session and creates it only when missing, for any session service.
+
+    Concurrent callers racing to create the same session all get the one that was stored.
+    """
+    session = await service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    if session is not None:
+        return session
+    try:
+        return await service.create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+    except (AlreadyExistsError, IntegrityError):
+        return await service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+
+def build_session_service(path: str, profile: str = "tuned", **kwargs: Any) -> DatabaseSessionService:
+    """SESSION_DB_PROFILE-style switch: "tuned" (TunedSqliteSessionService) or "default" (stock settings)."""
+    if profile == "default":
+        return DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{path}")
+    return TunedSqliteSessionService(path, **kwargs)
@@ -0,0 +1,111 @@
+import json
+import logging
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models import LlmRequest
+from google.genai import types
+from pydantic import BaseModel
+from typing_extensions import override
+
+from common.json_output import validate_output
+
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_STATE_KEY = "structured_output_feedback"
+
+
+def add_validation_feedback(callback_context: CallbackContext, llm_request: LlmRequest):
+    """before_model_callback: on a re-prompt, tells the model why its previous output was rejected."""
+    if feedback := callback_context.state.get(FEEDBACK_STATE_KEY):
+        llm_request.contents.append(types.Content(role="user", parts=[types.Part(text=feedback)]))
+    return None
+
+
+class StructuredOutputAgent(BaseAgent):
+    """Validates the JSON its single LlmAgent sub-agent leaves in `state_key` against `output_schema`.
+
+    Output that can be repaired in code (fences, trailing commas, truncation, invalid list
+    items) is rewritten to `state_key` as clean JSON, so downstream `{placeholders}` always get
+    valid input. Otherwise only the sub-agent is re-prompted with the validation errors, up to
+    `max_reprompts` times; the surrounding SequentialAgent is never restarted.
+
+    When `state_key` is written by one of the sub-agent's tools (`tool`) rather than by its
+    output_key, a JSON reply would be discarded, so the re-prompt asks for a corrected tool call.
+    """
+
+    output_schema: type[BaseModel]
+    state_key: str
+    tool: str | None = None
+    max_reprompts: int = 1
+
+    def model_post_init(self, __context) -> None:
+        super().model_post_init(__context)
+        agent = self.sub_agents[0]
+        callbacks = agent.before_model_callback or []
+        if not isinstance(callbacks, list):
+            callbacks = [callbacks]
+        if add_validation_feedback not in callbacks:
+            agent.before_model_callback = [*callbacks, add_validation_feedback]
+
+    def _reprompt_ctx(self, ctx: InvocationContext, feedback: str) -> InvocationContext:
+        # Shallow session copy: same event list, own state carrying the feedback (never persisted).
+        reprompt_ctx = ctx.model_copy()
+        reprompt_ctx.session = ctx.session.model_copy(update={"state": {**ctx.session.state, FEEDBACK_STATE_KEY: feedback}})
+        return reprompt_ctx
+
+    @override
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        agent = self.sub_agents[0]
+        run_ctx = ctx
+        for attempt in range(self.max_reprompts + 1):
+            async for event in agent.run_async(run_ctx):
+                yield event
+
+            output, error = validate_output(ctx.session.state.get(self.state_key), self.output_schema)
+            if output is not None:
+                yield Event(
+                    invocation_id=ctx.invocation_id,
+                    author=self.name,
+                    branch=ctx.branch,
+                    actions=EventActions(state_delta={self.state_key: output.model_dump_json()}),
+                )
+                return
+
+            logger.warning("%s: invalid %s output (attempt %d): %s", self.name, agent.name, attempt + 1, error)
+            run_ctx = self._reprompt_ctx(ctx, self._feedback(ctx.session.state.get(self.state_key), error))
+        logger.warning("%s: keeping unvalidated %s output after %d re-prompts", self.name, agent.name, self.max_reprompts)
+
+    def _feedback(self, raw, error: str) -> str:
+        schema = json.dumps(self.output_schema.model_json_schema())
+        if self.tool is None:
+            return (
+                f"Your previous output failed validation:\n{error}\n\n"
+                f"Reply again with ONLY the corrected JSON, matching this JSON Schema:\n{schema}"
+            )
+        problem = f"`{self.tool}` was not called." if raw is None else f"The result of `{self.tool}` failed validation:\n{error}"
+        return (
+            f"{problem}\n\nCall `{self.tool}` now, with corrected arguments; only its result is kept, "
+            f"so do not reply with JSON. The result must match this JSON Schema:\n{schema}"
+        )
+
+
+def validated(
+    agent: LlmAgent, output_schema: type[BaseModel], state_key: str | None = None, tool: str | None = None
+) -> StructuredOutputAgent:
+    """Wraps `agent` so its output (in `state_key`, default: its output_key) is schema-checked.
+
+    Pass `tool` when `state_key` is written by that tool of `agent` instead of by its output_key.
+    """
+    return StructuredOutputAgent(
+        name=f"{agent.name}_validated",
+        description=agent.description,
+        sub_agents=[agent],
+        output_schema=output_schema,
+        state_key=state_key or agent.output_key,
+        tool=tool,
+    )
@@ -0,0 +1,398 @@
+# Long-term memory across sessions: completed turns embedded locally, one vector matrix per user.
+#
+#   memory_service = VectorMemoryService("memory")
+#   runner = Runner(app=app, session_service=..., memory_service=memory_service)
+#
+# Each user's memories live in `<root>/<app>/<user>/` as memory-mapped matrices, one row per memory:
+# `coarse.npy` (a 96-dim random projection, float32, stored column-major) is scanned with one
+# matrix-vector product, and the best candidates are re-ranked by exact cosine against `vectors.npy`
+# (the full embeddings; only the candidates' rows are read).
+# `memories.jsonl` holds the records, in row order. Appends go to raw tail files next to each matrix;
+# every `repack_every` appends the tails are folded into new packed matrices.
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Protocol, Sequence
+from urllib.parse import quote
+
+import numpy as np
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.models import LlmRequest
+from google.adk.plugins import BasePlugin
+from google.adk.sessions import Session
+from google.genai import types
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_DIR = "memory"
+COARSE_DIM = 96  # 100k x 96 float32 is 38 MB, scanned column-major in ~3 ms on one core
+RERANK_CANDIDATES = 512  # Enough for the exact-scan top hit to be re-ranked ~98% of the time at 96 dims
+QUESTION_WEIGHT = 2.0  # A turn's vector leans towards what the user said
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "about", "am", "an", "and", "are", "as", "at", "be", "by", "do", "for", "from", "how", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "which",
+    "who", "with", "you", "your",
+}
+
+
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """One L2-normalized float32 row per text."""
+        ...
+
+
+class HashingEmbedder:
+    """Dependency-free embedder: signed feature hashing of the distinct words of a text.
+
+    Matches on shared vocabulary only (no synonyms), which is enough for names, places and preferences.
+    Each word counts once, so a long repetitive answer does not drown the rest of the turn.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in set(TOKEN_PATTERN.findall(text.lower())) - STOPWORDS:
+                h = zlib.crc32(word.encode())
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """Local neural embeddings (`pip install sentence-transformers`), e.g. all-MiniLM-L6-v2 (384 dims)."""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(list(texts), normalize_embeddings=True).astype(np.float32)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+def _top_indices(scores: np.ndarray, count: int) -> np.ndarray:
+    """Indices of the `count` highest scores, unordered (same set as `np.argpartition`, faster on long arrays).
+
+    A strided sample gives a threshold that about twice `count` scores reach; only those are partitioned.
+    """
+    step = 32
+    if len(scores) >= 4 * step * count:
+        sample = scores[::step]
+        threshold = np.partition(sample, -2 * count // step)[-2 * count // step]
+        above = np.flatnonzero(scores >= threshold)
+        if len(above) >= count:
+            return above[np.argpartition(scores[above], -count)[-count:]]
+    return np.argpartition(scores, -count)[-count:]
+
+
+class PackedMatrix:
+    """A memory-mapped `<name>.npy` matrix plus rows appended since the last re-pack in a raw `<name>.tail`.
+
+    With `column_major`, re-packs store the matrix in Fortran order: BLAS then scans it for `dot`
+    about twice as fast as row by row, but reading single rows (`take`) gets slow.
+    """
+
+    def __init__(self, path: str, dim: int, dtype: type, column_major: bool = False):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.column_major = column_major
+        self._path = path + ".npy"
+        self._tail_path = path + ".tail"
+        self._mapping: np.memmap | None = None
+        self.packed = self._map() if os.path.exists(self._path) else self._empty()
+        if self.packed.shape[1] != dim:
+            raise ValueError(f"{self._path} has {self.packed.shape[1]} dims, expected {dim}")
+        tail = np.fromfile(self._tail_path, dtype=self.dtype) if os.path.exists(self._tail_path) else self._empty()
+        self.tail = tail[: tail.size - tail.size % dim].reshape(-1, dim)
+
+    def _map(self) -> np.ndarray:
+        self._mapping = np.load(self._path, mmap_mode="r")
+        return np.asarray(self._mapping)  # Plain ndarray view: skips np.memmap's per-operation overhead.
+
+    def _empty(self) -> np.ndarray:
+        return np.zeros((0, self.dim), dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.packed) + len(self.tail)
+
+    def truncate(self, rows: int):
+        """Drops tail rows past `rows` (left behind by an interrupted append or re-pack)."""
+        keep = max(0, rows - len(self.packed))
+        if keep < len(self.tail):
+            self.tail = self.tail[:keep].copy()
+            self.tail.tofile(self._tail_path)
+
+    def append(self, rows: np.ndarray):
+        rows = np.ascontiguousarray(rows, dtype=self.dtype)
+        with open(self._tail_path, "ab") as f:
+            f.write(rows.tobytes())
+        self.tail = np.vstack([self.tail, rows])
+
+    def dot(self, query: np.ndarray) -> np.ndarray:
+        scores = self.packed @ query
+        return np.concatenate([scores, self.tail @ query]) if len(self.tail) else scores
+
+    def take(self, indices: np.ndarray) -> np.ndarray:
+        if not len(self.tail):
+            return self.packed[indices]
+        split = len(self.packed)
+        return np.concatenate([self.packed[indices[indices < split]], self.tail[indices[indices >= split] - split]])
+
+    def repack(self):
+        if not len(self.tail):
+            return
+        temporary = self._path + ".tmp.npy"
+        rows = np.vstack([self.packed, self.tail])
+        np.save(temporary, np.asfortranarray(rows) if self.column_major else rows)
+        if self._mapping is not None:
+            self._mapping._mmap.close()  # Windows cannot replace a mapped file.
+        os.replace(temporary, self._path)
+        open(self._tail_path, "wb").close()
+        self.packed = self._map()
+        self.tail = self._empty()
+
+
+class VectorIndex:
+    """One user's memories: coarse and full vector matrices plus their records, appended in that order."""
+
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        os.makedirs(directory, exist_ok=True)
+        self._records_path = os.path.join(directory, "memories.jsonl")
+        self._lock = threading.Lock()
+
+        # Small embeddings are scanned directly; larger ones through a fixed random orthogonal projection
+        # (orthonormal columns distort cosines less than independent Gaussian ones).
+        self.projection = None
+        if dim > COARSE_DIM:
+            gaussian = np.random.default_rng(0).standard_normal((dim, COARSE_DIM))
+            self.projection = np.linalg.qr(gaussian)[0].astype(np.float32)
+        self.full = PackedMatrix(os.path.join(directory, "vectors"), dim, np.float32) if self.projection is not None else None
+        self.coarse = self._open_coarse()
+
+        self.records: list[dict] = []
+        if os.path.exists(self._records_path):
+            with open(self._records_path, encoding="utf-8") as f:
+                self.records = [json.loads(line) for line in f if line.strip()]
+        rows = min(len(self.records), *(len(m) for m in self._matrices()))
+        if rows < len(self.records):
+            self.records = self.records[:rows]
+            with open(self._records_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in self.records)
+        for matrix in self._matrices():
+            matrix.truncate(rows)
+        self.ids = {record["id"] for record in self.records}
+
+    def _open_coarse(self) -> PackedMatrix:
+        """The coarse matrix; one written with another COARSE_DIM is rebuilt from the full vectors."""
+        path = os.path.join(self.directory, "coarse")
+        width = min(self.dim, COARSE_DIM)
+        try:
+            return PackedMatrix(path, width, np.float32, column_major=True)
+        except ValueError:
+            if self.full is None:
+                raise
+        logger.info("Rebuilding %s.npy with %d dims", path, width)
+        for suffix in (".npy", ".tail"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        coarse = PackedMatrix(path, width, np.float32, column_major=True)
+        for start in range(0, len(self.full), 65536):
+            coarse.append(self._coarse(self.full.take(np.arange(start, min(start + 65536, len(self.full))))))
+        coarse.repack()
+        return coarse
+
+    def _matrices(self) -> list[PackedMatrix]:
+        return [self.coarse] if self.full is None else [self.coarse, self.full]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def tail_size(self) -> int:
+        return len(self.coarse.tail)
+
+    def _coarse(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors if self.projection is None else _normalize(vectors @ self.projection)
+
+    def add(self, vectors: np.ndarray, records: list[dict]):
+        with self._lock:
+            self.coarse.append(self._coarse(vectors))
+            if self.full is not None:
+                self.full.append(vectors)
+            with open(self._records_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+            self.records += records
+            self.ids.update(record["id"] for record in records)
+
+    def search(self, query: np.ndarray, k: int) -> list[tuple[float, dict]]:
+        """The `k` records closest to `query` (normalized) by cosine similarity, best first."""
+        with self._lock:  # A re-pack closes the old mappings.
+            # The projected query is not normalized: scaling it scales every score and leaves the ranking alone.
+            scores = self.coarse.dot(query if self.projection is None else query @ self.projection)
+            if self.full is not None and len(scores) > RERANK_CANDIDATES:
+                candidates = np.sort(_top_indices(scores, RERANK_CANDIDATES))
+                scores = self.full.take(candidates) @ query
+            else:
+                candidates = np.arange(len(scores))
+                if self.full is not None:
+                    scores = self.full.take(candidates) @ query
+            top = np.argpartition(scores, -k)[-k:] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(scores[top])[::-1]]
+            return [(float(scores[i]), self.records[candidates[i]]) for i in top]
+
+    def repack(self):
+        with self._lock:
+            for matrix in self._matrices():
+                matrix.repack()
+
+
+def turn_records(session: Session) -> list[dict]:
+    """One record per completed turn: the user's message and the agent's final answer."""
+    turns: dict[str, dict] = {}
+    for event in session.events:
+        if event.partial or not event.content or not event.invocation_id:
+            continue
+        text = "".join(part.text or "" for part in event.content.parts or []).strip()
+        if not text:
+            continue
+        turn = turns.setdefault(event.invocation_id, {"question": None, "answer": None, "timestamp": event.timestamp})
+        if event.author == "user":
+            turn["question"] = turn["question"] or text
+        elif event.is_final_response():
+            turn["answer"], turn["author"] = text, event.author
+    return [
+        {
+            "id": invocation_id,
+            "session_id": session.id,
+            "timestamp": datetime.fromtimestamp(turn["timestamp"], timezone.utc).isoformat(),
+            "question": turn["question"],
+            "text": f"user: {turn['question']}\n{turn['author']}: {turn['answer']}",
+        }
+        for invocation_id, turn in turns.items()
+        if turn["question"] and turn["answer"]
+    ]
+
+
+class VectorMemoryService(BaseMemoryService):
+    """BaseMemoryService over per-user VectorIndex files, with a pluggable local Embedder."""
+
+    def __init__(
+        self,
+        root: str = DEFAULT_MEMORY_DIR,
+        embedder: Embedder | None = None,
+        top_k: int = 5,
+        min_score: float = 0.2,
+        repack_every: int = 1024,
+    ):
+        self.root = root
+        self.embedder = embedder or HashingEmbedder()
+        self.top_k = top_k
+        self.min_score = min_score
+        self.repack_every = repack_every
+        self._indexes: dict[tuple[str, str], VectorIndex] = {}
+        self._lock = threading.Lock()
+
+    def index(self, app_name: str, user_id: str) -> VectorIndex:
+        key = (app_name, user_id)
+        with self._lock:
+            if key not in self._indexes:
+                directory = os.path.join(self.root, quote(app_name, safe=""), quote(user_id, safe=""))
+                self._indexes[key] = VectorIndex(directory, self.embedder.dim)
+            return self._indexes[key]
+
+    def embed_records(self, records: list[dict]) -> np.ndarray:
+        vectors = self.embedder.embed([record["text"] for record in records])
+        turns = [i for i, record in enumerate(records) if record.get("question")]
+        if turns:
+            questions = self.embedder.embed([records[i]["question"] for i in turns])
+            vectors[turns] = _normalize(QUESTION_WEIGHT * questions + vectors[turns])
+        return vectors
+
+    def add_records(self, app_name: str, user_id: str, records: list[dict]) -> int:
+        """Embeds and stores records ({"id", "text", optional "question"}) not stored yet; returns how many."""
+        index = self.index(app_name, user_id)
+        records = [record for record in records if record["id"] not in index.ids]
+        if records:
+            index.add(self.embed_records(records), records)
+            if index.tail_size >= self.repack_every:
+                index.repack()
+        return len(records)
+
+    async def add_session_to_memory(self, session: Session):
+        self.add_records(session.app_name, session.user_id, turn_records(session))
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        index = self.index(app_name, user_id)
+        if not len(index):
+            return SearchMemoryResponse()
+        hits = index.search(self.embedder.embed([query])[0], self.top_k)
+        return SearchMemoryResponse(
+            memories=[
+                MemoryEntry(
+                    id=record["id"],
+                    content=types.Content(role="user", parts=[types.Part(text=record["text"])]),
+                    timestamp=record.get("timestamp"),
+                    custom_metadata={"session_id": record.get("session_id"), "score": round(score, 4)},
+                )
+                for score, record in hits
+                if score >= self.min_score
+            ]
+        )
+
+    def repack(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            index.repack()
+
+
+class MemoryPlugin(BasePlugin):
+    """Saves each completed run to the Runner's memory service and trims the prompt to the recent turns.
+
+    Pair with `preload_memory_tool` on the agent: the model then sees the last `recent_turns` turns
+    verbatim plus the memories most similar to the new message, instead of the whole session.
+    """
+
+    def __init__(self, recent_turns: int = 2):
+        super().__init__(name="long_term_memory")
+        self.recent_turns = recent_turns
+
+    async def before_model_callback(self, *, callback_context: CallbackContext, llm_request: LlmRequest):
+        user_turns = [
+            i
+            for i, content in enumerate(llm_request.contents)
+            if content.role == "user" and any(part.text for part in content.parts or [])
+        ]
+        if len(user_turns) > self.recent_turns:
+            llm_request.contents = llm_request.contents[user_turns[-self.recent_turns] :]
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        if invocation_context.memory_service is None:
+            return
+        try:
+            await invocation_context.memory_service.add_session_to_memory(invocation_context.session)
+        except Exception:
+            logger.exception("Saving session %s to memory failed", invocation_context.session.id)
@@ -1,6 +1,8 @@
 from google.adk import Agent
 from google.adk.agents import SequentialAgent
 
+from common.llm_cache import enable_response_cache
+
 outline_agent = Agent(
     name="OutlineAgent",
     model="gemini-2.5-flash-lite",
@@ -37,3 +39,7 @@ root_agent = SequentialAgent(
     name="BlogPipeline",
     sub_agents=[outline_agent, writer_agent, editor_agent],
 )
+
+
+# Opt-in response cache for reruns (set LLM_CACHE_PATH, e.g. to .llm_cache.db).
+enable_response_cache(root_agent)
@@ -1,8 +1,20 @@
 # Minimal pipeline with a refinement loop (readable text output, no greetings).
-# Query → Harvest/Enrich → Summarize → (Critic ↔ Refiner) x3 → Output
-
-from google.adk.agents import Agent, SequentialAgent, LoopAgent
-from google.adk.tools import google_search, FunctionTool
+# Query → Harvest/Enrich → Index → Summarize new papers (one call per paper) → Assemble digest → (Critic ↔ Refiner) x3 → Output
+# Papers already summarized on a previous run are served from the local paper index (paper_index.py).
+
+from google.adk.agents import Agent, SequentialAgent
+from google.adk.tools import google_search
+from google.adk.tools.google_search_tool import GoogleSearchTool
+
+from common.edit_refiner import EDIT_LIST_FORMAT, edit_refiner, no_edits, refinement_mode
+from common.llm_cache import enable_response_cache
+from common.loop_control import EarlyExitLoopAgent, exact_token, similar_to_previous
+from common.map_reduce import MapReduceAgent, state_items
+from common.search_cache import enable_search_cache
+from common.structured_output import validated
+from day1.papers_news.dedupe import make_dedupe_tool
+from day1.papers_news.paper_index import DigestAssemblerAgent, PaperIndexAgent, skip_when_no_new_papers
+from day1.papers_news.schemas import NewPaperSummary, PapersMeta, ScholarQuery
 
 # 1) Build a strong Scholar/Google query (text key, no greetings)
 scholar_query_builder = Agent(
@@ -21,7 +33,7 @@ Task:
     output_key="scholar_query"
 )
 
-# 2) Harvest + light enrich (keep as JSON for internal passing)
+# 2) Harvest + light enrich; dedupe_papers (dedupe.py) merges duplicates and writes papers_meta
 harvest_enrich = Agent(
     name="harvest_enrich",
     model="gemini-2.5-flash-lite",
@@ -29,45 +41,64 @@ harvest_enrich = Agent(
     instruction="""
 The scholar query:  {scholar_query}. 
 1) Use google_search to fetch ~20 results for scholar_query.
-2) Deduplicate by title/url; prefer arXiv/OpenReview/publisher; keep the best 8–12.
-3) For each: title, url, pdf_url if visible, venue_hint, year_hint, abstract_hint (short).
+2) For each result: title, url, pdf_url if visible, venue_hint, year_hint, abstract_hint (short).
+3) Call dedupe_papers ONCE with ALL results as candidates. It deduplicates by title/url,
+   prefers arXiv/OpenReview/publisher and keeps the best 8–12.
 
-Output ONLY:
-{
-  "papers_meta": [
-    {
-      "title":"...", "url":"...", "pdf_url":"nullable",
-      "venue_hint":"nullable", "year_hint":2025, "abstract_hint":"nullable"
-    }
-  ]
-}
+Do not deduplicate yourself and output nothing else.
     """.strip(),
-    tools=[google_search],
-    output_key="papers_meta"
+    tools=[GoogleSearchTool(bypass_multi_tools_limit=True), make_dedupe_tool("papers_meta", "papers_meta")],
 )
 
-# 3) Initial readable summary (Markdown, no greetings)
-initial_summarizer = Agent(
-    name="initial_summarizer",
+# 3) Index the papers; only ones without a stored summary go on to the summarizer
+paper_index = PaperIndexAgent(
+    name="paper_index",
+    description="Record papers in the local index and select the ones not summarized yet.",
+)
+
+# 4) Per-paper summaries for new papers only: one small model call per paper (map),
+#    merged in code (reduce); skipped when nothing is new
+paper_summarizer = Agent(
+    name="paper_summarizer",
     model="gemini-2.5-flash-lite",
-    description="Produce a concise, readable digest in Markdown.",
+    description="Summarize one paper that is not in the local index yet.",
     instruction="""
-Meta data about the papers: {papers_meta}. 
+Meta data about the paper: {paper}
 
-Write a compact Markdown digest (no greeting, no preface). Include:
-- H1: Latest AI Papers Digest
-- For the top 6–8 papers, per paper:
-  - H2: <Title> (Year if known)
+Write a compact Markdown summary (no greeting, no preface, no heading):
   - One sentence with venue/source and link (prefer pdf_url if present, else url).
   - 3–5 bullets: key idea, evidence/benchmarks (if visible), notable limitation (if visible), why it matters.
 
 Constraints:
 - Keep it tight and readable.
 - Do not fabricate details; if unknown, omit.
-- Output ONLY the digest text (no JSON).
+
+Output ONLY:
+{"paper_id": "<paper_id from the input>", "summary_md": "..."}
     """.strip(),
     tools=[],
-    output_key="current_summary"
+    include_contents="none",
+)
+
+initial_summarizer = MapReduceAgent(
+    name="initial_summarizer",
+    description="Summarize papers that are not in the local index yet, one paper per model call.",
+    sub_agents=[paper_summarizer],
+    load_items=state_items("new_papers_meta"),
+    item_state_key="paper",
+    output_key="new_paper_summaries",
+    output_field="summaries",
+    carry_fields=("paper_id",),
+    item_schema=NewPaperSummary,
+    max_in_flight=4,
+    item_timeout_s=60,
+    before_agent_callback=skip_when_no_new_papers,
+)
+
+# 5) Readable digest (Markdown) assembled from the stored per-paper summaries
+digest_assembler = DigestAssemblerAgent(
+    name="digest_assembler",
+    description="Store new summaries and assemble the digest from the paper index.",
 )
 
 # --- Refinement loop: critic ↔ refiner (max 3 iterations) ---
@@ -92,14 +123,10 @@ Output ONLY the critique text or the single token APPROVED.
     output_key="critique"
 )
 
-def exit_loop():
-    """Call this ONLY when the critique is 'APPROVED'."""
-    return {"status": "approved"}
-
 refiner_agent = Agent(
     name="refiner_agent",
     model="gemini-2.5-flash-lite",
-    description="Refine the digest based on the critique; stop when approved.",
+    description="Refine the digest based on the critique.",
     instruction="""
 You have:
 Digest:
@@ -108,9 +135,7 @@ Digest:
 Critique:
 {critique}
 
-Behavior:
-- IF critique is EXACTLY "APPROVED", call the exit_loop tool and do nothing else.
-- OTHERWISE, revise the digest to fully address the suggestions and questions:
+Revise the digest to fully address the suggestions and questions:
   * tighten wording, remove fluff
   * ensure consistent structure per paper (Title, link line, 3–5 bullets)
   * add/clarify links only if present in the source list (do not invent)
@@ -118,24 +143,62 @@ Behavior:
 
 Output ONLY the revised digest text (no JSON).
     """.strip(),
-    tools=[FunctionTool(exit_loop)],
     output_key="current_summary"
 )
 
-refinement_loop = LoopAgent(
+# Same job as a short edit list applied in code; the full rewrite above is only the fallback
+refiner_editor = Agent(
+    name="refiner_editor",
+    model="gemini-2.5-flash-lite",
+    description="Refine the digest based on the critique, as an edit list.",
+    instruction="""
+You have:
+Digest:
+{current_summary}
+
+Critique:
+{critique}
+
+Edit the digest to fully address the suggestions and questions:
+  * tighten wording, remove fluff
+  * ensure consistent structure per paper (Title, link line, 3–5 bullets)
+  * add/clarify links only if present in the source list (do not invent)
+  * keep Markdown, no greetings, no meta commentary
+
+""".lstrip() + EDIT_LIST_FORMAT,
+    output_key="digest_edits"
+)
+
+if refinement_mode() == "edits":
+    refiner_agent = edit_refiner("editing_refiner", refiner_editor, refiner_agent, "current_summary")
+    converged = no_edits("digest_edits")
+else:
+    converged = similar_to_previous("current_summary", 0.97)
+
+# Exits in code when the critic approves or the refiner stops changing the digest
+refinement_loop = EarlyExitLoopAgent(
     name="summary_refinement_loop",
     sub_agents=[critic_agent, refiner_agent],
-    max_iterations=3  # hard limit
+    max_iterations=3,  # hard limit
+    exit_conditions=[exact_token("critique", "APPROVED"), converged],
 )
 
-# 4) Root: run all steps in order; final output is readable text in "current_summary"
+# 6) Root: run all steps in order; final output is readable text in "current_summary"
 root_agent = SequentialAgent(
     name="ai_papers_min_pipeline_with_refinement",
-    description="Query → Harvest/Enrich → Summarize → Critic/Refiner loop (x3).",
+    description="Query → Harvest/Enrich → Index → Summarize new → Assemble → Critic/Refiner loop (x3).",
     sub_agents=[
-        scholar_query_builder,
-        harvest_enrich,
+        validated(scholar_query_builder, ScholarQuery),
+        validated(harvest_enrich, PapersMeta, state_key="papers_meta", tool="dedupe_papers"),
+        paper_index,
         initial_summarizer,
+        digest_assembler,
         refinement_loop
     ],
 )
+
+
+# Opt-in response cache for reruns (set LLM_CACHE_PATH, e.g. to .llm_cache.db).
+enable_response_cache(root_agent)
+# Opt-in shared google_search result cache (set SEARCH_CACHE_PATH).
+enable_search_cache(root_agent)
@@ -0,0 +1,63 @@
+# Canonical identifiers for papers, so the same paper found via different links is recognized.
+import hashlib
+import re
+import unicodedata
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlsplit
+
+
+ARXIV_URL = re.compile(
+    r"arxiv\.org/(?:abs|pdf|html)/(?P<id>\d{4}\.\d{4,5}|[a-z\-]+(?:\.[a-z]{2})?/\d{7})(?:v\d+)?(?:\.pdf)?",
+    re.IGNORECASE,
+)
+OPENREVIEW_HOST = "openreview.net"
+TRACKING_PARAMS = {"ref", "fbclid", "gclid", "source"}
+
+
+def arxiv_id(url: str | None) -> str | None:
+    """'https://arxiv.org/pdf/2401.01234v2.pdf' -> '2401.01234' (None for non-arXiv links)."""
+    if not url:
+        return None
+    match = ARXIV_URL.search(url)
+    return match.group("id").lower() if match else None
+
+
+def canonical_url(url: str | None) -> str | None:
+    """Normalizes a paper link: arXiv abs/pdf/versions and OpenReview forum/pdf collapse to one form.
+
+    Other links keep their (sorted) query parameters minus tracking ones; scheme, "www."
+    and fragments are dropped.
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if arxiv := arxiv_id(url):
+        return f"https://arxiv.org/abs/{arxiv}"
+
+    parts = urlsplit(url if "://" in url else f"https://{url}")
+    host = parts.netloc.lower().removeprefix("www.")
+    if host == OPENREVIEW_HOST and (forum_id := parse_qs(parts.query).get("id")):
+        return f"https://openreview.net/forum?id={forum_id[0]}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query) if k not in TRACKING_PARAMS and not k.startswith("utm_")
+    )
+    return f"https://{host}{parts.path.rstrip('/')}" + (f"?{urlencode(query)}" if query else "")
+
+
+def normalize_title(title: str | None) -> str:
+    """Case-folded title with punctuation removed and whitespace collapsed."""
+    if not title:
+        return ""
+    text = unicodedata.normalize("NFKC", title).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def paper_key(paper: dict) -> str:
+    """Stable id for a paper: arXiv id, else canonical URL, else normalized title."""
+    for field in ("pdf_url", "url"):
+        if arxiv := arxiv_id(paper.get(field)):
+            return f"arxiv:{arxiv}"
+    if url := canonical_url(paper.get("url") or paper.get("pdf_url")):
+        return f"url:{url}"
+    title = normalize_title(paper.get("title"))
+    return "title:" + hashlib.sha1(title.encode("utf-8")).hexdigest()[:16]
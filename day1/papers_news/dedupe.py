@@ -0,0 +1,217 @@
+# Deterministic dedupe of search results: canonical URLs + MinHash/LSH on title shingles.
+# Replaces asking the model to "deduplicate by title/url" over ~20 results.
+import json
+
+import numpy as np
+from google.adk.tools import FunctionTool, ToolContext
+
+from day1.papers_news.canonical import arxiv_id, canonical_url, normalize_title
+
+
+PUBLISHER_HOSTS = (
+    "doi.org",
+    "dl.acm.org",
+    "ieeexplore.ieee.org",
+    "link.springer.com",
+    "sciencedirect.com",
+    "nature.com",
+    "science.org",
+    "proceedings.neurips.cc",
+    "papers.nips.cc",
+    "proceedings.mlr.press",
+    "jmlr.org",
+    "aclanthology.org",
+    "openaccess.thecvf.com",
+    "ojs.aaai.org",
+    "ijcai.org",
+)
+NUM_PERMUTATIONS = 32
+LSH_BANDS = 8
+# MinHash only preselects pairs (its estimate is noisy at 32 permutations); the exact
+# shingle Jaccard decides.
+ESTIMATE_SLACK = 0.15
+# Multiply-shift hashing: (a * x + b) mod 2**64, top 32 bits; `a` odd. uint64 overflow does the mod.
+_rng = np.random.default_rng(1234)
+_PERM_A = _rng.integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def source_rank(url: str | None) -> int:
+    """Lower is better: arXiv, then OpenReview, then publishers, then everything else."""
+    url = canonical_url(url) or ""
+    host = url.removeprefix("https://").split("/", 1)[0]
+    if host == "arxiv.org":
+        return 0
+    if host == "openreview.net":
+        return 1
+    if any(host == h or host.endswith("." + h) for h in PUBLISHER_HOSTS):
+        return 2
+    return 3
+
+
+def pdf_url_for(url: str | None) -> str | None:
+    if arxiv := arxiv_id(url):
+        return f"https://arxiv.org/pdf/{arxiv}"
+    canonical = canonical_url(url) or ""
+    if canonical.startswith("https://openreview.net/forum?id="):
+        return canonical.replace("/forum?", "/pdf?")
+    return None
+
+
+def _shingles(title: str) -> set[bytes]:
+    data = title.encode("utf-8").ljust(3)
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def minhash_signatures(titles: list[str]) -> np.ndarray:
+    """MinHash signatures (len(titles) x NUM_PERMUTATIONS) over byte 3-gram shingles, vectorized."""
+    encoded = [t.encode("utf-8").ljust(3) for t in titles]
+    lengths = np.array([len(b) for b in encoded])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+
+    # Shingle i covers bytes i..i+2; drop the ones that straddle two titles.
+    shingles = (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    valid = np.ones(len(shingles), dtype=bool)
+    for offset in (1, 2):
+        ends = np.cumsum(lengths) - offset
+        valid[ends[ends < len(valid)]] = False
+    shingles = shingles[valid]
+    segment_starts = starts - 2 * np.arange(len(titles))
+
+    signatures = np.empty((len(titles), NUM_PERMUTATIONS), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for k in range(NUM_PERMUTATIONS):
+            hashed = (shingles * _PERM_A[k] + _PERM_B[k]) >> np.uint64(32)
+            signatures[:, k] = np.minimum.reduceat(hashed, segment_starts)
+    return signatures
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def dedupe_candidates(candidates: list[dict], max_results: int = 12, threshold: float = 0.7) -> tuple[list[dict], int]:
+    """Groups duplicates, keeps the best source of each group and returns the top `max_results`.
+
+    Duplicates share an arXiv id / canonical URL, or have titles whose shingle Jaccard
+    similarity is at least `threshold` (papers with different arXiv ids are never merged
+    on title alone). Returns (papers, number of duplicates removed).
+    """
+    items = [c for c in candidates if isinstance(c, dict) and (c.get("title") or c.get("url"))]
+    if not items:
+        return [], 0
+
+    n = len(items)
+    groups = _UnionFind(n)
+    urls = [canonical_url(item.get("url")) for item in items]
+    ranks = [source_rank(url) for url in urls]
+    arxiv_ids = [arxiv_id(url) or arxiv_id(item.get("pdf_url")) for url, item in zip(urls, items)]
+
+    first_with_key: dict[str, int] = {}
+    for i, item in enumerate(items):
+        for key in (urls[i], canonical_url(item.get("pdf_url"))):
+            if key:
+                groups.union(i, first_with_key.setdefault(key, i))
+
+    titles = [normalize_title(item.get("title")) for item in items]
+    shingle_sets: dict[int, set[bytes]] = {}
+
+    def same_title(i: int, j: int) -> bool:
+        if not titles[i] or not titles[j] or (arxiv_ids[i] and arxiv_ids[j] and arxiv_ids[i] != arxiv_ids[j]):
+            return False
+        a = shingle_sets.setdefault(i, _shingles(titles[i]))
+        b = shingle_sets.setdefault(j, _shingles(titles[j]))
+        return len(a & b) >= threshold * len(a | b)
+
+    signatures = minhash_signatures(titles)
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    for band in range(LSH_BANDS):
+        band_keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows]).view(
+            np.dtype((np.void, rows * 8))
+        ).ravel()
+        _, bucket_ids = np.unique(band_keys, return_inverse=True)
+        order = np.argsort(bucket_ids, kind="stable")
+        sorted_ids = bucket_ids[order]
+        # Compare every bucket member with the bucket's first member, all buckets at once.
+        is_head = np.concatenate(([True], sorted_ids[1:] != sorted_ids[:-1]))
+        heads = order[np.flatnonzero(is_head)[np.cumsum(is_head) - 1]]
+        members = order[~is_head]
+        heads = heads[~is_head]
+        if not len(members):
+            continue
+        likely = (signatures[members] == signatures[heads]).mean(axis=1) >= threshold - ESTIMATE_SLACK
+        for head, j in zip(heads[likely].tolist(), members[likely].tolist()):
+            if groups.find(head) != groups.find(j) and same_title(head, j):
+                groups.union(head, j)
+
+    clusters: dict[int, list[int]] = {}
+    for i in range(n):
+        clusters.setdefault(groups.find(i), []).append(i)
+
+    merged = []
+    for members in clusters.values():
+        members.sort(key=lambda i: (ranks[i], i))
+        best = items[members[0]]
+
+        def first(field: str):
+            return next((items[i].get(field) for i in members if items[i].get(field)), None)
+
+        derived_pdf_urls = (pdf_url_for(items[i].get("url")) for i in members)
+
+        url = urls[members[0]] or canonical_url(best.get("pdf_url"))
+        merged.append((
+            (ranks[members[0]], -len(members), members[0]),
+            {
+                "title": best.get("title") or first("title"),
+                "url": url,
+                "pdf_url": first("pdf_url") or next((u for u in derived_pdf_urls if u), None),
+                "venue_hint": first("venue_hint"),
+                "year_hint": first("year_hint"),
+                "abstract_hint": first("abstract_hint"),
+            },
+        ))
+
+    merged.sort(key=lambda pair: pair[0])
+    return [paper for _, paper in merged[:max_results]], n - len(merged)
+
+
+def make_dedupe_tool(state_key: str, list_key: str) -> FunctionTool:
+    """A `dedupe_papers` tool that writes `{list_key: [...]}` to `state_key` and ends the agent's turn.
+
+    The deduplicated list goes straight to the session state, so the model never has to
+    write it out again.
+    """
+
+    def dedupe_papers(candidates: list[dict], tool_context: ToolContext, max_results: int = 12) -> dict:
+        """Deduplicates search results and keeps the best 8-12 papers.
+
+        Canonicalizes arXiv/OpenReview links, merges near-identical titles and prefers
+        arXiv, then OpenReview, then publisher pages.
+
+        Args:
+            candidates: Every search result, each as {"title": "...", "url": "...", "pdf_url": null,
+                        "venue_hint": null, "year_hint": 2025, "abstract_hint": null}.
+            max_results: How many papers to keep (8-12).
+
+        Returns:
+            Dictionary with status, the number of papers kept and duplicates removed.
+        """
+        papers, removed = dedupe_candidates(candidates, max_results=max(8, min(12, max_results)))
+        tool_context.state[state_key] = json.dumps({list_key: papers}, ensure_ascii=False)
+        tool_context.actions.skip_summarization = True
+        return {"status": "success", "kept": len(papers), "duplicates_removed": removed}
+
+    return FunctionTool(dedupe_papers)
@@ -2,6 +2,16 @@
 # Keep comments in English.
 from google.adk.agents import Agent, SequentialAgent
 from google.adk.tools import google_search
+from google.adk.tools.google_search_tool import GoogleSearchTool
+
+from common.llm_cache import enable_response_cache
+from common.map_reduce import MapReduceAgent, state_items
+from common.search_cache import enable_search_cache
+from common.structured_output import validated
+from day1.papers_news.canonical import normalize_title
+from day1.papers_news.dedupe import make_dedupe_tool
+from day1.papers_news.pdf_ingest import PdfIngestAgent
+from day1.papers_news.schemas import Candidates, EnrichedPapersMeta, PaperAnalysis, PaperSummary, QaReport, ScholarQuery
 
 generate_scholar_query = Agent(
     name="scholar_query_builder",
@@ -26,17 +36,11 @@ results_harvester = Agent(
     instruction="""
 You will receive a variable named {scholar_query} in context.
 Use google_search to retrieve ~20 results for that query.
-Deduplicate by title/URL; prefer arXiv/OpenReview/publisher.
-
-Output:
-{
-  "candidates": [
-    {"title":"...", "url":"...", "venue_hint": null, "year_hint": 2025}
-  ]
-}
+Then call dedupe_papers ONCE with all results as candidates
+({"title":"...", "url":"...", "venue_hint": null, "year_hint": 2025}); it deduplicates by
+title/URL, prefers arXiv/OpenReview/publisher and stores the list. Output nothing else.
     """.strip(),
-    tools=[google_search],
-    output_key="candidates"
+    tools=[GoogleSearchTool(bypass_multi_tools_limit=True), make_dedupe_tool("candidates", "candidates")],
 )
 
 metadata_enricher = Agent(
@@ -61,80 +65,94 @@ Output:
     output_key="papers_meta"
 )
 
-pdf_text_reader = Agent(
+# Real PDF download + extraction (pdf_ingest.py); the model never sees raw PDFs.
+pdf_text_reader = PdfIngestAgent(
     name="pdf_text_reader",
+    description="Extract sectioned text and figure/table captions from PDF URLs.",
+)
+
+# Analysis and summaries run one model call per paper (map) and are merged in code (reduce).
+paper_analysis_mapper = Agent(
+    name="paper_analysis_mapper",
     model="gemini-2.5-flash-lite",
-    description="Extract sectioned text from PDF URLs.",
+    description="Analyze one paper's claims, methods, experiments, limitations; score novelty & reliability.",
     instruction="""
-You will receive {papers_meta} in context.
-For each paper with a reachable pdf_url, extract sectioned text and figure/table captions.
+You will receive one paper: {paper}
 
 Output ONLY:
 {
-  "papers_full": [
-    {
-      "title":"...",
-      "sections":[{"heading":"Introduction","text":"..."},{"heading":"Method","text":"..."}],
-      "figures_tables":[{"caption":"..."}]
-    }
-  ]
+  "title":"...",
+  "type":"survey|method|benchmark|dataset|application|position",
+  "claims":[{"claim":"...","evidence_snippet":"<=30 words"}],
+  "method_summary":"<=80 words",
+  "experiments":[{"dataset":"...","metric":"...","result":"..."}],
+  "limitations":["..."],
+  "novelty_score_0_5": 0,
+  "reliability_risk_0_5": 0
 }
-If a PDF is unreachable, skip it (do not fail the batch).
     """.strip(),
     tools=[],
-    output_key="papers_full"
+    include_contents="none",
 )
 
-paper_analyzer = Agent(
+paper_analyzer = MapReduceAgent(
     name="paper_analyzer",
-    model="gemini-2.5-flash-lite",
     description="Analyze claims, methods, experiments, limitations; score novelty & reliability.",
+    sub_agents=[paper_analysis_mapper],
+    load_items=state_items("papers_full", "papers_full"),
+    item_state_key="paper",
+    output_key="analysis",
+    output_field="analysis",
+    carry_fields=("title",),
+    item_schema=PaperAnalysis,
+    max_in_flight=4,
+    item_timeout_s=90,
+)
+
+
+def analysis_with_meta(state) -> list[dict]:
+    """Pairs each analysis with its paper's metadata (matched by normalized title)."""
+    meta_by_title = {normalize_title(m.get("title")): m for m in state_items("papers_meta", "papers_meta")(state)}
+    items = []
+    for analysis in state_items("analysis", "analysis")(state):
+        meta = meta_by_title.get(normalize_title(analysis.get("title")), {})
+        items.append({"title": analysis.get("title"), "pdf_url": meta.get("pdf_url"), "meta": meta, "analysis": analysis})
+    return items
+
+
+paper_summary_mapper = Agent(
+    name="paper_summary_mapper",
+    model="gemini-2.5-flash-lite",
+    description="Produce a crisp TL;DR summary of one paper for decision-makers and builders.",
     instruction="""
-You will receive {papers_full} in context.
+You will receive one paper's metadata and analysis: {paper}
 
 Output ONLY:
 {
-  "analysis": [
-    {
-      "title":"...",
-      "type":"survey|method|benchmark|dataset|application|position",
-      "claims":[{"claim":"...","evidence_snippet":"<=30 words"}],
-      "method_summary":"<=80 words",
-      "experiments":[{"dataset":"...","metric":"...","result":"..."}],
-      "limitations":["..."],
-      "novelty_score_0_5": 0,
-      "reliability_risk_0_5": 0
-    }
-  ]
+  "title":"...",
+  "tldr_5_bullets":["...","...","...","...","..."],
+  "who_should_read":["role1","role2","role3"],
+  "implementation_notes":["note1","note2","note3"],
+  "key_citations":["ref1","ref2","ref3"],
+  "pdf_url":"..."
 }
     """.strip(),
     tools=[],
-    output_key="analysis"
+    include_contents="none",
 )
 
-final_summarizer = Agent(
+final_summarizer = MapReduceAgent(
     name="final_summarizer",
-    model="gemini-2.5-flash-lite",
     description="Produce crisp TL;DR summaries for decision-makers and builders.",
-    instruction="""
-You will receive {papers_meta} and {analysis} in context.
-
-Output ONLY:
-{
-  "summaries":[
-    {
-      "title":"...",
-      "tldr_5_bullets":["...","...","...","...","..."],
-      "who_should_read":["role1","role2","role3"],
-      "implementation_notes":["note1","note2","note3"],
-      "key_citations":["ref1","ref2","ref3"],
-      "pdf_url":"..."
-    }
-  ]
-}
-    """.strip(),
-    tools=[],
-    output_key="summaries"
+    sub_agents=[paper_summary_mapper],
+    load_items=analysis_with_meta,
+    item_state_key="paper",
+    output_key="summaries",
+    output_field="summaries",
+    carry_fields=("title", "pdf_url"),
+    item_schema=PaperSummary,
+    max_in_flight=4,
+    item_timeout_s=60,
 )
 
 qa_gate = Agent(
@@ -157,12 +175,18 @@ root_agent = SequentialAgent(
     name="ai_papers_pipeline",
     description="Sequential pipeline for discovering and summarizing latest AI papers.",
     sub_agents=[
-        generate_scholar_query,
-        results_harvester,
-        metadata_enricher,
+        validated(generate_scholar_query, ScholarQuery),
+        validated(results_harvester, Candidates, state_key="candidates", tool="dedupe_papers"),
+        validated(metadata_enricher, EnrichedPapersMeta),
         pdf_text_reader,
         paper_analyzer,
         final_summarizer,
-        qa_gate
+        validated(qa_gate, QaReport),
     ],
 )
+
+
+# Opt-in response cache for reruns (set LLM_CACHE_PATH, e.g. to .llm_cache.db).
+enable_response_cache(root_agent)
+# Opt-in shared google_search result cache (set SEARCH_CACHE_PATH).
+enable_search_cache(root_agent)
@@ -0,0 +1,247 @@
+# Persistent local index of papers and their summaries (SQLite + FTS5).
+# Lets the digest pipeline summarize only papers it has not seen before.
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from typing_extensions import override
+
+from common.json_output import load_json
+from day1.papers_news.canonical import arxiv_id, canonical_url, normalize_title, paper_key
+
+
+DEFAULT_STORE_PATH = "papers_index.db"
+DIGEST_MAX_PAPERS = 8
+
+
+class PaperStore:
+    """Papers keyed by arXiv id / canonical URL / normalized title, with per-paper summaries."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS papers (
+                paper_id TEXT PRIMARY KEY,
+                arxiv_id TEXT,
+                canonical_url TEXT,
+                norm_title TEXT,
+                title TEXT,
+                url TEXT,
+                pdf_url TEXT,
+                venue TEXT,
+                year INTEGER,
+                abstract TEXT,
+                summary TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_papers_arxiv ON papers(arxiv_id);
+            CREATE INDEX IF NOT EXISTS idx_papers_url ON papers(canonical_url);
+            CREATE INDEX IF NOT EXISTS idx_papers_title ON papers(norm_title);
+            CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(paper_id UNINDEXED, title, abstract, summary);
+            """
+        )
+
+    def find(self, paper: dict) -> str | None:
+        """Returns the id of a stored paper matching any of the paper's identifiers."""
+        arxiv = arxiv_id(paper.get("pdf_url")) or arxiv_id(paper.get("url"))
+        url = canonical_url(paper.get("url") or paper.get("pdf_url"))
+        title = normalize_title(paper.get("title"))
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT paper_id FROM papers
+                   WHERE (arxiv_id = ? AND ? IS NOT NULL)
+                      OR (canonical_url = ? AND ? IS NOT NULL)
+                      OR (norm_title = ? AND ? != '')
+                   LIMIT 1""",
+                (arxiv, arxiv, url, url, title, title),
+            ).fetchone()
+        return row["paper_id"] if row else None
+
+    def upsert(self, paper: dict) -> tuple[str, bool]:
+        """Stores or refreshes a paper's metadata. Returns (paper_id, needs_summary)."""
+        paper_id = self.find(paper) or paper_key(paper)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO papers (paper_id, arxiv_id, canonical_url, norm_title, title, url, pdf_url,
+                                       venue, year, abstract, first_seen, last_seen)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(paper_id) DO UPDATE SET
+                       pdf_url = COALESCE(papers.pdf_url, excluded.pdf_url),
+                       venue = COALESCE(papers.venue, excluded.venue),
+                       year = COALESCE(papers.year, excluded.year),
+                       abstract = COALESCE(papers.abstract, excluded.abstract),
+                       last_seen = excluded.last_seen""",
+                (
+                    paper_id,
+                    arxiv_id(paper.get("pdf_url")) or arxiv_id(paper.get("url")),
+                    canonical_url(paper.get("url") or paper.get("pdf_url")),
+                    normalize_title(paper.get("title")),
+                    paper.get("title"),
+                    paper.get("url"),
+                    paper.get("pdf_url"),
+                    paper.get("venue_hint") or paper.get("venue"),
+                    _as_year(paper.get("year_hint") or paper.get("year")),
+                    paper.get("abstract_hint") or paper.get("abstract"),
+                    now,
+                    now,
+                ),
+            )
+            row = self._conn.execute("SELECT summary FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+        self._index(paper_id)
+        return paper_id, row["summary"] is None
+
+    def save_summary(self, paper_id: str, summary: str):
+        with self._lock:
+            self._conn.execute("UPDATE papers SET summary = ? WHERE paper_id = ?", (summary, paper_id))
+        self._index(paper_id)
+
+    def get(self, paper_ids: list[str]) -> list[dict]:
+        """Stored papers in the order of `paper_ids` (unknown ids are skipped)."""
+        if not paper_ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM papers WHERE paper_id IN ({','.join('?' * len(paper_ids))})", paper_ids
+            ).fetchall()
+        by_id = {row["paper_id"]: dict(row) for row in rows}
+        return [by_id[paper_id] for paper_id in paper_ids if paper_id in by_id]
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """Full-text search over titles, abstracts and summaries for papers containing every word of `query`.
+
+        Each word is quoted, so text such as "LLM-based agents: a survey" is not read as FTS5 syntax.
+        """
+        match = " ".join('"' + token.replace('"', '""') + '"' for token in query.split())
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT p.* FROM papers_fts f JOIN papers p ON p.paper_id = f.paper_id
+                   WHERE papers_fts MATCH ? ORDER BY rank LIMIT ?""",
+                (match, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _index(self, paper_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM papers_fts WHERE paper_id = ?", (paper_id,))
+            self._conn.execute(
+                """INSERT INTO papers_fts (paper_id, title, abstract, summary)
+                   SELECT paper_id, COALESCE(title, ''), COALESCE(abstract, ''), COALESCE(summary, '')
+                   FROM papers WHERE paper_id = ?""",
+                (paper_id,),
+            )
+
+
+_store: PaperStore | None = None
+
+
+def get_paper_store() -> PaperStore:
+    """The process-wide store, opened on first use at PAPER_STORE_PATH (default: papers_index.db)."""
+    global _store
+    if _store is None:
+        _store = PaperStore(os.getenv("PAPER_STORE_PATH", DEFAULT_STORE_PATH))
+    return _store
+
+
+def _as_year(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PaperIndexAgent(BaseAgent):
+    """Indexes `papers_meta` and passes on only the papers that still need a summary.
+
+    Writes `new_papers_meta` (JSON list, each paper with its `paper_id`) and
+    `digest_paper_ids` (today's papers in ranking order) to the session state.
+    """
+
+    @override
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        store = get_paper_store()
+        parsed = load_json(ctx.session.state.get("papers_meta")) or {}
+        papers = parsed.get("papers_meta", []) if isinstance(parsed, dict) else parsed
+
+        digest_ids, new_papers = [], []
+        for paper in papers:
+            if not isinstance(paper, dict) or not paper.get("title"):
+                continue
+            paper_id, needs_summary = store.upsert(paper)
+            if paper_id in digest_ids:
+                continue
+            digest_ids.append(paper_id)
+            if needs_summary:
+                new_papers.append({"paper_id": paper_id, **paper})
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(
+                role="model",
+                parts=[types.Part(text=f"{len(digest_ids)} papers, {len(new_papers)} new.")],
+            ),
+            actions=EventActions(
+                state_delta={
+                    "new_papers_meta": json.dumps(new_papers, ensure_ascii=False),
+                    "digest_paper_ids": digest_ids,
+                    "new_paper_summaries": "",
+                }
+            ),
+        )
+
+
+def skip_when_no_new_papers(callback_context: CallbackContext) -> types.Content | None:
+    """before_agent_callback: skips the summarizer model call when every paper is already indexed."""
+    if json.loads(callback_context.state.get("new_papers_meta") or "[]"):
+        return None
+    return types.Content(role="model", parts=[types.Part(text="All papers already summarized.")])
+
+
+class DigestAssemblerAgent(BaseAgent):
+    """Stores the new per-paper summaries and builds `current_summary` from the index."""
+
+    @override
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        store = get_paper_store()
+        parsed = load_json(ctx.session.state.get("new_paper_summaries")) or {}
+        for item in parsed.get("summaries", []) if isinstance(parsed, dict) else []:
+            if isinstance(item, dict) and item.get("paper_id") and item.get("summary_md"):
+                store.save_summary(item["paper_id"], item["summary_md"].strip())
+
+        papers = [p for p in store.get(ctx.session.state.get("digest_paper_ids", [])) if p["summary"]]
+        digest = build_digest(papers[:DIGEST_MAX_PAPERS])
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=digest)]),
+            actions=EventActions(state_delta={"current_summary": digest}),
+        )
+
+
+def build_digest(papers: list[dict]) -> str:
+    lines = ["# Latest AI Papers Digest", ""]
+    if not papers:
+        lines.append("No papers found.")
+    for paper in papers:
+        heading = f"## {paper['title']}" + (f" ({paper['year']})" if paper["year"] else "")
+        lines += [heading, paper["summary"], ""]
+    return "\n".join(lines).strip() + "\n"
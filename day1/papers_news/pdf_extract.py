@@ -0,0 +1,76 @@
+# Sectioned text and figure/table captions from a PDF, in the papers_full schema.
+# Runs in worker processes (pdf_ingest.py), so it only depends on pypdf.
+import io
+import mmap
+import re
+
+from pypdf import PdfReader
+
+
+MAX_SECTION_CHARS = 4000
+MAX_CAPTION_CHARS = 300
+KNOWN_HEADINGS = {
+    "abstract", "introduction", "related work", "background", "preliminaries", "method", "methods",
+    "methodology", "approach", "experiments", "experimental setup", "results", "evaluation", "analysis",
+    "discussion", "limitations", "conclusion", "conclusions", "future work", "references",
+    "acknowledgments", "acknowledgements", "appendix",
+}
+END_HEADINGS = {"references", "acknowledgments", "acknowledgements"}
+NUMBERED_HEADING = re.compile(r"^(?:\d+(?:\.\d+)*|[A-Z])\.?\s+(?P<title>[A-Z][\w ,:&/()'\-]{1,80})$")
+CAPTION = re.compile(r"^(?:Figure|Fig\.|Table)\s+\d+\s*[.:]\s*\S", re.IGNORECASE)
+
+
+def _heading(line: str) -> str | None:
+    if line.rstrip(".:").casefold() in KNOWN_HEADINGS:
+        return line.rstrip(".:")
+    match = NUMBERED_HEADING.match(line)
+    if match and len(match.group("title").split()) <= 8 and not line.endswith("."):
+        return line
+    return None
+
+
+def extract_sections(text: str, max_section_chars: int = MAX_SECTION_CHARS) -> tuple[list[dict], list[dict]]:
+    """Splits page text into (sections, figures_tables); stops at References/Acknowledgments."""
+    sections: list[dict] = []
+    captions: list[dict] = []
+    heading, body = "Preamble", []
+
+    def flush():
+        content = " ".join(body).strip()
+        if content:
+            sections.append({"heading": heading, "text": content[:max_section_chars]})
+
+    for raw in text.splitlines():
+        line = " ".join(raw.split())
+        if not line:
+            continue
+        if CAPTION.match(line):
+            captions.append({"caption": line[:MAX_CAPTION_CHARS]})
+            continue
+        if new_heading := _heading(line):
+            flush()
+            if new_heading.casefold().split(" ", 1)[-1] in END_HEADINGS:  # "References", "7 References"
+                return sections, captions
+            heading, body = new_heading, []
+            continue
+        body.append(line)
+    flush()
+    return sections, captions
+
+
+def extract_pdf(source: bytes | str, title: str | None = None) -> dict:
+    """One papers_full entry from PDF bytes, or from the path of a spooled PDF (memory-mapped)."""
+    if isinstance(source, str):
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _extract(PdfReader(data), title)
+    return _extract(PdfReader(io.BytesIO(source)), title)
+
+
+def _extract(reader: PdfReader, title: str | None) -> dict:
+    text = "\n".join(page.extract_text() or "" for page in reader.pages)
+    sections, captions = extract_sections(text)
+    if not title:
+        title = (reader.metadata.title if reader.metadata else None) or next(
+            (line.strip() for line in text.splitlines() if line.strip()), "Untitled"
+        )
+    return {"title": title, "sections": sections, "figures_tables": captions}
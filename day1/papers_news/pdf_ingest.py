@@ -0,0 +1,190 @@
+# Real PDF ingestion for the papers pipeline: pooled async downloads, large files spooled to disk
+# through a memory map, extraction (pdf_extract.py) in a process pool. Produces papers_full.
+import asyncio
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncGenerator
+
+import httpx
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from typing_extensions import override
+
+from common.json_output import load_json
+from day1.papers_news.pdf_extract import extract_pdf
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 16
+SPOOL_THRESHOLD_BYTES = 4 * 1024 * 1024
+MAX_PDF_BYTES = 64 * 1024 * 1024
+CHUNK_BYTES = 256 * 1024
+
+
+@dataclass
+class IngestStats:
+    requested: int = 0
+    extracted: int = 0
+    failed: int = 0
+    spooled: int = 0
+    bytes: int = 0
+    fetch_s: float = 0.0
+    extract_s: float = 0.0
+    wall_s: float = 0.0
+
+    @property
+    def pdfs_per_s(self) -> float:
+        return self.extracted / self.wall_s if self.wall_s else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / 1e6 / self.wall_s if self.wall_s else 0.0
+
+
+async def _spool(response: httpx.Response, length: int, path: str) -> str:
+    """Writes a response of known length into a memory-mapped file."""
+    with open(path, "wb+") as f:
+        f.truncate(length)
+        with mmap.mmap(f.fileno(), length) as buffer:
+            offset = 0
+            async for chunk in response.aiter_bytes(CHUNK_BYTES):
+                if offset + len(chunk) > length:
+                    raise ValueError("response longer than its Content-Length")
+                buffer[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+    if offset != length:
+        raise ValueError(f"truncated response: {offset} of {length} bytes")
+    return path
+
+
+async def fetch_pdf(client: httpx.AsyncClient, url: str, spool_path: str) -> bytes | str:
+    """Downloads a PDF. Small files come back as bytes, large ones as the path they were spooled to."""
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        length = int(response.headers.get("content-length") or 0)
+        if length > MAX_PDF_BYTES:
+            raise ValueError(f"PDF too large ({length} bytes)")
+        if length > SPOOL_THRESHOLD_BYTES:
+            return await _spool(response, length, spool_path)
+
+        data = bytearray()
+        spool_file = None
+        received = 0
+        try:
+            async for chunk in response.aiter_bytes(CHUNK_BYTES):
+                received += len(chunk)
+                if received > MAX_PDF_BYTES:
+                    raise ValueError("PDF too large")
+                if spool_file is not None:
+                    spool_file.write(chunk)
+                    continue
+                data += chunk
+                if len(data) > SPOOL_THRESHOLD_BYTES:  # No Content-Length: spill to disk as it grows.
+                    spool_file = open(spool_path, "wb")
+                    spool_file.write(data)
+                    data.clear()
+        finally:
+            if spool_file is not None:
+                spool_file.close()
+        return spool_path if spool_file is not None else bytes(data)
+
+
+_pool: Executor | None = None
+
+
+def get_process_pool() -> Executor:
+    """The process-wide extraction pool (PDF_WORKERS processes, default: CPU count)."""
+    global _pool
+    if _pool is None:
+        workers = int(os.getenv("PDF_WORKERS", "0")) or os.cpu_count()
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def ingest_papers(
+    papers: list[dict], concurrency: int = DEFAULT_CONCURRENCY, pool: Executor | None = None
+) -> tuple[list[dict], IngestStats]:
+    """Fetches and extracts every paper's pdf_url; unreachable or unreadable PDFs are skipped.
+
+    Extraction of one PDF overlaps with the downloads of the others. Results keep the input order.
+    """
+    pool = pool or get_process_pool()
+    loop = asyncio.get_running_loop()
+    stats = IngestStats(requested=len(papers))
+    slots = asyncio.Semaphore(concurrency)
+    spool_dir = tempfile.mkdtemp(prefix="pdf_spool_")
+    started = time.perf_counter()
+
+    async def ingest(index: int, paper: dict, client: httpx.AsyncClient) -> dict | None:
+        url = paper.get("pdf_url")
+        if not url:
+            return None
+        spool_path = os.path.join(spool_dir, f"{index}.pdf")
+        try:
+            async with slots:
+                fetch_started = time.perf_counter()
+                source = await fetch_pdf(client, url, spool_path)
+                stats.fetch_s += time.perf_counter() - fetch_started
+            if isinstance(source, str):
+                stats.spooled += 1
+                stats.bytes += os.path.getsize(source)
+            else:
+                stats.bytes += len(source)
+
+            extract_started = time.perf_counter()
+            result = await loop.run_in_executor(pool, extract_pdf, source, paper.get("title"))
+            stats.extract_s += time.perf_counter() - extract_started
+            stats.extracted += 1
+            return result
+        except Exception as e:
+            stats.failed += 1
+            logger.warning("Skipping PDF %s: %s", url, e)
+            return None
+        finally:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(limits=limits, timeout=30, follow_redirects=True) as client:
+            results = await asyncio.gather(*(ingest(i, p, client) for i, p in enumerate(papers)))
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+    stats.wall_s = time.perf_counter() - started
+    return [r for r in results if r is not None], stats
+
+
+class PdfIngestAgent(BaseAgent):
+    """Reads `papers_meta`, downloads and extracts each pdf_url, writes `papers_full` (JSON)."""
+
+    concurrency: int = DEFAULT_CONCURRENCY
+
+    @override
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        parsed = load_json(ctx.session.state.get("papers_meta")) or {}
+        papers = parsed.get("papers_meta", []) if isinstance(parsed, dict) else parsed
+        papers_full, stats = await ingest_papers([p for p in papers if isinstance(p, dict)], self.concurrency)
+        summary = (
+            f"Extracted {stats.extracted}/{stats.requested} PDFs ({stats.failed} skipped) "
+            f"in {stats.wall_s:.1f}s, {stats.pdfs_per_s:.1f} PDFs/s."
+        )
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=summary)]),
+            actions=EventActions(
+                state_delta={"papers_full": json.dumps({"papers_full": papers_full}, ensure_ascii=False)}
+            ),
+        )
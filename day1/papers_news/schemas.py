@@ -0,0 +1,83 @@
+# Output schemas of the JSON-emitting papers agents, validated between pipeline steps.
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class _Output(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+
+class ScholarQuery(_Output):
+    scholar_query: str = Field(min_length=1)
+
+
+class PaperMeta(_Output):
+    title: str = Field(min_length=1)
+    url: str | None = None
+    pdf_url: str | None = None
+    venue_hint: str | None = None
+    year_hint: int | None = None
+    abstract_hint: str | None = None
+
+
+class PapersMeta(_Output):
+    papers_meta: list[PaperMeta]
+
+
+class Candidates(_Output):
+    candidates: list[PaperMeta]
+
+
+class EnrichedPaper(_Output):
+    title: str = Field(min_length=1)
+    authors: list[str] = []
+    year: int | None = None
+    venue: str | None = None
+    doi: str | None = None
+    arxiv_id: str | None = None
+    pdf_url: str | None = None
+    abstract: str | None = None
+
+
+class EnrichedPapersMeta(_Output):
+    papers_meta: list[EnrichedPaper]
+
+
+class NewPaperSummary(_Output):
+    paper_id: str = Field(min_length=1)
+    summary_md: str = Field(min_length=1)
+
+
+class Claim(_Output):
+    claim: str
+    evidence_snippet: str | None = None
+
+
+class Experiment(_Output):
+    dataset: str | None = None
+    metric: str | None = None
+    result: str | None = None
+
+
+class PaperAnalysis(_Output):
+    title: str = Field(min_length=1)
+    type: str
+    claims: list[Claim] = []
+    method_summary: str = Field(min_length=1)
+    experiments: list[Experiment] = []
+    limitations: list[str] = []
+    novelty_score_0_5: float = Field(default=0, ge=0, le=5)
+    reliability_risk_0_5: float = Field(default=0, ge=0, le=5)
+
+
+class PaperSummary(_Output):
+    title: str = Field(min_length=1)
+    tldr_5_bullets: list[str] = Field(min_length=1, max_length=5)
+    who_should_read: list[str] = []
+    implementation_notes: list[str] = []
+    key_citations: list[str] = []
+    pdf_url: str | None = None
+
+
+class QaReport(_Output):
+    ok: bool
+    issues: list[str] = []
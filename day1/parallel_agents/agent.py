@@ -1,7 +1,11 @@
 from google.adk import Agent
-from google.adk.agents import ParallelAgent, SequentialAgent
+from google.adk.agents import SequentialAgent
 from google.adk.tools import google_search
 
+from common.parallel import BoundedParallelAgent
+from common.llm_cache import enable_response_cache
+from common.search_cache import enable_search_cache
+
 
 tech_researcher = Agent(
     name="TechResearcher",
@@ -33,9 +37,15 @@ their market implications, and the future outlook. Keep the report concise (100
 )
 
 
-parallel_research_team = ParallelAgent(
+# A researcher that misses its deadline is cancelled and the aggregator gets a placeholder instead,
+# so one slow Gemini+google_search round trip no longer sets the latency of the whole system.
+parallel_research_team = BoundedParallelAgent(
     name="ParallelResearchTeam",
     sub_agents=[tech_researcher, health_researcher, finance_researcher],
+    max_in_flight=3,
+    branch_timeout_s=60,
+    hedge=False,  # Set to True to duplicate a researcher that is slower than its usual p90 latency.
+    hedge_after_s=20,
 )
 
 
@@ -64,3 +74,9 @@ root_agent = SequentialAgent(
     name="ResearchSystem",
     sub_agents=[parallel_research_team, aggregator_agent],
 )
+
+
+# Opt-in response cache for reruns (set LLM_CACHE_PATH, e.g. to .llm_cache.db).
+enable_response_cache(root_agent)
+# Opt-in shared google_search result cache (set SEARCH_CACHE_PATH).
+enable_search_cache(root_agent)
@@ -1,6 +1,9 @@
 from google.adk import Agent
-from google.adk.agents import LoopAgent, SequentialAgent
-from google.adk.tools import FunctionTool
+from google.adk.agents import SequentialAgent
+
+from common.edit_refiner import EDIT_LIST_FORMAT, edit_refiner, no_edits, refinement_mode
+from common.llm_cache import enable_response_cache
+from common.loop_control import EarlyExitLoopAgent, exact_token, similar_to_previous
 
 initial_writer_agent = Agent(
     name="InitialWriterAgent",
@@ -24,11 +27,6 @@ critic_agent = Agent(
 )
 
 
-def exit_loop():
-    """Call this function ONLY when the critique is 'APPROVED', indicating the story is finished and no more changes are needed."""
-    return {"status": "approved", "message": "Story approved. Exiting refinement loop."}
-
-
 refiner_agent = Agent(
     name="RefinerAgent",
     model="gemini-2.5-flash-lite",
@@ -37,20 +35,44 @@ refiner_agent = Agent(
     Story Draft: {current_story}
     Critique: {critique}
 
-    Your task is to analyze the critique.
-    - IF the critique is EXACTLY "APPROVED", you MUST call the `exit_loop` function and nothing else.
-    - OTHERWISE, rewrite the story draft to fully incorporate the feedback from the critique.""",
+    Rewrite the story draft to fully incorporate the feedback from the critique.
+    Output only the story text.""",
 
     output_key="current_story",  # It overwrites the story with the new, refined version.
-    tools=[FunctionTool(exit_loop)],  # The tool is now correctly initialized with the function reference.
 )
 
 
+# Same job, but the model returns a short edit list that is applied in code (far fewer output tokens).
+refiner_editor_agent = Agent(
+    name="RefinerEditorAgent",
+    model="gemini-2.5-flash-lite",
+    instruction="""You are a story refiner. You have a story draft and critique.
+
+    Story Draft: {current_story}
+    Critique: {critique}
+
+    Edit the story draft to fully incorporate the feedback from the critique.
+    """ + EDIT_LIST_FORMAT,
+    output_key="story_edits",
+)
+
+# Falls back to the full rewrite only when the edit list does not apply (REFINEMENT_MODE=rewrite: always).
+if refinement_mode() == "edits":
+    refiner_agent = edit_refiner("EditingRefinerAgent", refiner_editor_agent, refiner_agent, "current_story")
+    converged = no_edits("story_edits")
+else:
+    converged = similar_to_previous("current_story", 0.97)
+
+
 # The LoopAgent contains the agents that will run repeatedly: Critic -> Refiner.
-story_refinement_loop = LoopAgent(
+# It stops in code as soon as the critique is "APPROVED" or the refiner stops changing the story
+# (no edits; in rewrite mode: a rewrite that barely differs),
+# so no model call is spent on deciding to exit.
+story_refinement_loop = EarlyExitLoopAgent(
     name="StoryRefinementLoop",
     sub_agents=[critic_agent, refiner_agent],
     max_iterations=2, # Prevents infinite loops
+    exit_conditions=[exact_token("critique", "APPROVED"), converged],
 )
 
 
@@ -59,3 +81,7 @@ root_agent = SequentialAgent(
     name="StoryPipeline",
     sub_agents=[initial_writer_agent, story_refinement_loop],
 )
+
+
+# Opt-in response cache for reruns (set LLM_CACHE_PATH, e.g. to .llm_cache.db).
+enable_response_cache(root_agent)
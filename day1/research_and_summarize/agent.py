@@ -1,6 +1,9 @@
 from google.adk.agents import Agent, SequentialAgent
 from google.adk.tools import google_search
 
+from common.llm_cache import enable_response_cache
+from common.search_cache import enable_search_cache
+
 
 # Research Agent: Its job is to use the google_search tool and present findings.
 research_agent = Agent(
@@ -29,3 +32,9 @@ root_agent = SequentialAgent(
     name="ResearchAndSummarizeAgent",
     sub_agents=[research_agent, summarizer_agent],
 )
+
+
+# Opt-in response cache for reruns (set LLM_CACHE_PATH, e.g. to .llm_cache.db).
+enable_response_cache(root_agent)
+# Opt-in shared google_search result cache (set SEARCH_CACHE_PATH).
+enable_search_cache(root_agent)
@@ -1,21 +1,18 @@
 import asyncio
 import os
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
 from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.code_executors import BuiltInCodeExecutor
-from google.adk.models import Gemini
 from google.adk.runners import InMemoryRunner
 from google.adk.tools import FunctionTool, AgentTool
-from google.genai import types
 
-
-RETRY_CONFIG = types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-)
+from day2.currency_converter_agent.fees import get_fee_schedule
+from day2.currency_converter_agent.providers import current_rate_table, get_rate_cache
+from day2.currency_converter_agent.rates import CENT
+from day2.utils import build_gemini
 
 
 def show_python_code_and_result(response):
@@ -38,39 +35,42 @@ def show_python_code_and_result(response):
                     print("Generated Python Response >> ", response_code["result"])
 
 
-def get_fee_for_payment_method(method: str) -> dict:
+def get_fee_for_payment_method(method: str, amount: float = 0.0) -> dict:
     """Looks up the transaction fee percentage for a given payment method.
 
-    This tool simulates looking up a company's internal fee structure based on
-    the name of the payment method provided by the user.
+    This tool looks up the company's internal fee schedule (fees.py). The method
+    name is matched leniently (e.g., "Bank Transfer (SEPA)" or "platnum credit card"),
+    so pass the user's wording as is instead of guessing other names.
 
     Args:
         method: The name of the payment method. It should be descriptive,
                 e.g., "platinum credit card" or "bank transfer".
+        amount: The amount being paid, used for tiered fees. Optional.
 
     Returns:
         Dictionary with status and fee information.
-        Success: {"status": "success", "fee_percentage": 0.02}
-        Error: {"status": "error", "error_message": "Payment method not found"}
+        Success: {"status": "success", "fee_percentage": 0.02, "payment_method": "platinum credit card"}
+        Error: {"status": "error", "error_message": "Payment method not found",
+                "candidates": ["bank transfer", ...]}
     """
-    # This simulates looking up a company's internal fee structure.
-    fee_database = {
-        "platinum credit card": 0.02,  # 2%
-        "gold debit card": 0.035,  # 3.5%
-        "bank transfer": 0.01,  # 1%
-    }
-
-    fee = fee_database.get(method.lower())
-    if fee is not None:
-        return {"status": "success", "fee_percentage": fee}
+    match = get_fee_schedule().match(method)
+    if match.method is not None:
+        return {
+            "status": "success",
+            "fee_percentage": match.method.fee_for(amount),
+            "payment_method": match.method.name,
+        }
     else:
+        names = [name for name, _ in match.candidates] or sorted(get_fee_schedule().methods)
         return {
             "status": "error",
-            "error_message": f"Payment method '{method}' not found",
+            "error_message": f"Payment method '{method}' not found. "
+                             f"Ask the user which of these they mean: {', '.join(names)}",
+            "candidates": names,
         }
 
 
-def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
+async def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
     """Looks up and returns the exchange rate between two currencies.
 
     Args:
@@ -85,24 +85,14 @@ def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
         Error: {"status": "error", "error_message": "Unsupported currency pair"}
     """
 
-    # Static data simulating a live exchange rate API
-    # In production, this would call something like: requests.get("api.exchangerates.com")
-    rate_database = {
-        "usd": {
-            "eur": 0.93,  # Euro
-            "jpy": 157.50,  # Japanese Yen
-            "inr": 83.58,  # Indian Rupee
-        }
-    }
-
-    # Input validation and processing
-    base = base_currency.lower()
-    target = target_currency.lower()
-
-    # Return structured result with status
-    rate = rate_database.get(base, {}).get(target)
+    # Rates come from a table loaded once (rates.py), or from a live provider through an in-process
+    # cache refreshed in the background when RATES_PROVIDER is set (providers.py).
+    try:
+        rate = (await current_rate_table()).rate(base_currency, target_currency)
+    except Exception as e:
+        return {"status": "error", "error_message": f"Exchange rates are unavailable: {e}"}
     if rate is not None:
-        return {"status": "success", "rate": rate}
+        return {"status": "success", "rate": float(f"{rate:.10g}")}
     else:
         return {
             "status": "error",
@@ -110,13 +100,73 @@ def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
         }
 
 
+async def convert_amount(amount: float, base_currency: str, target_currency: str, payment_method: str) -> dict:
+    """Converts an amount between currencies after deducting the payment method's fee.
+
+    Looks up the fee and the exchange rate itself and computes
+    amount * (1 - fee) * rate with exact decimal arithmetic.
+
+    Args:
+        amount: The amount to convert, in the base currency (e.g., 1250).
+        base_currency: The ISO 4217 currency code of the currency you
+                       are converting from (e.g., "USD").
+        target_currency: The ISO 4217 currency code of the currency you
+                         are converting to (e.g., "INR").
+        payment_method: The name of the payment method, e.g., "bank transfer".
+
+    Returns:
+        Dictionary with status and the full breakdown.
+        Success: {"status": "success", "fee_percentage": "0.01", "fee_amount": "12.50",
+                  "amount_after_fee": "1237.50", "exchange_rate": "83.58",
+                  "converted_amount": "103430.25", ...}
+        Error: {"status": "error", "error_message": "..."}
+    """
+    try:
+        original = Decimal(str(amount))
+    except InvalidOperation:
+        return {"status": "error", "error_message": f"Invalid amount: {amount}"}
+    if not original.is_finite() or original <= 0:
+        return {"status": "error", "error_message": f"Amount must be positive: {amount}"}
+
+    fee = get_fee_for_payment_method(payment_method, float(original))
+    if fee["status"] != "success":
+        return fee
+    rate = await get_exchange_rate(base_currency, target_currency)
+    if rate["status"] != "success":
+        return rate
+
+    fee_percentage = Decimal(str(fee["fee_percentage"]))
+    exchange_rate = Decimal(str(rate["rate"]))
+    fee_amount = original * fee_percentage
+    amount_after_fee = original - fee_amount
+    converted = amount_after_fee * exchange_rate
+    return {
+        "status": "success",
+        "original_amount": str(original.quantize(CENT, ROUND_HALF_UP)),
+        "base_currency": base_currency.upper(),
+        "target_currency": target_currency.upper(),
+        "payment_method": fee["payment_method"],
+        "fee_percentage": str(fee_percentage),
+        "fee_amount": str(fee_amount.quantize(CENT, ROUND_HALF_UP)),
+        "amount_after_fee": str(amount_after_fee.quantize(CENT, ROUND_HALF_UP)),
+        "exchange_rate": str(exchange_rate),
+        "converted_amount": str(converted.quantize(CENT, ROUND_HALF_UP)),
+    }
+
+
+def start_rate_refresh(callback_context: CallbackContext) -> None:
+    """Creates the live-rate cache (when RATES_PROVIDER is set) as a turn starts, so its background refresh
+    fetches rates while the model reads the request. Nothing starts at import."""
+    get_rate_cache()
+
+
 fee_tool = FunctionTool(func=get_fee_for_payment_method)
 rate_tool = FunctionTool(func=get_exchange_rate)
 
 
 calculation_agent  = LlmAgent(
     name="CalculationAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=RETRY_CONFIG),
+    model=build_gemini("gemini-2.5-flash-lite"),
     instruction="""You are a specialized calculator that ONLY responds with Python code. You are forbidden from providing any text, explanations, or conversational responses.
 
      Your task is to take a request for a calculation and translate it into a single block of Python code that calculates the answer.
@@ -139,30 +189,42 @@ calculation_agent  = LlmAgent(
 )
 
 
-root_agent = LlmAgent(
-    name="enhanced_currency_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=RETRY_CONFIG),
-    # Updated instruction
-    instruction="""You are a smart currency conversion assistant. You must strictly follow these steps and use the available tools.
+CONVERSION_INSTRUCTION = """You are a smart currency conversion assistant. You must strictly follow these steps and use the available tools.
 
   For any currency conversion request:
 
-   1. Get Transaction Fee: Use the get_fee_for_payment_method() tool to determine the transaction fee.
-   2. Get Exchange Rate: Use the get_exchange_rate() tool to get the currency conversion rate.
-   3. Error Check: After each tool call, you must check the "status" field in the response. If the status is "error", you must stop and clearly explain the issue to the user.
-   4. Calculate Final Amount (CRITICAL): You are strictly prohibited from performing any arithmetic calculations yourself. You must use the calculation_agent tool to generate Python code that calculates the final converted amount. This 
-      code will use the fee information from step 1 and the exchange rate from step 2.
-   5. Provide Detailed Breakdown: In your summary, you must:
+   1. Convert: Call the convert_amount() tool ONCE with the amount, both currency codes and the payment method.
+      It looks up the fee and the exchange rate and calculates the result exactly.
+   2. Error Check: Check the "status" field in the response. If the status is "error", you must stop and clearly explain the issue to the user.
+      If the payment method was not recognized, ask the user to pick one of the returned "candidates"; do not retry with guessed names.
+   3. You are strictly prohibited from performing any arithmetic calculations yourself; use the numbers returned by the tool.
+   4. Provide Detailed Breakdown: In your summary, you must:
        * State the final converted amount.
        * Explain how the result was calculated, including:
            * The fee percentage and the fee amount in the original currency.
            * The amount remaining after deducting the fee.
            * The exchange rate applied.
-    """,
+    """
+
+# Audit mode (CURRENCY_AUDIT_MODE=1): CalculationAgent independently recomputes the result with generated code.
+AUDIT_INSTRUCTION = """
+   5. Audit: After convert_amount, use the CalculationAgent tool to generate Python code that recomputes the final
+      amount from the fee percentage, exchange rate and original amount. If its result differs from converted_amount,
+      say so.
+    """
+
+audit_mode = os.getenv("CURRENCY_AUDIT_MODE", "").lower() in ("1", "true", "yes")
+
+root_agent = LlmAgent(
+    name="enhanced_currency_agent",
+    model=build_gemini("gemini-2.5-flash-lite"),
+    instruction=CONVERSION_INSTRUCTION + (AUDIT_INSTRUCTION if audit_mode else ""),
+    before_agent_callback=start_rate_refresh,
     tools=[
+        convert_amount,
         get_fee_for_payment_method,
         get_exchange_rate,
-        AgentTool(agent=calculation_agent),
+        *([AgentTool(agent=calculation_agent)] if audit_mode else []),
     ],
 )
 
@@ -0,0 +1,150 @@
+# Fee schedule index: payment methods loaded once from a file (FEES_PATH, default fees.json next to this file).
+#
+#   {"methods": [{"name": "bank transfer", "aliases": ["wire", "sepa"],
+#                 "tiers": [{"from": 0, "fee": 0.01}, {"from": 10000, "fee": 0.005}]}]}
+#
+# A tier applies to the whole amount once the amount reaches its "from" threshold.
+import bisect
+import difflib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Sequence
+
+import numpy as np
+
+
+DEFAULT_FEES_PATH = os.path.join(os.path.dirname(__file__), "fees.json")
+
+# Words that say nothing about which method is meant ("Pay by bank transfer", "the platinum credit card").
+STOPWORDS = frozenset({"a", "an", "the", "by", "via", "with", "using", "pay", "payment", "method", "my"})
+MATCH_THRESHOLD = 0.75  # Best candidate score needed to resolve a name that is not an exact name or alias
+MATCH_MARGIN = 0.1  # ...and how far it must be ahead of the runner-up
+MIN_FUZZY_KEY = 5  # Shorter names/aliases ("ach", "wire") only resolve fuzzily when a query token matches them
+
+
+def normalize(method: str) -> str:
+    """Lower-case alphanumeric tokens without stopwords: "Bank-Transfer (SEPA)" -> "bank transfer sepa"."""
+    return " ".join(token for token in re.findall(r"[a-z0-9]+", method.lower()) if token not in STOPWORDS)
+
+
+@dataclass
+class PaymentMethod:
+    name: str
+    thresholds: list[float]  # Ascending tier start amounts; the first is 0
+    fees: list[float]
+    aliases: list[str] = field(default_factory=list)
+
+    def fee_for(self, amount: float = 0.0) -> float:
+        return self.fees[max(0, bisect.bisect_right(self.thresholds, amount) - 1)]
+
+
+@dataclass
+class FeeMatch:
+    method: PaymentMethod | None  # None: not resolved, see `candidates`
+    how: str  # "exact", "alias", "fuzzy" or "none"
+    candidates: list[tuple[str, float]]  # (method name, score), best first
+
+
+class FeeSchedule:
+    """Payment methods indexed by normalized name, alias and token.
+
+    `match` resolves free-form method names in one call: exact names and aliases first, then a
+    fuzzy score (token overlap, or string similarity for typos) over the methods sharing a token
+    with the query. A fuzzy match only resolves if it shares a token with the query or matched a
+    name of at least MIN_FUZZY_KEY characters ("each" is not "ach"); otherwise it is returned as
+    "none" with candidates to confirm. Resolved names are kept in an LRU, so repeated spellings
+    cost a dict lookup.
+    """
+
+    def __init__(self, methods: Sequence[PaymentMethod], cache_size: int = 1024):
+        self.methods = {method.name: method for method in methods}
+        self.exact: dict[str, tuple[PaymentMethod, str]] = {}
+        self.by_token: dict[str, set[str]] = {}
+        for method in methods:
+            self.exact[normalize(method.name)] = (method, "exact")
+            for alias in method.aliases:
+                self.exact.setdefault(normalize(alias), (method, "alias"))
+            for key in [normalize(method.name)] + [normalize(alias) for alias in method.aliases]:
+                for token in key.split():
+                    self.by_token.setdefault(token, set()).add(method.name)
+        self._match = lru_cache(maxsize=cache_size)(self._match_normalized)
+
+    @classmethod
+    def load(cls, path: str) -> "FeeSchedule":
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+        methods = []
+        for entry in table["methods"]:
+            tiers = sorted(entry["tiers"], key=lambda tier: tier.get("from", 0))
+            methods.append(
+                PaymentMethod(
+                    name=entry["name"],
+                    thresholds=[0.0] + [float(tier["from"]) for tier in tiers[1:]],
+                    fees=[float(tier["fee"]) for tier in tiers],
+                    aliases=entry.get("aliases", []),
+                )
+            )
+        return cls(methods)
+
+    def match(self, method: str) -> FeeMatch:
+        return self._match(normalize(method))
+
+    def cache_info(self):
+        return self._match.cache_info()
+
+    def _match_normalized(self, query: str) -> FeeMatch:
+        if query in self.exact:
+            method, how = self.exact[query]
+            return FeeMatch(method, how, [(method.name, 1.0)])
+
+        tokens = set(query.split())
+        names = set().union(*(self.by_token.get(token, set()) for token in tokens)) or set(self.methods)
+        scored = sorted(((*self._score(query, tokens, name), name) for name in names), reverse=True)
+        candidates = [(name, round(score, 3)) for score, _, name in scored[:3] if score > 0.3]
+        if candidates:
+            best, runner_up = candidates[0][1], candidates[1][1] if len(candidates) > 1 else 0.0
+            if best >= MATCH_THRESHOLD and best - runner_up >= MATCH_MARGIN and scored[0][1]:
+                return FeeMatch(self.methods[candidates[0][0]], "fuzzy", candidates)
+        return FeeMatch(None, "none", candidates)
+
+    def _score(self, query: str, tokens: set[str], name: str) -> tuple[float, bool]:
+        """Best score over the method's name and aliases, and whether that score may resolve on its own."""
+        method = self.methods[name]
+        best, trusted = 0.0, False
+        for key in [normalize(method.name)] + [normalize(alias) for alias in method.aliases]:
+            key_tokens = set(key.split())
+            # Share of the method's tokens present in the query: "bank transfer sepa" fully contains "bank transfer".
+            coverage = len(tokens & key_tokens) / len(key_tokens) if key_tokens else 0.0
+            similarity = difflib.SequenceMatcher(None, query, key).ratio()
+            score = max(coverage, similarity)
+            if score > best:
+                best, trusted = score, bool(tokens & key_tokens) or len(key) >= MIN_FUZZY_KEY
+        return best, trusted
+
+    def fee_fractions(self, methods: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+        """Fee fraction per row (a `rates.FeeLookup`), NaN where the method does not resolve."""
+        unique, inverse = np.unique(np.asarray(methods, dtype=str), return_inverse=True)
+        names = list(self.methods)
+        resolved = [self.match(name).method for name in unique]
+        row_method = np.array([-1 if m is None else names.index(m.name) for m in resolved], dtype=np.intp)
+        row_method = row_method[inverse.reshape(-1)]
+        amounts = np.asarray(amounts, dtype=np.float64)
+        fees = np.full(len(row_method), np.nan)
+        for i in np.unique(row_method[row_method >= 0]):
+            method, rows = self.methods[names[i]], row_method == i
+            tiers = np.searchsorted(method.thresholds, amounts[rows], side="right") - 1
+            fees[rows] = np.asarray(method.fees)[np.maximum(tiers, 0)]
+        return fees
+
+
+_schedule: FeeSchedule | None = None
+
+
+def get_fee_schedule() -> FeeSchedule:
+    global _schedule
+    if _schedule is None:
+        _schedule = FeeSchedule.load(os.getenv("FEES_PATH", DEFAULT_FEES_PATH))
+    return _schedule
@@ -0,0 +1,248 @@
+# Live exchange rates without a network hop per conversion.
+#
+# A RateProvider fetches the rates of all currencies from the pivot in one request. RateCache keeps the
+# resulting RateTable in process: fresh for RATES_TTL_S, then served stale (at most RATES_MAX_STALE_S) while
+# a single background refresh runs, and refreshed proactively by a background thread before it expires.
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Mapping, Protocol, Sequence
+
+import requests
+
+from day2.currency_converter_agent.rates import DEFAULT_RATES_PATH, RateTable, get_rate_table
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_S = 300.0
+DEFAULT_MAX_STALE_S = 3600.0
+
+
+class RateProvider(Protocol):
+    def fetch(self, pivot: str, codes: Sequence[str]) -> dict[str, float]:
+        """Units of each currency in `codes` per one unit of `pivot`, all in one request."""
+        ...
+
+
+class HttpRateProvider:
+    """JSON rates API in the common `GET ?base=USD&symbols=EUR,INR` -> `{"rates": {"EUR": 0.93}}` shape.
+
+    URL from RATES_API_URL; an optional RATES_API_KEY is sent as the `access_key` parameter.
+    """
+
+    def __init__(self, url: str | None = None, api_key: str | None = None):
+        self.url = url or os.getenv("RATES_API_URL")
+        self.api_key = api_key or os.getenv("RATES_API_KEY")
+        self._session = requests.Session()
+
+    def fetch(self, pivot: str, codes: Sequence[str]) -> dict[str, float]:
+        params = {"base": pivot, "symbols": ",".join(code for code in codes if code != pivot)}
+        if self.api_key:
+            params["access_key"] = self.api_key
+        response = self._session.get(self.url, params=params, timeout=10)
+        response.raise_for_status()
+        return {code.upper(): float(rate) for code, rate in response.json()["rates"].items()}
+
+
+class MockRateProvider:
+    """Offline test double: fixed rates (default: the bundled rates.json) with optional latency and failures."""
+
+    def __init__(self, rates: Mapping[str, float] | None = None, latency_s: float = 0.0, fail: bool = False):
+        if rates is None:
+            table = RateTable.load(DEFAULT_RATES_PATH)
+            rates = {code: table.rate(table.pivot, code) for code in table.codes}
+        self.rates = dict(rates)
+        self.latency_s = latency_s
+        self.fail = fail
+        self.calls = 0
+
+    def fetch(self, pivot: str, codes: Sequence[str]) -> dict[str, float]:
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if self.fail:
+            raise ConnectionError("mock rate provider is down")
+        return {code: self.rates[code] for code in codes if code in self.rates}
+
+
+@dataclass
+class RateCacheStats:
+    lookups: int = 0
+    hits: int = 0  # Served a fresh table
+    stale_hits: int = 0  # Served an expired table while a refresh ran in the background
+    misses: int = 0  # Had to wait for the provider (cold start or older than max_stale_s)
+    coalesced: int = 0  # Waited on a refresh that was already in flight
+    refreshes: int = 0
+    failures: int = 0
+    provider_latency_s: float = 0.0
+
+
+class RateCache:
+    """In-process RateTable cache in front of a RateProvider, with single-flight refreshes.
+
+    `table()` returns at once while the table is younger than `max_stale_s`; past `ttl_s` it also
+    starts a refresh in the background. Only one refresh runs at a time and everyone who needs to
+    wait (cold start) waits on that one. With `refresh_interval_s`, a daemon thread refreshes before
+    the TTL runs out, so lookups do not see the provider's latency at all.
+    """
+
+    def __init__(
+        self,
+        provider: RateProvider,
+        pivot: str,
+        codes: Sequence[str],
+        quotes: Sequence[Sequence] = (),
+        ttl_s: float = DEFAULT_TTL_S,
+        max_stale_s: float = DEFAULT_MAX_STALE_S,
+        refresh_interval_s: float | None = None,
+    ):
+        self.provider = provider
+        self.pivot = pivot.upper()
+        self.codes = sorted({code.upper() for code in codes} | {self.pivot})
+        self.quotes = list(quotes)
+        self.ttl_s = ttl_s
+        self.max_stale_s = max(max_stale_s, ttl_s)
+        self.stats = RateCacheStats()
+        self._table: RateTable | None = None
+        self._fetched_at = 0.0
+        self._in_flight: Future | None = None
+        self._retry_at = 0.0  # After a failed refresh, stale lookups wait this long before trying again
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-refresh")
+        self._stopped = threading.Event()
+        if refresh_interval_s:
+            threading.Thread(target=self._refresh_periodically, args=(refresh_interval_s,), daemon=True).start()
+
+    def age_s(self) -> float | None:
+        return None if self._table is None else time.monotonic() - self._fetched_at
+
+    def table(self, timeout_s: float | None = 30.0) -> RateTable:
+        table, refresh = self._lookup()
+        return table if refresh is None else refresh.result(timeout=timeout_s)
+
+    async def table_async(self, timeout_s: float | None = 30.0) -> RateTable:
+        """Like `table`, but a cold start waits for the refresh without blocking the event loop."""
+        table, refresh = self._lookup()
+        if refresh is None:
+            return table
+        # Shielded: giving up on the wait must not cancel the refresh that other lookups share.
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(refresh)), timeout_s)
+
+    def _lookup(self) -> tuple[RateTable | None, Future | None]:
+        """The table to serve now, or else the refresh to wait for."""
+        with self._lock:
+            self.stats.lookups += 1
+            age = self.age_s()
+            if age is not None and age <= self.ttl_s:
+                self.stats.hits += 1
+                return self._table, None
+            if age is not None and age <= self.max_stale_s:
+                self.stats.stale_hits += 1
+                if time.monotonic() >= self._retry_at:
+                    self._start_refresh()
+                return self._table, None
+            self.stats.misses += 1
+            if self._in_flight is not None:
+                self.stats.coalesced += 1
+            return None, self._start_refresh()
+
+    def refresh(self) -> Future:
+        """Starts a refresh unless one is already running; returns the running refresh."""
+        with self._lock:
+            return self._start_refresh()
+
+    def _start_refresh(self) -> Future:
+        if self._in_flight is None:
+            self._in_flight = self._executor.submit(self._fetch)
+        return self._in_flight
+
+    def _fetch(self) -> RateTable:
+        started = time.perf_counter()
+        try:
+            rates = self.provider.fetch(self.pivot, self.codes)
+            table = RateTable(self.pivot, {code: rate for code, rate in rates.items() if code != self.pivot}, self.quotes)
+        except Exception:
+            with self._lock:
+                self.stats.failures += 1
+                self._in_flight = None
+                self._retry_at = time.monotonic() + min(self.ttl_s, 30.0)
+            logger.warning("Exchange-rate refresh from %s failed", type(self.provider).__name__, exc_info=True)
+            raise
+        with self._lock:
+            self._table, self._fetched_at = table, time.monotonic()
+            self.stats.refreshes += 1
+            self.stats.provider_latency_s += time.perf_counter() - started
+            self._in_flight = None
+        return table
+
+    def _refresh_periodically(self, interval_s: float):
+        while not self._stopped.is_set():
+            try:
+                self.refresh().result()
+            except Exception:
+                pass  # Logged in _fetch; lookups keep the last table until max_stale_s.
+            self._stopped.wait(interval_s)
+
+    def metrics(self) -> dict:
+        """Cache age and hit rate (fresh and stale hits over lookups), plus the raw counters."""
+        age = self.age_s()
+        served = self.stats.hits + self.stats.stale_hits
+        return {
+            "age_s": None if age is None else round(age, 3),
+            "hit_rate": round(served / self.stats.lookups, 4) if self.stats.lookups else None,
+            **asdict(self.stats),
+        }
+
+    def close(self):
+        self._stopped.set()
+        self._executor.shutdown(wait=False)
+
+
+def build_provider() -> RateProvider | None:
+    """Provider chosen by RATES_PROVIDER: "http", "mock", or unset for the static rates table."""
+    kind = os.getenv("RATES_PROVIDER", "")
+    if kind == "http":
+        return HttpRateProvider()
+    if kind == "mock":
+        return MockRateProvider(latency_s=float(os.getenv("RATES_MOCK_LATENCY_S", "0")))
+    return None
+
+
+_cache: RateCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_rate_cache() -> RateCache | None:
+    """The shared cache when RATES_PROVIDER is set, with the currencies and quotes of the static table."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            provider = build_provider()
+            if provider is None:
+                return None
+            static = get_rate_table()
+            ttl_s = float(os.getenv("RATES_TTL_S", DEFAULT_TTL_S))
+            _cache = RateCache(
+                provider,
+                static.pivot,
+                static.codes,
+                static.quotes,
+                ttl_s=ttl_s,
+                max_stale_s=float(os.getenv("RATES_MAX_STALE_S", DEFAULT_MAX_STALE_S)),
+                refresh_interval_s=ttl_s / 2,
+            )
+        return _cache
+
+
+async def current_rate_table() -> RateTable:
+    """Live rates through the shared cache when a provider is configured, else the static table.
+
+    Creates the cache on first use if the agent's before_agent_callback has not already done so.
+    """
+    cache = get_rate_cache()
+    return await cache.table_async() if cache is not None else get_rate_table()
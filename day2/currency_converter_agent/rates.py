@@ -0,0 +1,160 @@
+# Exchange-rate engine: a rate table loaded once into a currency x currency NumPy matrix.
+#
+# The table (RATES_PATH, default rates.json next to this file) gives rates from a pivot currency,
+# plus optional direct quotes that override the triangulated cross rate:
+#   {"pivot": "USD", "rates": {"EUR": 0.93, "INR": 83.58}, "quotes": [["EUR", "INR", 89.9]]}
+import json
+import os
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Callable, Mapping, Sequence
+
+import numpy as np
+
+
+DEFAULT_RATES_PATH = os.path.join(os.path.dirname(__file__), "rates.json")
+
+CENT = Decimal("0.01")
+
+# (methods, amounts) -> fee fraction per row, NaN where the method is unknown (e.g. FeeSchedule.fee_fractions).
+FeeLookup = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+class RateTable:
+    """All cross rates of a set of currencies, precomputed.
+
+    `matrix[i, j]` is how many units of currency j one unit of currency i buys. Pairs without a
+    direct quote are triangulated through the pivot (`rate(a, b) = rate(pivot, b) / rate(pivot, a)`),
+    and every direct quote also sets its inverse.
+    """
+
+    def __init__(self, pivot: str, rates: Mapping[str, float], quotes: Sequence[Sequence] = ()):
+        self.pivot = pivot.upper()
+        self.quotes = [(base.upper(), target.upper(), float(rate)) for base, target, rate in quotes]
+        from_pivot = {self.pivot: 1.0, **{code.upper(): float(rate) for code, rate in rates.items()}}
+        for base, target, _ in quotes:
+            for code in (base.upper(), target.upper()):
+                if code not in from_pivot:
+                    raise ValueError(f"Quoted currency {code} has no rate from the pivot {self.pivot}")
+        if any(rate <= 0 for rate in from_pivot.values()):
+            raise ValueError("Exchange rates must be positive")
+
+        self.codes = sorted(from_pivot)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        vector = np.array([from_pivot[code] for code in self.codes])
+        self.matrix = vector[None, :] / vector[:, None]
+        for base, target, rate in quotes:
+            i, j = self.index[base.upper()], self.index[target.upper()]
+            self.matrix[i, j] = float(rate)
+            self.matrix[j, i] = 1.0 / float(rate)
+
+    @classmethod
+    def load(cls, path: str) -> "RateTable":
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+        return cls(table["pivot"], table["rates"], table.get("quotes", ()))
+
+    def rate(self, base: str, target: str) -> float | None:
+        i, j = self.index.get(base.upper()), self.index.get(target.upper())
+        if i is None or j is None:
+            return None
+        return float(self.matrix[i, j])
+
+    def indices(self, codes: Sequence[str] | np.ndarray) -> np.ndarray:
+        """Matrix index per currency code (any case), -1 where the code is unknown.
+
+        Only the distinct codes are looked up, so this stays cheap for millions of rows.
+        """
+        unique, inverse = np.unique(np.asarray(codes, dtype=str), return_inverse=True)
+        mapped = np.array([self.index.get(code.upper(), -1) for code in unique], dtype=np.intp)
+        return mapped[inverse.reshape(-1)]
+
+    def rates(self, bases: Sequence[str] | np.ndarray, targets: Sequence[str] | np.ndarray) -> np.ndarray:
+        """Rate per (base, target) row, NaN where either currency is unknown."""
+        i, j = self.indices(bases), self.indices(targets)
+        known = (i >= 0) & (j >= 0)
+        return np.where(known, self.matrix[np.where(known, i, 0), np.where(known, j, 0)], np.nan)
+
+
+_table: RateTable | None = None
+
+
+def get_rate_table() -> RateTable:
+    global _table
+    if _table is None:
+        _table = RateTable.load(os.getenv("RATES_PATH", DEFAULT_RATES_PATH))
+    return _table
+
+
+@dataclass
+class BulkConversion:
+    """Column-wise result of `convert_bulk`; rows with `ok == False` hold NaN."""
+
+    ok: np.ndarray
+    fee_percentage: np.ndarray
+    fee_amount: np.ndarray
+    amount_after_fee: np.ndarray
+    exchange_rate: np.ndarray
+    converted_amount: np.ndarray
+
+
+def convert_bulk(
+    amounts: Sequence[float] | np.ndarray,
+    bases: Sequence[str] | np.ndarray,
+    targets: Sequence[str] | np.ndarray,
+    methods: Sequence[str] | np.ndarray,
+    fee_lookup: FeeLookup,
+    table: RateTable | None = None,
+) -> BulkConversion:
+    """Converts many (amount, base, target, method) rows in one vectorized pass.
+
+    Same breakdown as the `convert_amount` tool: amounts are computed in float64 and rounded half-up
+    to cents, and the few rows whose value lies within float error of a half cent are recomputed
+    with Decimal like the tool, so every cent matches. A row is not ok if its amount is not
+    positive or its currency pair or payment method is unknown.
+    """
+    table = table or get_rate_table()
+    amounts = np.asarray(amounts, dtype=np.float64)
+    fee_percentage = fee_lookup(np.asarray(methods), amounts)
+    exchange_rate = table.rates(bases, targets)
+    ok = (amounts > 0) & ~np.isnan(fee_percentage) & ~np.isnan(exchange_rate)
+
+    amounts = np.where(ok, amounts, np.nan)
+    fee_amount = amounts * fee_percentage
+    amount_after_fee = amounts - fee_amount
+    converted_amount = amount_after_fee * exchange_rate
+    ties = _near_half_cent(fee_amount) | _near_half_cent(amount_after_fee) | _near_half_cent(converted_amount)
+    fee_amount, amount_after_fee, converted_amount = (
+        _round_half_up(column) for column in (fee_amount, amount_after_fee, converted_amount)
+    )
+    for i in np.flatnonzero(ties):
+        fee_amount[i], amount_after_fee[i], converted_amount[i] = _convert_exact(
+            amounts[i], fee_percentage[i], exchange_rate[i]
+        )
+    return BulkConversion(
+        ok=ok,
+        fee_percentage=np.where(ok, fee_percentage, np.nan),
+        fee_amount=fee_amount,
+        amount_after_fee=amount_after_fee,
+        exchange_rate=np.where(ok, exchange_rate, np.nan),
+        converted_amount=converted_amount,
+    )
+
+
+def _round_half_up(values: np.ndarray) -> np.ndarray:
+    return np.floor(values * 100 + 0.5) / 100
+
+
+def _near_half_cent(values: np.ndarray) -> np.ndarray:
+    """Where float error could put a value on the wrong side of a half cent (NaN rows are False)."""
+    cents = values * 100
+    return np.abs(cents - np.floor(cents) - 0.5) <= 1e-9 * np.maximum(np.abs(cents), 1)
+
+
+def _convert_exact(amount: float, fee_percentage: float, exchange_rate: float) -> tuple[float, float, float]:
+    """One row exactly as `convert_amount` computes it (which quotes the rate to 10 significant digits)."""
+    amount = Decimal(str(float(amount)))
+    fee_amount = amount * Decimal(str(float(fee_percentage)))
+    amount_after_fee = amount - fee_amount
+    converted = amount_after_fee * Decimal(str(float(f"{exchange_rate:.10g}")))
+    return tuple(float(value.quantize(CENT, ROUND_HALF_UP)) for value in (fee_amount, amount_after_fee, converted))
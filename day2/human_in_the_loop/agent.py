@@ -5,12 +5,15 @@ import uuid
 from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
 from google.adk.apps import ResumabilityConfig, App
-from google.adk.models import Gemini
 from google.adk.sessions import InMemorySessionService
 from google.adk.tools import ToolContext, FunctionTool
 from google.genai import types
 from google.adk.runners import Runner
 
+from day2.human_in_the_loop.fast_path import FastPathRouter
+from day2.human_in_the_loop.workflow import find_approval
+from day2.utils import build_gemini
+
 
 load_dotenv()
 GITHUB_TOKEN = os.getenv("GOOGLE_API_KEY")
@@ -18,14 +21,6 @@ GITHUB_TOKEN = os.getenv("GOOGLE_API_KEY")
 LARGE_ORDER_THRESHOLD = 5
 
 
-retry_config = types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-)
-
-
 def check_for_approval(events):
     """Check if events contain an approval request.
 
@@ -33,16 +28,9 @@ def check_for_approval(events):
         dict with approval details or None
     """
     for event in events:
-        if event.content and event.content.parts:
-            for part in event.content.parts:
-                if (
-                    part.function_call
-                    and part.function_call.name == "adk_request_confirmation"
-                ):
-                    return {
-                        "approval_id": part.function_call.id,
-                        "invocation_id": event.invocation_id,
-                    }
+        approval = find_approval(event)
+        if approval is not None:
+            return approval
     return None
 
 
@@ -195,9 +183,9 @@ def place_shipping_order(
         }
 
 
-root_agent = LlmAgent(
+shipping_agent = LlmAgent(
     name="shipping_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=build_gemini("gemini-2.5-flash-lite"),
     instruction="""You are a shipping coordinator assistant.
 
   When users request to ship containers:
@@ -212,6 +200,17 @@ root_agent = LlmAgent(
     tools=[FunctionTool(func=place_shipping_order)],
 )
 
+# Small structured orders ("Ship 3 containers to Singapore" or a JSON payload) skip the model entirely.
+# SHIPPING_FAST_PATH=0 sends every order through shipping_agent.
+root_agent = FastPathRouter(
+    name="shipping_router",
+    description="Places small structured shipping orders directly; delegates the rest to shipping_agent.",
+    sub_agents=[shipping_agent],
+    order_tool=place_shipping_order,
+    max_containers=LARGE_ORDER_THRESHOLD,
+    fast_path=os.getenv("SHIPPING_FAST_PATH", "1") != "0",
+)
+
 
 app = App(
     name="shipping_coordinator",
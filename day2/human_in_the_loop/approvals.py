@@ -0,0 +1,243 @@
+# Durable queue of shipping orders waiting for a human decision (SQLite).
+#
+# pending -> decided (approved or rejected by an operator, or auto-rejected at its deadline)
+#         -> resuming (claimed by a driver, under a lease of `lease_s`) -> resumed.
+# Claiming is atomic, so a decided order is resumed once, even with several drivers or processes on
+# the same file. An order whose driver died while resuming it is claimed again once its lease expires,
+# so `lease_s` must be longer than resuming one order takes. Resuming after a restart also needs the
+# sessions to survive it, so pair the queue with a persistent session service (e.g. DatabaseSessionService).
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Iterable
+
+from day2.human_in_the_loop.workflow import PendingApproval
+
+
+DEFAULT_QUEUE_PATH = "approvals.db"
+DEFAULT_TIMEOUT_S = 24 * 3600
+DEFAULT_LEASE_S = 600
+COLUMNS = (
+    "approval_id, invocation_id, session_id, user_id, query, hint, payload, status, created_at, deadline"
+)
+
+
+@dataclass
+class ApprovalRecord:
+    approval: PendingApproval
+    status: str  # "pending", "decided", "resuming" or "resumed"
+    deadline: float
+    decision: str | None = None  # "approved" or "rejected"
+    decided_by: str | None = None  # Operator name, or "timeout"
+    decided_at: float | None = None
+    result: str | None = None  # Order status after resuming: "completed" or "failed"
+    claimed_by: str | None = None  # Owner of the queue that is resuming (or resumed) it
+
+    @property
+    def approved(self) -> bool:
+        return self.decision == "approved"
+
+
+class ApprovalQueue:
+    """Pending approvals keyed by approval_id, with bulk decisions and deadline-based auto-reject."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_QUEUE_PATH,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+        lease_s: float = DEFAULT_LEASE_S,
+        owner: str | None = None,
+    ):
+        self.path = path
+        self.timeout_s = timeout_s
+        self.lease_s = lease_s
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS approvals (
+                approval_id TEXT PRIMARY KEY,
+                invocation_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                query TEXT NOT NULL,
+                hint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                deadline REAL NOT NULL,
+                decision TEXT,
+                decided_by TEXT,
+                decided_at REAL,
+                result TEXT,
+                claimed_by TEXT,
+                claimed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_approvals_status ON approvals(status, deadline);
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(approvals)")}
+        for column, kind in (("claimed_by", "TEXT"), ("claimed_at", "REAL")):  # Files created before leases
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE approvals ADD COLUMN {column} {kind}")
+
+    def add(self, approval: PendingApproval, timeout_s: float | None = None):
+        deadline = approval.created_at + (self.timeout_s if timeout_s is None else timeout_s)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR IGNORE INTO approvals ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?)",
+                (
+                    approval.approval_id,
+                    approval.invocation_id,
+                    approval.session_id,
+                    approval.user_id,
+                    approval.query,
+                    approval.hint,
+                    json.dumps(approval.payload),
+                    approval.created_at,
+                    deadline,
+                ),
+            )
+
+    def get(self, approval_id: str) -> ApprovalRecord | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM approvals WHERE approval_id = ?", (approval_id,)).fetchone()
+        return _record(row) if row else None
+
+    def list_pending(
+        self,
+        user_id: str | None = None,
+        created_before: float | None = None,
+        hint_contains: str | None = None,
+        payload: dict | None = None,
+        limit: int | None = None,
+    ) -> list[ApprovalRecord]:
+        """Pending approvals, oldest first. `payload` matches fields exactly, e.g. {"destination": "Rotterdam"}."""
+        clauses, params = ["status = 'pending'"], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(created_before)
+        if hint_contains:
+            clauses.append("instr(lower(hint), lower(?)) > 0")
+            params.append(hint_contains)
+        for field, value in (payload or {}).items():
+            clauses.append("json_extract(payload, ?) = ?")
+            params += [f"$.{field}", value]
+        sql = f"SELECT * FROM approvals WHERE {' AND '.join(clauses)} ORDER BY created_at"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_record(row) for row in rows]
+
+    def decide(self, approval_ids: Iterable[str], approved: bool, decided_by: str = "operator") -> list[str]:
+        """Approves or rejects many pending approvals in one transaction; returns the ids that were still pending."""
+        ids = list(approval_ids)
+        decision, now = ("approved" if approved else "rejected"), time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                decided = [
+                    approval_id
+                    for approval_id in ids
+                    if self._conn.execute(
+                        """UPDATE approvals SET status = 'decided', decision = ?, decided_by = ?, decided_at = ?
+                           WHERE approval_id = ? AND status = 'pending'""",
+                        (decision, decided_by, now, approval_id),
+                    ).rowcount
+                ]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return decided
+
+    def approve(self, approval_ids: Iterable[str], decided_by: str = "operator") -> list[str]:
+        return self.decide(approval_ids, True, decided_by)
+
+    def reject(self, approval_ids: Iterable[str], decided_by: str = "operator") -> list[str]:
+        return self.decide(approval_ids, False, decided_by)
+
+    def expire(self, now: float | None = None) -> list[str]:
+        """Auto-rejects pending approvals past their deadline (decided_by "timeout")."""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                """UPDATE approvals SET status = 'decided', decision = 'rejected', decided_by = 'timeout', decided_at = ?
+                   WHERE status = 'pending' AND deadline <= ? RETURNING approval_id""",
+                (now, now),
+            ).fetchall()
+        return [row["approval_id"] for row in rows]
+
+    def claim(self, approval_ids: Iterable[str] | None = None, limit: int | None = None) -> list[ApprovalRecord]:
+        """Leases decided approvals (all, or only `approval_ids`) to this queue and returns them, in decision order.
+
+        Approvals another driver is resuming are skipped until their lease expires.
+        """
+        now = time.time()
+        select = """SELECT approval_id FROM approvals
+                    WHERE (status = 'decided' OR (status = 'resuming' AND claimed_at <= ?))"""
+        params: list = [now - self.lease_s]
+        if approval_ids is not None:
+            ids = list(approval_ids)
+            select += f" AND approval_id IN ({','.join('?' * len(ids))})"
+            params += ids
+        select += " ORDER BY decided_at"
+        if limit:
+            select += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(
+                f"""UPDATE approvals SET status = 'resuming', claimed_by = ?, claimed_at = ?
+                    WHERE approval_id IN ({select}) RETURNING *""",
+                [self.owner, now, *params],
+            ).fetchall()
+        return sorted((_record(row) for row in rows), key=lambda record: record.decided_at)
+
+    def mark_resumed(self, approval_id: str, result: str) -> bool:
+        """Records the result of an approval this queue claimed; False if its lease was taken over meanwhile."""
+        with self._lock:
+            return bool(
+                self._conn.execute(
+                    """UPDATE approvals SET status = 'resumed', result = ?
+                       WHERE approval_id = ? AND status = 'resuming' AND claimed_by = ?""",
+                    (result, approval_id, self.owner),
+                ).rowcount
+            )
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM approvals GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def _record(row: sqlite3.Row) -> ApprovalRecord:
+    return ApprovalRecord(
+        approval=PendingApproval(
+            approval_id=row["approval_id"],
+            invocation_id=row["invocation_id"],
+            session_id=row["session_id"],
+            user_id=row["user_id"],
+            query=row["query"],
+            hint=row["hint"],
+            payload=json.loads(row["payload"]),
+            created_at=row["created_at"],
+        ),
+        status=row["status"],
+        deadline=row["deadline"],
+        decision=row["decision"],
+        decided_by=row["decided_by"],
+        decided_at=row["decided_at"],
+        result=row["result"],
+        claimed_by=row["claimed_by"],
+    )
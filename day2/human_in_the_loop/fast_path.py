@@ -0,0 +1,93 @@
+# Rule-based pre-routing for the shipping coordinator: small, well-formed orders never reach the model.
+#
+# "Ship 3 containers to Singapore" or an API payload {"num_containers": 3, "destination": "Singapore"}
+# with at most LARGE_ORDER_THRESHOLD containers is placed by calling the tool directly and answered
+# from a template. Everything else (free-form text, including an order with anything after the destination,
+# and large orders that need approval) goes to the LLM agent.
+import json
+import re
+from typing import AsyncGenerator, Callable
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.tools import ToolContext
+from google.genai import types
+from typing_extensions import override
+
+
+# A destination is a short place name: one to three capitalized words ("Singapore", "Los Angeles", "St. Louis").
+# Anything after it ("... by Friday", "... but wait for my confirmation") makes the request free-form.
+PLACE_WORD = r"[A-Z][A-Za-z'-]*(?:\.(?= ))?"
+ORDER_PATTERN = re.compile(
+    r"\s*(?:please\s+)?ship\s+(?P<count>\d+)\s+containers?\s+to\s+"
+    rf"(?-i:(?P<destination>{PLACE_WORD}(?: {PLACE_WORD}){{0,2}}))\s*[.!]?\s*",
+    re.IGNORECASE,
+)
+# Capitalized words that qualify an order rather than name a place.
+NOT_PLACE_WORDS = {
+    "asap", "today", "tonight", "tomorrow", "now", "please", "but", "and", "by", "before", "after", "until", "on",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+}
+
+SUMMARY_TEMPLATE = "Order {status}: {num_containers} containers to {destination}. Order ID: {order_id}."
+
+
+def parse_order(text: str) -> dict | None:
+    """{"num_containers", "destination"} from a structured request or JSON payload; None for anything else."""
+    text = (text or "").strip()
+    if text.startswith("{"):
+        try:
+            payload = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        count, destination = payload.get("num_containers"), payload.get("destination")
+        if isinstance(count, int) and not isinstance(count, bool) and isinstance(destination, str) and destination.strip():
+            return {"num_containers": count, "destination": destination.strip()}
+        return None
+    match = ORDER_PATTERN.fullmatch(text)
+    if match is None or any(word.lower() in NOT_PLACE_WORDS for word in match["destination"].split()):
+        return None
+    return {"num_containers": int(match["count"]), "destination": match["destination"]}
+
+
+def render_summary(result: dict) -> str:
+    return SUMMARY_TEMPLATE.format(
+        status=result.get("status", "unknown"),
+        num_containers=result.get("num_containers"),
+        destination=result.get("destination"),
+        order_id=result.get("order_id", "n/a"),
+    )
+
+
+class FastPathRouter(BaseAgent):
+    """Places small structured orders with `order_tool` directly; delegates everything else to its sub-agent.
+
+    `order_tool` is `place_shipping_order`; orders with more than `max_containers` containers keep going
+    through the LLM agent so the approval (request_confirmation) flow is unchanged.
+    """
+
+    order_tool: Callable[..., dict]
+    max_containers: int
+    fast_path: bool = True
+
+    def _message_text(self, ctx: InvocationContext) -> str:
+        content = ctx.user_content
+        return "".join(part.text or "" for part in content.parts or []) if content else ""
+
+    @override
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        order = parse_order(self._message_text(ctx)) if self.fast_path else None
+        if order is not None and 0 < order["num_containers"] <= self.max_containers:
+            result = self.order_tool(tool_context=ToolContext(ctx), **order)
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text=render_summary(result))]),
+                actions=EventActions(state_delta={"last_order": result}),
+            )
+            return
+
+        async for event in self.sub_agents[0].run_async(ctx):
+            yield event
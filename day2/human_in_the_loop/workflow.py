@@ -0,0 +1,237 @@
+# Many shipping orders at once: bounded concurrency, approval requests detected while events stream.
+#
+# An order that needs approval is parked as a PendingApproval record (no task or generator is kept
+# alive for it), in memory or in a durable ApprovalQueue (approvals.py), and resumed later with
+# `ShippingWorkflowDriver.resume(approval_id, approved)` or, for decisions taken in the queue,
+# `resume_decided()`.
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterable, AsyncIterator, Iterable
+
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.genai import types
+
+if TYPE_CHECKING:
+    from day2.human_in_the_loop.approvals import ApprovalQueue, ApprovalRecord
+
+
+logger = logging.getLogger(__name__)
+
+REQUEST_CONFIRMATION = "adk_request_confirmation"
+
+_STOP = object()
+
+
+@dataclass
+class PendingApproval:
+    approval_id: str
+    invocation_id: str
+    session_id: str
+    user_id: str
+    query: str
+    hint: str = ""
+    payload: dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class OrderResult:
+    query: str
+    session_id: str
+    status: str  # "completed", "pending_approval" or "failed"
+    responses: list[str] = field(default_factory=list)
+    approval: PendingApproval | None = None
+    error: str | None = None
+    elapsed_s: float = 0.0
+
+
+def find_approval(event: Event) -> dict | None:
+    """The `adk_request_confirmation` call in one event, as approval_id / invocation_id / hint / payload."""
+    for part in (event.content.parts or []) if event.content else []:
+        if part.function_call and part.function_call.name == REQUEST_CONFIRMATION:
+            confirmation = (part.function_call.args or {}).get("toolConfirmation", {})
+            return {
+                "approval_id": part.function_call.id,
+                "invocation_id": event.invocation_id,
+                "hint": confirmation.get("hint", ""),
+                "payload": confirmation.get("payload") or {},
+            }
+    return None
+
+
+def response_texts(event: Event) -> list[str]:
+    if event.partial or not event.content:
+        return []
+    return [part.text for part in event.content.parts or [] if part.text]
+
+
+def approval_message(approval_id: str, approved: bool) -> types.Content:
+    return types.Content(
+        role="user",
+        parts=[
+            types.Part(
+                function_response=types.FunctionResponse(
+                    id=approval_id, name=REQUEST_CONFIRMATION, response={"confirmed": approved}
+                )
+            )
+        ],
+    )
+
+
+class ShippingWorkflowDriver:
+    """Runs shipping orders through a resumable `Runner` with at most `concurrency` in flight.
+
+    Each order gets its own session. Events are consumed as they stream; at the first
+    `adk_request_confirmation` the driver stops reading that invocation (ADK has already paused
+    it) and parks it in `pending`, or in `approvals` when a durable queue is given, so a worker
+    is free for the next order immediately.
+    """
+
+    def __init__(
+        self,
+        runner: Runner,
+        concurrency: int = 32,
+        user_id: str = "orders",
+        approvals: "ApprovalQueue | None" = None,
+    ):
+        self.runner = runner
+        self.concurrency = concurrency
+        self.user_id = user_id
+        self.approvals = approvals
+        self.pending: dict[str, PendingApproval] = {}
+
+    async def _consume(self, result: OrderResult, events: AsyncIterator[Event]) -> OrderResult:
+        async with aclosing(events) as stream:
+            async for event in stream:
+                approval = find_approval(event)
+                if approval is not None:
+                    result.status = "pending_approval"
+                    result.approval = PendingApproval(
+                        session_id=result.session_id, user_id=self.user_id, query=result.query, **approval
+                    )
+                    if self.approvals is not None:
+                        self.approvals.add(result.approval)
+                    else:
+                        self.pending[approval["approval_id"]] = result.approval
+                    return result
+                result.responses += response_texts(event)
+        result.status = "completed"
+        return result
+
+    async def run_order(self, query: str) -> OrderResult:
+        started = time.perf_counter()
+        result = OrderResult(query=query, session_id=f"order_{uuid.uuid4().hex[:12]}", status="failed")
+        try:
+            await self.runner.session_service.create_session(
+                app_name=self.runner.app_name, user_id=self.user_id, session_id=result.session_id
+            )
+            message = types.Content(role="user", parts=[types.Part(text=query)])
+            await self._consume(
+                result,
+                self.runner.run_async(user_id=self.user_id, session_id=result.session_id, new_message=message),
+            )
+        except Exception as e:
+            logger.exception("Order %r failed", query)
+            result.status, result.error = "failed", str(e)
+        result.elapsed_s = time.perf_counter() - started
+        return result
+
+    async def resume(self, approval_id: str, approved: bool) -> OrderResult:
+        """Sends the human decision for a parked order and runs its invocation to the end.
+
+        With an approval queue, an approval that was already decided the other way (by another
+        operator, or rejected at its deadline) raises ValueError instead of resuming that decision.
+        """
+        if self.approvals is None:
+            return await self._resume(self.pending.pop(approval_id), approved)
+        if not self.approvals.decide([approval_id], approved):
+            record = self.approvals.get(approval_id)
+            if record is None:
+                raise KeyError(f"Unknown approval {approval_id}")
+            if record.approved != approved:
+                raise ValueError(f"Approval {approval_id} was already {record.decision} by {record.decided_by}")
+        claimed = self.approvals.claim([approval_id])
+        if not claimed:
+            raise KeyError(f"Approval {approval_id} is not waiting to be resumed")
+        return await self._resume_claimed(claimed[0])
+
+    async def resume_decided(self, max_parallel: int = 8, limit: int | None = None) -> list[OrderResult]:
+        """Resumes every order decided in the approval queue, `max_parallel` at a time.
+
+        Pending approvals past their deadline are auto-rejected first, so they are resumed here too.
+        """
+        self.approvals.expire()
+        semaphore = asyncio.Semaphore(max_parallel)
+
+        async def resume_one(record):
+            async with semaphore:
+                return await self._resume_claimed(record)
+
+        return list(await asyncio.gather(*(resume_one(r) for r in self.approvals.claim(limit=limit))))
+
+    async def _resume_claimed(self, record: "ApprovalRecord") -> OrderResult:
+        result = await self._resume(record.approval, record.approved)
+        if not self.approvals.mark_resumed(record.approval.approval_id, result.status):
+            logger.warning("Approval %s was resumed past its lease", record.approval.approval_id)
+        return result
+
+    async def _resume(self, pending: PendingApproval, approved: bool) -> OrderResult:
+        started = time.perf_counter()
+        result = OrderResult(query=pending.query, session_id=pending.session_id, status="failed")
+        try:
+            await self._consume(
+                result,
+                self.runner.run_async(
+                    user_id=pending.user_id,
+                    session_id=pending.session_id,
+                    invocation_id=pending.invocation_id,  # The same invocation_id resumes instead of starting over.
+                    new_message=approval_message(pending.approval_id, approved),
+                ),
+            )
+        except Exception as e:
+            logger.exception("Resuming order %r failed", pending.query)
+            result.status, result.error = "failed", str(e)
+        result.elapsed_s = time.perf_counter() - started
+        return result
+
+    async def run_orders(self, queries: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[OrderResult]:
+        """Runs every order with bounded concurrency and yields results as they finish."""
+        inbox: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def feed():
+            try:
+                if hasattr(queries, "__aiter__"):
+                    async for query in queries:
+                        await inbox.put(query)
+                else:
+                    for query in queries:
+                        await inbox.put(query)
+            finally:
+                for _ in range(self.concurrency):
+                    await inbox.put(_STOP)
+
+        async def work():
+            while (query := await inbox.get()) is not _STOP:
+                await results.put(await self.run_order(query))
+            await results.put(_STOP)
+
+        tasks = [asyncio.create_task(feed())] + [asyncio.create_task(work()) for _ in range(self.concurrency)]
+        try:
+            running = self.concurrency
+            while running:
+                result = await results.get()
+                if result is _STOP:
+                    running -= 1
+                else:
+                    yield result
+            await tasks[0]  # Surface an exception from the input iterator.
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
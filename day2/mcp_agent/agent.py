@@ -3,11 +3,11 @@ import base64
 from tempfile import gettempdir
 
 from google.adk.agents import LlmAgent
-from google.adk.models import Gemini
 from google.adk.tools import McpToolset, FunctionTool
 from google.adk.tools.mcp_tool import StdioConnectionParams
 from mcp import StdioServerParameters
-from google.genai import types
+
+from day2.utils import build_gemini
 
 
 def save_image_to_file(image_base64: str, filename: str = "mcp_tiny_image.png") -> dict:
@@ -52,15 +52,8 @@ mcp_image_server = McpToolset(
     tool_filter=["getTinyImage"],
 )
 
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
-
 root_agent = LlmAgent(
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=build_gemini("gemini-2.5-flash-lite"),
     name="image_agent",
     instruction=(
         "You have two tools:\n"
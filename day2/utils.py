@@ -0,0 +1,252 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import AsyncGenerator
+
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+from google.genai import types
+from google.genai.errors import APIError
+
+
+DEFAULT_MODEL = "gemini-2.5-flash-lite"
+
+# Overload responses (429/503) are handled by the shared limiter below, so the SDK
+# only retries the remaining transient errors, with a short capped backoff.
+RETRY_CONFIG = types.HttpRetryOptions(
+    attempts=3,
+    exp_base=2,
+    initial_delay=1,
+    max_delay=8,
+    jitter=1,
+    http_status_codes=[500, 504],
+)
+OVERLOAD_STATUS_CODES = (429, 503)
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_S = 1.0
+BACKOFF_CAP_S = 20.0
+
+
+@dataclass
+class ModelLimits:
+    requests_per_minute: int
+    tokens_per_minute: int
+    max_concurrency: int
+
+
+# Roughly the Gemini API free tier; adjust with `configure_limits` for paid quotas.
+DEFAULT_LIMITS = {
+    "gemini-2.5-flash-lite": ModelLimits(requests_per_minute=15, tokens_per_minute=250_000, max_concurrency=8),
+    "gemini-2.5-flash": ModelLimits(requests_per_minute=10, tokens_per_minute=250_000, max_concurrency=4),
+    "gemini-2.5-pro": ModelLimits(requests_per_minute=5, tokens_per_minute=250_000, max_concurrency=2),
+}
+FALLBACK_LIMITS = ModelLimits(requests_per_minute=10, tokens_per_minute=250_000, max_concurrency=4)
+
+
+class TokenBucket:
+    """Reservation-style token bucket: callers take tokens up front and sleep off any debt."""
+
+    def __init__(self, capacity: float, refill_per_s: float):
+        self.capacity = capacity
+        self.refill_per_s = refill_per_s
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` tokens and returns how long the caller must wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_s)
+            self._updated = now
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.refill_per_s)
+
+    def refund(self, amount: float):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit that grows additively on success and halves on overload (AIMD)."""
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def on_success(self):
+        # +1 per "round" of `limit` successful requests.
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake_waiters()
+
+    def on_overload(self):
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+    def _wake_waiters(self):
+        free_slots = int(self.limit) - self.in_flight
+        while free_slots > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free_slots -= 1
+
+
+@dataclass
+class ModelMetrics:
+    requests: int = 0
+    successes: int = 0
+    overloads: int = 0  # 429/503 responses
+    retries: int = 0
+    failures: int = 0
+    tokens: int = 0
+    throttle_wait_s: float = 0.0
+    backoff_wait_s: float = 0.0
+
+
+class ModelRateLimiter:
+    """Process-wide request/token budget and adaptive concurrency for one model."""
+
+    def __init__(self, limits: ModelLimits):
+        self.limits = limits
+        self.requests = TokenBucket(limits.requests_per_minute, limits.requests_per_minute / 60)
+        self.tokens = TokenBucket(limits.tokens_per_minute, limits.tokens_per_minute / 60)
+        self.concurrency = AdaptiveConcurrency(limits.max_concurrency)
+        self.metrics = ModelMetrics()
+
+    async def acquire(self, estimated_tokens: int):
+        await self.concurrency.acquire()
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if wait:
+            self.metrics.throttle_wait_s += wait
+            await asyncio.sleep(wait)
+        self.metrics.requests += 1
+
+    def release(self):
+        self.concurrency.release()
+
+
+_limiters: dict[str, ModelRateLimiter] = {}
+_limits: dict[str, ModelLimits] = dict(DEFAULT_LIMITS)
+_limiters_lock = threading.Lock()
+
+
+def configure_limits(
+    model: str,
+    requests_per_minute: int | None = None,
+    tokens_per_minute: int | None = None,
+    max_concurrency: int | None = None,
+):
+    """Overrides the quota of `model` (call before its first request)."""
+    current = _limits.get(model, FALLBACK_LIMITS)
+    _limits[model] = ModelLimits(
+        requests_per_minute=requests_per_minute or current.requests_per_minute,
+        tokens_per_minute=tokens_per_minute or current.tokens_per_minute,
+        max_concurrency=max_concurrency or current.max_concurrency,
+    )
+    with _limiters_lock:
+        _limiters.pop(model, None)
+
+
+def get_rate_limiter(model: str) -> ModelRateLimiter:
+    with _limiters_lock:
+        if model not in _limiters:
+            _limiters[model] = ModelRateLimiter(_limits.get(model, FALLBACK_LIMITS))
+        return _limiters[model]
+
+
+def get_metrics() -> dict[str, dict]:
+    """Per-model counters, e.g. {"gemini-2.5-flash-lite": {"requests": 12, "overloads": 1, ...}}."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {
+        model: {**asdict(limiter.metrics), "concurrency_limit": round(limiter.concurrency.limit, 2)}
+        for model, limiter in limiters.items()
+    }
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter, capped at BACKOFF_CAP_S."""
+    return random.uniform(0, min(BACKOFF_CAP_S, BACKOFF_BASE_S * 2 ** attempt))
+
+
+def estimate_request_tokens(llm_request: LlmRequest) -> int:
+    chars = len(str(llm_request.config.system_instruction or ""))
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            chars += len(part.text or "")
+    return max(1, chars // 4)
+
+
+class RateLimitedGemini(Gemini):
+    """Gemini model whose calls go through the shared per-model rate limiter."""
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        limiter = get_rate_limiter(self.model)
+        estimated_tokens = estimate_request_tokens(llm_request)
+
+        for attempt in range(MAX_ATTEMPTS):
+            await limiter.acquire(estimated_tokens)
+            started = False
+            try:
+                async for response in super().generate_content_async(llm_request, stream=stream):
+                    started = True
+                    if response.usage_metadata and response.usage_metadata.total_token_count and not response.partial:
+                        # Settle the estimate against the real usage.
+                        actual = response.usage_metadata.total_token_count
+                        limiter.metrics.tokens += actual
+                        if actual > estimated_tokens:
+                            limiter.tokens.reserve(actual - estimated_tokens)
+                        else:
+                            limiter.tokens.refund(estimated_tokens - actual)
+                    yield response
+                limiter.metrics.successes += 1
+                limiter.concurrency.on_success()
+                return
+            except APIError as e:
+                if e.code not in OVERLOAD_STATUS_CODES or started:
+                    limiter.metrics.failures += 1
+                    raise
+                limiter.metrics.overloads += 1
+                limiter.concurrency.on_overload()
+                if attempt == MAX_ATTEMPTS - 1:
+                    limiter.metrics.failures += 1
+                    raise
+            finally:
+                limiter.release()
+
+            delay = backoff_delay(attempt)
+            limiter.metrics.retries += 1
+            limiter.metrics.backoff_wait_s += delay
+            await asyncio.sleep(delay)
+
+
+def build_gemini(model: str = DEFAULT_MODEL, **kwargs) -> Gemini:
+    """Builds a Gemini model that shares this process's rate limit budget for `model`.
+
+    Use it instead of `Gemini(model=..., retry_options=...)` in agent definitions.
+    """
+    kwargs.setdefault("retry_options", RETRY_CONFIG)
+    return RateLimitedGemini(model=model, **kwargs)
@@ -3,12 +3,17 @@ import os
 
 from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
-from google.adk.models import Gemini
-from google.adk.sessions import DatabaseSessionService
 from google.adk.runners import Runner
 from google.adk.apps import App
+from google.adk.tools import preload_memory
 from google.genai import types
 
+from common.session_compaction import SessionCompactor
+from common.sharded_sessions import ShardedSessionService
+from common.sqlite_sessions import build_session_service, get_or_create_session
+from common.vector_memory import MemoryPlugin, VectorMemoryService
+from day2.utils import build_gemini
+
 
 # -------------------- Load API key --------------------
 load_dotenv()
@@ -19,14 +24,9 @@ GOOGLE_KEY = os.getenv("GOOGLE_API_KEY")
 APP_NAME = "StatefulApp"
 USER_ID = "default"          # Real-world: this is per-user
 MODEL_NAME = "gemini-2.5-flash-lite"
-
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+MEMORY_ENABLED = os.getenv("STATEFUL_MEMORY") == "1"  # Long-term memory across this user's sessions
+SHARD_MAP = os.getenv("SESSION_SHARD_MAP")  # Shard map JSON: sessions spread over several DB files by user
+DB_PATH = SHARD_MAP or "my_agent_data.db"
 
 
 # -------------------- Helper: run a session --------------------
@@ -38,15 +38,10 @@ async def run_session(
 
     print(f"\n### Session: {session_name}")
 
-    # Get or create session
-    try:
-        session = await session_service.create_session(
-            app_name=APP_NAME, user_id=USER_ID, session_id=session_name
-        )
-    except:
-        session = await session_service.get_session(
-            app_name=APP_NAME, user_id=USER_ID, session_id=session_name
-        )
+    # Get or create session (one read for a returning user)
+    session = await get_or_create_session(
+        runner_instance.session_service, app_name=APP_NAME, user_id=USER_ID, session_id=session_name
+    )
 
     if not user_queries:
         print("No queries!")
@@ -79,42 +74,73 @@ async def run_session(
             ):
                 print(f"{MODEL_NAME} > {event.content.parts[0].text}")
 
+    # A compaction started by the last turn runs in the background; let it finish before the event loop ends.
+    compactor = runner_instance.plugin_manager.get_plugin("session_compaction")
+    if compactor is not None:
+        await compactor.wait()
+
 
 # -------------------- Create Agent --------------------
 root_agent = LlmAgent(
     name="text_chat_bot",
     description="A text chatbot with persistent memory",
-    model=Gemini(
-        model=MODEL_NAME,
-        retry_options=retry_config,
-    ),
+    model=build_gemini(MODEL_NAME),
+    tools=[preload_memory] if MEMORY_ENABLED else [],
 )
 
 
 # -------------------- Wrap into App (REQUIRED BY ADK) --------------------
+# Past its event/token budget, older turns are folded into a rolling summary (SESSION_COMPACTION=0 to disable)
 app = App(
     name=APP_NAME,
     root_agent=root_agent,
+    plugins=[
+        *([MemoryPlugin()] if MEMORY_ENABLED else []),
+        *([SessionCompactor()] if os.getenv("SESSION_COMPACTION", "1") != "0" else []),
+    ],
 )
 
 apps = [app]
 
-# -------------------- Session DB --------------------
-session_service = DatabaseSessionService(
-    db_url="sqlite+aiosqlite:///my_agent_data.db"
-)
+# -------------------- Session DB and runner (built on first use, not at import) --------------------
+_session_service = None
+_runner = None
+
+
+def get_session_service():
+    global _session_service
+    if _session_service is None:
+        if SHARD_MAP:
+            _session_service = ShardedSessionService(SHARD_MAP)
+        else:
+            _session_service = build_session_service(
+                DB_PATH, os.getenv("SESSION_DB_PROFILE", "tuned")
+            )
+    return _session_service
+
+
+def get_runner() -> Runner:
+    global _runner
+    if _runner is None:
+        _runner = Runner(
+            app=app,
+            session_service=get_session_service(),
+            memory_service=VectorMemoryService("agent_memory") if MEMORY_ENABLED else None,
+        )
+        print("✅ Stateful ADK Agent initialized!")
+        print(f"   Application: {APP_NAME}")
+        print(f"   Using DB: {DB_PATH}")
+        print(f"   User: {USER_ID}")
+    return _runner
 
-# -------------------- Create runner --------------------
-runner = Runner(
-    agent=root_agent,
-    app_name=APP_NAME,
-    session_service=session_service,
-)
 
-print("✅ Stateful ADK Agent initialized!")
-print(f"   Application: {APP_NAME}")
-print(f"   Using DB: my_agent_data.db")
-print(f"   User: {USER_ID}")
+def __getattr__(name: str):
+    # `agent.session_service` / `agent.runner` keep working; they are created when first accessed.
+    if name == "session_service":
+        return get_session_service()
+    if name == "runner":
+        return get_runner()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # -------------------- Examples --------------------
@@ -139,6 +165,6 @@ async def only_test(runner):
 
 if __name__ == "__main__":
     # 1st run only
-    # asyncio.run(teach_and_test(runner))
+    # asyncio.run(teach_and_test(get_runner()))
 
-    asyncio.run(only_test(runner))
+    asyncio.run(only_test(get_runner()))